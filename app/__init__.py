@@ -23,8 +23,21 @@ def create_app(config_class=Config):
     from .services.firebase_service import FirebaseService
     FirebaseService.initialize()
 
+    # Response cache for payloads shared across parents
+    from .services.cache_service import response_cache
+    response_cache.init_app(app)
+
+    # Background sender for the notification outbox
+    from .services.notification_service import dispatcher
+    dispatcher.init_app(app)
+
+    # In-process pub/sub behind the parents' event streams
+    from .services.event_service import event_broker
+    event_broker.init_app(app)
+
     # Import models so Flask-Migrate can detect them
-    from .models import User, Classe, Student, Subject, Material, Payment, Attendance
+    from .models import User, Classe, Student, Subject, Material, Payment, Attendance, Tombstone
+    from .models import NotificationBatch, OutboxNotification
 
     # Register blueprints
     from .api import api_bp
@@ -33,6 +46,10 @@ def create_app(config_class=Config):
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(admin_bp, url_prefix='/admin')
 
+    # CLI commands
+    from .cli import register_cli
+    register_cli(app)
+
     # Route to serve uploaded files
     @app.route('/uploads/<path:filename>')
     def uploaded_file(filename):
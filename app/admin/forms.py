@@ -1,8 +1,10 @@
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
-from wtforms import StringField, PasswordField, SelectField, TextAreaField, FloatField, DateField, BooleanField
+from wtforms import (StringField, PasswordField, SelectField, TextAreaField, DecimalField, DateField,
+                     BooleanField, IntegerField)
+from wtforms.widgets import HiddenInput
 from wtforms.validators import DataRequired, Email, Length, Optional, ValidationError
-from app.models import User
+from app.models import User, Student
 
 
 class LoginForm(FlaskForm):
@@ -37,12 +39,18 @@ class ClasseForm(FlaskForm):
 class StudentForm(FlaskForm):
     full_name = StringField('Full Name', validators=[DataRequired(), Length(max=100)])
     date_of_birth = DateField('Date of Birth', validators=[Optional()])
-    parent_id = SelectField('Parent', coerce=int, validators=[DataRequired()])
+    # Picked through the typeahead search, so only the id is posted
+    parent_id = IntegerField('Parent', widget=HiddenInput(), validators=[DataRequired('Select a parent from the list.')])
     class_id = SelectField('Class', coerce=int, validators=[Optional()])
     profile_image = FileField('Profile Image', validators=[
         FileAllowed(['jpg', 'jpeg', 'png'], 'Images only!')
     ])
 
+    def validate_parent_id(self, field):
+        parent = User.query.get(field.data)
+        if not parent or parent.role != 'parent':
+            raise ValidationError('Select a parent from the list.')
+
 
 class SubjectForm(FlaskForm):
     name = StringField('Subject Name', validators=[DataRequired(), Length(max=100)])
@@ -61,13 +69,18 @@ class MaterialForm(FlaskForm):
 
 
 class PaymentForm(FlaskForm):
-    student_id = SelectField('Student', coerce=int, validators=[DataRequired()])
-    amount = FloatField('Amount', validators=[DataRequired()])
+    # Picked through the typeahead search, so only the id is posted
+    student_id = IntegerField('Student', widget=HiddenInput(), validators=[DataRequired('Select a student from the list.')])
+    amount = DecimalField('Amount', places=2, validators=[DataRequired()])
     due_date = DateField('Due Date', validators=[DataRequired()])
     paid_date = DateField('Paid Date', validators=[Optional()])
     is_paid = BooleanField('Paid')
     notes = TextAreaField('Notes', validators=[Optional()])
 
+    def validate_student_id(self, field):
+        if not Student.query.get(field.data):
+            raise ValidationError('Select a student from the list.')
+
 
 class PasswordResetForm(FlaskForm):
     user_id = SelectField('User', coerce=str, validators=[DataRequired()])
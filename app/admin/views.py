@@ -1,14 +1,92 @@
-from flask import render_template, redirect, url_for, flash, request
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+from flask import (render_template, redirect, url_for, flash, request, jsonify, abort,
+                   Response, stream_with_context)
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from app.extensions import db
-from app.models import User, Classe, Student, Subject, Material, Payment, Attendance
+from app.models import (User, Classe, Student, Subject, Material, Payment, Attendance,
+                        ClassDayAttendance, StudentMonthAttendance, NotificationBatch, OutboxNotification)
+from app.services.attendance_service import AttendanceService
+from app.services.export_service import date_range, class_register, stream_csv, stream_xlsx
+from app.services.notification_service import NotificationService, dispatcher
 from app.services.s3_service import s3_service
+from app.services.search_service import SearchService
 from app.utils.decorators import admin_required
+from app.utils.pagination import keyset_paginate
+from app.utils.serializers import counts_by
 from . import admin_bp
 from .forms import (LoginForm, UserForm, ClasseForm, StudentForm,
                     SubjectForm, MaterialForm, PaymentForm, PasswordResetForm)
 
 
+# ==================== LIST HELPERS ====================
+
+PER_PAGE = 50
+TYPEAHEAD_LIMIT = 10
+MAX_EXPORT_DAYS = 366
+
+
+def _paginate(query, sort_options, default_sort, default_order):
+    """
+    Apply the requested sort and keyset cursor to an admin list query.
+
+    `sort_options` maps each sort name to its ordering columns, ending with
+    the primary key. Every option should be backed by a matching index.
+    Returns (items, next_cursor, sort, order).
+    """
+    sort = request.args.get('sort')
+    if sort not in sort_options:
+        sort = default_sort
+    order = request.args.get('order')
+    if order not in ('asc', 'desc'):
+        order = default_order
+
+    columns = sort_options[sort]
+    descending = order == 'desc'
+    try:
+        items, next_cursor = keyset_paginate(query, columns, cursor=request.args.get('cursor'),
+                                             descending=descending, per_page=PER_PAGE)
+    except ValueError:
+        # Stale or tampered cursor: start from the first page
+        items, next_cursor = keyset_paginate(query, columns, descending=descending, per_page=PER_PAGE)
+
+    return items, next_cursor, sort, order
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _search_ids(kind):
+    """Subquery of all ids matching the `q` search box, or None when no search was requested."""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return None
+    return SearchService.matching(q, kind)
+
+
+def _parent_label(user):
+    return f"{user.full_name} ({user.email})"
+
+
+def _student_label(student):
+    return f"{student.full_name} ({student.parent.full_name})"
+
+
+@admin_bp.app_template_global()
+def url_with_args(**changes):
+    """Current URL with some query-string arguments replaced; None removes one."""
+    args = request.args.to_dict()
+    args.update(changes)
+    args = {k: v for k, v in args.items() if v not in (None, '')}
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
 # ==================== AUTH ====================
 
 @admin_bp.route('/login', methods=['GET', 'POST'])
@@ -53,8 +131,22 @@ def dashboard():
     recent_students = Student.query.order_by(Student.created_at.desc()).limit(5).all()
     recent_payments = Payment.query.filter_by(is_paid=False).order_by(Payment.due_date).limit(5).all()
 
+    # Attendance figures read the class-day rollup, a row per class per day
+    today = date.today()
+    present = func.sum(ClassDayAttendance.present)
+    absent = func.sum(ClassDayAttendance.absent)
+    stats['present_today'], stats['absent_today'] = db.session.query(
+        func.coalesce(present, 0), func.coalesce(absent, 0)
+    ).filter(ClassDayAttendance.date == today).one()
+    class_rates = db.session.query(Classe.name, present, absent).join(
+        ClassDayAttendance, ClassDayAttendance.class_id == Classe.id
+    ).filter(
+        ClassDayAttendance.date > today - timedelta(days=30)
+    ).group_by(Classe.id, Classe.name).order_by(Classe.name).all()
+
     return render_template('admin/dashboard.html', stats=stats,
-                           recent_students=recent_students, recent_payments=recent_payments)
+                           recent_students=recent_students, recent_payments=recent_payments,
+                           class_rates=class_rates)
 
 
 # ==================== USERS ====================
@@ -62,8 +154,21 @@ def dashboard():
 @admin_bp.route('/users')
 @admin_required
 def users_list():
-    users = User.query.filter_by(role='parent').order_by(User.created_at.desc()).all()
-    return render_template('admin/users/list.html', users=users)
+    query = User.query.filter_by(role='parent')
+
+    ids = _search_ids('parent')
+    if ids is not None:
+        query = query.filter(User.id.in_(ids))
+
+    users, next_cursor, sort, order = _paginate(query, {
+        'created_at': (User.created_at, User.id),
+        'full_name': (User.full_name, User.id),
+        'email': (User.email, User.id),
+    }, 'created_at', 'desc')
+    children_counts = counts_by(Student.parent_id, (u.id for u in users))
+
+    return render_template('admin/users/list.html', users=users, children_counts=children_counts,
+                           next_cursor=next_cursor, sort=sort, order=order)
 
 
 @admin_bp.route('/users/create', methods=['GET', 'POST'])
@@ -175,16 +280,32 @@ def classes_delete(id):
 @admin_bp.route('/students')
 @admin_required
 def students_list():
-    students = Student.query.order_by(Student.full_name).all()
-    return render_template('admin/students/list.html', students=students)
+    query = Student.query.options(joinedload(Student.classe), joinedload(Student.parent))
+
+    class_filter = request.args.get('class_id', '')
+    if class_filter == 'none':
+        query = query.filter(Student.class_id.is_(None))
+    elif class_filter.isdigit():
+        query = query.filter(Student.class_id == int(class_filter))
+
+    ids = _search_ids('student')
+    if ids is not None:
+        query = query.filter(Student.id.in_(ids))
+
+    students, next_cursor, sort, order = _paginate(query, {
+        'full_name': (Student.full_name, Student.id),
+        'newest': (Student.id,),
+    }, 'full_name', 'asc')
+    classes = Classe.query.order_by(Classe.name).all()
+
+    return render_template('admin/students/list.html', students=students, classes=classes,
+                           class_filter=class_filter, next_cursor=next_cursor, sort=sort, order=order)
 
 
 @admin_bp.route('/students/create', methods=['GET', 'POST'])
 @admin_required
 def students_create():
     form = StudentForm()
-    form.parent_id.choices = [(u.id, f"{u.full_name} ({u.email})")
-                              for u in User.query.filter_by(role='parent').all()]
     form.class_id.choices = [(0, '-- No Class --')] + [(c.id, c.name) for c in Classe.query.all()]
 
     if form.validate_on_submit():
@@ -205,7 +326,9 @@ def students_create():
         flash('Student created successfully.', 'success')
         return redirect(url_for('admin.students_list'))
 
-    return render_template('admin/students/form.html', form=form, title='Create Student')
+    parent = User.query.get(form.parent_id.data) if form.parent_id.data else None
+    return render_template('admin/students/form.html', form=form, title='Create Student',
+                           parent_label=_parent_label(parent) if parent else '')
 
 
 @admin_bp.route('/students/<int:id>/edit', methods=['GET', 'POST'])
@@ -213,8 +336,6 @@ def students_create():
 def students_edit(id):
     student = Student.query.get_or_404(id)
     form = StudentForm(obj=student)
-    form.parent_id.choices = [(u.id, f"{u.full_name} ({u.email})")
-                              for u in User.query.filter_by(role='parent').all()]
     form.class_id.choices = [(0, '-- No Class --')] + [(c.id, c.name) for c in Classe.query.all()]
 
     if form.validate_on_submit():
@@ -235,7 +356,9 @@ def students_edit(id):
     if student.class_id is None:
         form.class_id.data = 0
 
-    return render_template('admin/students/form.html', form=form, title='Edit Student', student=student)
+    parent = User.query.get(form.parent_id.data) if form.parent_id.data else None
+    return render_template('admin/students/form.html', form=form, title='Edit Student', student=student,
+                           parent_label=_parent_label(parent) if parent else '')
 
 
 @admin_bp.route('/students/<int:id>/delete', methods=['POST'])
@@ -253,8 +376,22 @@ def students_delete(id):
 @admin_bp.route('/subjects')
 @admin_required
 def subjects_list():
-    subjects = Subject.query.order_by(Subject.class_id, Subject.name).all()
-    return render_template('admin/subjects/list.html', subjects=subjects)
+    query = Subject.query.options(joinedload(Subject.classe))
+
+    class_filter = request.args.get('class_id', '')
+    if class_filter.isdigit():
+        query = query.filter(Subject.class_id == int(class_filter))
+
+    subjects, next_cursor, sort, order = _paginate(query, {
+        'class': (Subject.class_id, Subject.name, Subject.id),
+        'newest': (Subject.id,),
+    }, 'class', 'asc')
+    material_counts = counts_by(Material.subject_id, (s.id for s in subjects))
+    classes = Classe.query.order_by(Classe.name).all()
+
+    return render_template('admin/subjects/list.html', subjects=subjects, material_counts=material_counts,
+                           classes=classes, class_filter=class_filter,
+                           next_cursor=next_cursor, sort=sort, order=order)
 
 
 @admin_bp.route('/subjects/create', methods=['GET', 'POST'])
@@ -310,8 +447,20 @@ def subjects_delete(id):
 @admin_bp.route('/materials')
 @admin_required
 def materials_list():
-    materials = Material.query.order_by(Material.subject_id, Material.order_index).all()
-    return render_template('admin/materials/list.html', materials=materials)
+    query = Material.query.options(joinedload(Material.subject).joinedload(Subject.classe))
+
+    subject_filter = request.args.get('subject_id', '')
+    if subject_filter.isdigit():
+        query = query.filter(Material.subject_id == int(subject_filter))
+
+    materials, next_cursor, sort, order = _paginate(query, {
+        'subject': (Material.subject_id, Material.order_index, Material.id),
+        'newest': (Material.id,),
+    }, 'subject', 'asc')
+    subjects = Subject.query.options(joinedload(Subject.classe)).order_by(Subject.class_id, Subject.name).all()
+
+    return render_template('admin/materials/list.html', materials=materials, subjects=subjects,
+                           subject_filter=subject_filter, next_cursor=next_cursor, sort=sort, order=order)
 
 
 @admin_bp.route('/materials/create', methods=['GET', 'POST'])
@@ -387,16 +536,35 @@ def materials_delete(id):
 @admin_bp.route('/payments')
 @admin_required
 def payments_list():
-    payments = Payment.query.order_by(Payment.due_date.desc()).all()
-    return render_template('admin/payments/list.html', payments=payments)
+    query = Payment.query.options(joinedload(Payment.student).joinedload(Student.parent))
+
+    status = request.args.get('status', '')
+    if status == 'paid':
+        query = query.filter(Payment.is_paid.is_(True))
+    elif status == 'unpaid':
+        query = query.filter(Payment.is_paid.is_(False))
+
+    due_from = _parse_date(request.args.get('due_from'))
+    due_to = _parse_date(request.args.get('due_to'))
+    if due_from:
+        query = query.filter(Payment.due_date >= due_from)
+    if due_to:
+        query = query.filter(Payment.due_date <= due_to)
+
+    payments, next_cursor, sort, order = _paginate(query, {
+        'due_date': (Payment.due_date, Payment.id),
+        'newest': (Payment.id,),
+    }, 'due_date', 'desc')
+
+    return render_template('admin/payments/list.html', payments=payments, status=status,
+                           due_from=due_from, due_to=due_to,
+                           next_cursor=next_cursor, sort=sort, order=order)
 
 
 @admin_bp.route('/payments/create', methods=['GET', 'POST'])
 @admin_required
 def payments_create():
     form = PaymentForm()
-    form.student_id.choices = [(s.id, f"{s.full_name} ({s.parent.full_name})")
-                               for s in Student.query.all()]
 
     if form.validate_on_submit():
         payment = Payment(
@@ -412,7 +580,9 @@ def payments_create():
         flash('Payment created successfully.', 'success')
         return redirect(url_for('admin.payments_list'))
 
-    return render_template('admin/payments/form.html', form=form, title='Create Payment')
+    student = Student.query.get(form.student_id.data) if form.student_id.data else None
+    return render_template('admin/payments/form.html', form=form, title='Create Payment',
+                           student_label=_student_label(student) if student else '')
 
 
 @admin_bp.route('/payments/<int:id>/edit', methods=['GET', 'POST'])
@@ -420,8 +590,6 @@ def payments_create():
 def payments_edit(id):
     payment = Payment.query.get_or_404(id)
     form = PaymentForm(obj=payment)
-    form.student_id.choices = [(s.id, f"{s.full_name} ({s.parent.full_name})")
-                               for s in Student.query.all()]
 
     if form.validate_on_submit():
         payment.student_id = form.student_id.data
@@ -434,7 +602,9 @@ def payments_edit(id):
         flash('Payment updated successfully.', 'success')
         return redirect(url_for('admin.payments_list'))
 
-    return render_template('admin/payments/form.html', form=form, title='Edit Payment')
+    student = Student.query.get(form.student_id.data) if form.student_id.data else None
+    return render_template('admin/payments/form.html', form=form, title='Edit Payment',
+                           student_label=_student_label(student) if student else '')
 
 
 @admin_bp.route('/payments/<int:id>/delete', methods=['POST'])
@@ -462,6 +632,30 @@ def payments_toggle_paid(id):
     return redirect(url_for('admin.payments_list'))
 
 
+# ==================== SEARCH ====================
+
+@admin_bp.route('/search')
+@admin_required
+def search():
+    """Typeahead lookup for parents (`type=parent`) or students (`type=student`)."""
+    kind = request.args.get('type', 'student')
+    if kind not in ('student', 'parent'):
+        return jsonify({'error': 'type must be student or parent'}), 400
+
+    ids = SearchService.search(request.args.get('q', ''), kind, limit=TYPEAHEAD_LIMIT)
+    if not ids:
+        return jsonify([])
+
+    if kind == 'parent':
+        found = {u.id: _parent_label(u) for u in User.query.filter(User.id.in_(ids)).all()}
+    else:
+        students = Student.query.options(joinedload(Student.parent)).filter(Student.id.in_(ids)).all()
+        found = {s.id: _student_label(s) for s in students}
+
+    # Keep the relevance order from the index
+    return jsonify([{'id': i, 'label': found[i]} for i in ids if i in found])
+
+
 # ==================== PASSWORD RESET ====================
 
 @admin_bp.route('/password-reset', methods=['GET', 'POST'])
@@ -508,6 +702,48 @@ def attendance_list():
     return render_template('admin/attendance_list.html', classes=classes, today=today)
 
 
+@admin_bp.route('/attendance/export')
+@admin_required
+def attendance_export():
+    """
+    Stream a students x days attendance register as CSV or XLSX.
+
+    Covers one class (`class_id`) or every class, for `date_from` to
+    `date_to` (default: the current month, at most MAX_EXPORT_DAYS days).
+    """
+    today = date.today()
+    start_date = _parse_date(request.args.get('date_from')) or today.replace(day=1)
+    end_date = _parse_date(request.args.get('date_to')) or today
+    if end_date < start_date or (end_date - start_date).days >= MAX_EXPORT_DAYS:
+        flash(f'Choose a date range of at most {MAX_EXPORT_DAYS} days.', 'danger')
+        return redirect(request.referrer or url_for('admin.attendance_list'))
+
+    classes = Classe.query.order_by(Classe.name)
+    class_id = request.args.get('class_id', type=int)
+    if class_id:
+        classes = classes.filter(Classe.id == class_id)
+    classes = [(classe.id, classe.name) for classe in classes]
+    if not classes:
+        abort(404)
+
+    days = date_range(start_date, end_date)
+    registers = ((name, class_register(classe_id, start_date, end_date)) for classe_id, name in classes)
+    filename = f"attendance_{classes[0][1] if class_id else 'all'}_{start_date}_{end_date}"
+
+    if request.args.get('format') == 'xlsx':
+        body = stream_xlsx(registers, days, [name for _, name in classes])
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        filename += '.xlsx'
+    else:
+        body = stream_csv(registers, days)
+        mimetype = 'text/csv; charset=utf-8'
+        filename += '.csv'
+
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    return response
+
+
 @admin_bp.route('/attendance/mark/<int:class_id>', methods=['GET', 'POST'])
 @admin_required
 def attendance_mark(class_id):
@@ -530,83 +766,88 @@ def attendance_mark(class_id):
         # Get all students in this class
         students = Student.query.filter_by(class_id=class_id).all()
         
-        # Get existing attendance records for this date
-        existing_attendance = {}
-        for record in Attendance.query.filter_by(class_id=class_id, date=attendance_date).all():
-            existing_attendance[record.student_id] = record.status
+        # Get existing attendance records for this date, and the sheet version
+        # they belong to so a later submit can tell if another admin saved since
+        existing_attendance = AttendanceService.day_statuses(attendance_date, class_id=class_id)
+        version = AttendanceService.sheet_version(class_id, attendance_date)
         
         return render_template('admin/attendance_mark.html', 
                              classe=classe, 
                              students=students,
                              attendance_date=attendance_date,
-                             existing_attendance=existing_attendance)
+                             existing_attendance=existing_attendance,
+                             selected=existing_attendance,
+                             version=version,
+                             conflicts={})
     
     elif request.method == 'POST':
         # Process attendance submission
-        from app.api.notifications import send_push_notification
-        
         attendance_date_str = request.form.get('attendance_date')
         try:
             attendance_date = datetime.strptime(attendance_date_str, '%Y-%m-%d').date()
         except:
             attendance_date = date.today()
         
-        students = Student.query.filter_by(class_id=class_id).all()
-        absent_students = []
-        
-        for student in students:
-            status = request.form.get(f'student_{student.id}', 'absent')
-            
-            # Check if attendance record already exists
-            existing = Attendance.query.filter_by(
-                student_id=student.id,
-                date=attendance_date
-            ).first()
-            
-            if existing:
-                # Update existing record
-                existing.status = status
-                existing.marked_by = current_user.id
-                existing.class_id = class_id
-                existing.updated_at = datetime.utcnow()
-            else:
-                # Create new record
-                attendance = Attendance(
-                    student_id=student.id,
-                    class_id=class_id,
-                    date=attendance_date,
-                    status=status,
-                    marked_by=current_user.id
-                )
-                db.session.add(attendance)
-            
-            # Track absent students for notifications
-            if status == 'absent':
-                absent_students.append(student)
-        
+        students = Student.query.options(joinedload(Student.parent)).filter_by(class_id=class_id).all()
+        statuses = {
+            student.id: request.form.get(f'student_{student.id}', 'absent')
+            for student in students
+        }
+
+        # The sheet the admin started from; a form loaded for another date
+        # saw nothing of this one
+        base_version = request.form.get('version', type=int)
+        base_statuses = {}
+        if request.form.get('sheet_date') == attendance_date.isoformat():
+            base_statuses = {
+                student.id: request.form.get(f'base_{student.id}')
+                for student in students if request.form.get(f'base_{student.id}')
+            }
+        elif base_version is not None:
+            base_version = 0
+
+        # Write the roster in one batch, merged with saves made since the form was loaded
+        result = AttendanceService.save_sheet(
+            class_id, attendance_date, statuses, current_user.id, base_version, base_statuses
+        )
+        if not result.saved:
+            db.session.rollback()
+            # Keep the admin's other changes and show the current sheet for the rest
+            selected = dict(result.statuses)
+            selected.update({
+                student_id: status for student_id, status in statuses.items()
+                if student_id not in result.conflicts and status != base_statuses.get(student_id)
+            })
+            flash(f'قام مشرف آخر بتعديل حضور {len(result.conflicts)} طالب في نفس الوقت. '
+                  'راجع الطلاب المحددين ثم احفظ مرة أخرى.', 'warning')
+            return render_template('admin/attendance_mark.html',
+                                 classe=classe,
+                                 students=students,
+                                 attendance_date=attendance_date,
+                                 existing_attendance=result.statuses,
+                                 selected=selected,
+                                 version=result.version,
+                                 conflicts=result.conflicts), 409
+
+        # Queue absence notifications; they are sent in the background
+        absent_students = [student for student in students if result.applied.get(student.id) == 'absent']
+        batch = NotificationService.create_batch(
+            'attendance', f'{classe.name} - {attendance_date.isoformat()}', created_by=current_user.id
+        )
+        queued = NotificationService.enqueue_absences(absent_students, attendance_date, batch)
+        if not queued:
+            NotificationService.discard_batch(batch)
+
+        # Save attendance and its notifications together
         db.session.commit()
-        
-        # Send notifications to parents of absent students
-        for student in absent_students:
-            parent = student.parent
-            if parent and parent.fcm_token:
-                try:
-                    send_push_notification(
-                        fcm_token=parent.fcm_token,
-                        title='تنبيه غياب',
-                        body=f'{student.full_name} غائب اليوم - {attendance_date.strftime("%Y-%m-%d")}',
-                        data={
-                            'type': 'attendance',
-                            'student_id': student.id,
-                            'status': 'absent',
-                            'date': attendance_date.isoformat()
-                        }
-                    )
-                except Exception as e:
-                    print(f'Error sending notification to parent {parent.id}: {e}')
-        
-        flash(f'تم حفظ الحضور بنجاح. تم إرسال {len(absent_students)} إشعار غياب.', 'success')
-        return redirect(url_for('admin.attendance_list'))
+
+        saved = 'تم دمج تعديلاتك مع حضور حفظه مشرف آخر.' if result.merged else 'تم حفظ الحضور بنجاح.'
+        if not queued:
+            flash(saved, 'success')
+            return redirect(url_for('admin.attendance_list'))
+        dispatcher.wake()
+        flash(f'{saved} جاري إرسال {queued} إشعار غياب.', 'success')
+        return redirect(url_for('admin.notifications_batch', id=batch.id))
 
 
 @admin_bp.route('/attendance/view/<int:class_id>')
@@ -639,14 +880,71 @@ def attendance_view(class_id):
             pass
     
     # Get attendance records for this class in date range
-    attendance_records = Attendance.query.filter(
+    attendance_records = Attendance.query.options(
+        joinedload(Attendance.student), joinedload(Attendance.admin)
+    ).filter(
         Attendance.class_id == class_id,
         Attendance.date >= start_date,
         Attendance.date <= end_date
     ).order_by(Attendance.date.desc()).all()
-    
+    archived = list(AttendanceService.compact_records(class_id=class_id, start_date=start_date, end_date=end_date))
+    if archived:
+        attendance_records += AttendanceService.with_related(archived)
+        attendance_records.sort(key=lambda record: record.date, reverse=True)
+
+    # Daily totals and per-student monthly rates come from the rollups
+    daily_totals = ClassDayAttendance.query.filter(
+        ClassDayAttendance.class_id == class_id,
+        ClassDayAttendance.date.between(start_date, end_date)
+    ).order_by(ClassDayAttendance.date.desc()).all()
+    present = sum(day.present for day in daily_totals)
+    total = sum(day.total for day in daily_totals)
+
+    students = Student.query.filter_by(class_id=class_id).order_by(Student.full_name).all()
+    month_range = (start_date.year * 12 + start_date.month, end_date.year * 12 + end_date.month)
+    student_rates = {}
+    for row in StudentMonthAttendance.query.filter(
+        StudentMonthAttendance.student_id.in_([student.id for student in students]),
+        (StudentMonthAttendance.year * 12 + StudentMonthAttendance.month).between(*month_range)
+    ):
+        counts = student_rates.setdefault(row.student_id, [0, 0])
+        counts[0] += row.present
+        counts[1] += row.total
+
     return render_template('admin/attendance_view.html',
                          classe=classe,
                          attendance_records=attendance_records,
+                         daily_totals=daily_totals,
+                         class_rate=round(100.0 * present / total, 1) if total else None,
+                         students=students,
+                         student_rates=student_rates,
                          start_date=start_date,
                          end_date=end_date)
+
+
+# ==================== NOTIFICATIONS ====================
+
+@admin_bp.route('/notifications')
+@admin_required
+def notifications_list():
+    """Recent notification batches with their delivery progress."""
+    batches, next_cursor, sort, order = _paginate(NotificationBatch.query, {
+        'newest': (NotificationBatch.id,),
+    }, 'newest', 'desc')
+    counts = NotificationService.status_counts([b.id for b in batches])
+    return render_template('admin/notifications/list.html', batches=batches, counts=counts,
+                           next_cursor=next_cursor, sort=sort, order=order)
+
+
+@admin_bp.route('/notifications/<int:id>')
+@admin_required
+def notifications_batch(id):
+    """Delivery status of each notification in a batch."""
+    batch = NotificationBatch.query.get_or_404(id)
+    notifications = batch.notifications.options(
+        joinedload(OutboxNotification.user)
+    ).order_by(OutboxNotification.id).all()
+    counts = NotificationService.status_counts([batch.id])[batch.id]
+    in_progress = counts.get('pending', 0) + counts.get('sending', 0)
+    return render_template('admin/notifications/batch.html', batch=batch, notifications=notifications,
+                           counts=counts, in_progress=in_progress)
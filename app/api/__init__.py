@@ -2,4 +2,4 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__)
 
-from . import auth, students, subjects, payments, pages, notifications
+from . import auth, students, subjects, payments, pages, notifications, parents, sync, attendance, admin
@@ -0,0 +1,202 @@
+from datetime import date
+from flask import jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models import Classe, Student
+from app.services.attendance_service import AttendanceService
+from app.services.notification_service import NotificationService, dispatcher
+from app.services.topic_service import class_topic
+from app.utils.decorators import jwt_admin_required
+from . import api_bp
+
+ATTENDANCE_STATUSES = ('present', 'absent')
+
+
+def _attendance_date(value):
+    """Parse an ISO date, defaulting to today. Returns None when invalid."""
+    if not value:
+        return date.today()
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@api_bp.route('/admin/classes/<int:class_id>/attendance', methods=['GET'])
+@jwt_required()
+@jwt_admin_required
+def get_class_attendance(class_id):
+    """
+    Get a class roster with each student's status on `date` (default
+    today), or null where none is recorded yet, and the sheet `version`
+    to send back when saving it.
+    """
+    classe = Classe.query.get(class_id)
+    if not classe:
+        return jsonify({'error': 'Class not found'}), 404
+
+    attendance_date = _attendance_date(request.args.get('date'))
+    if not attendance_date:
+        return jsonify({'error': 'Invalid date, expected YYYY-MM-DD'}), 400
+
+    students = Student.query.filter_by(class_id=class_id).order_by(Student.full_name).all()
+    statuses = AttendanceService.day_statuses(attendance_date, class_id=class_id)
+
+    return jsonify({
+        'class_id': class_id,
+        'class_name': classe.name,
+        'date': attendance_date.isoformat(),
+        'version': AttendanceService.sheet_version(class_id, attendance_date),
+        'students': [
+            {'id': s.id, 'full_name': s.full_name, 'status': statuses.get(s.id)}
+            for s in students
+        ]
+    }), 200
+
+
+@api_bp.route('/admin/classes/<int:class_id>/attendance', methods=['POST'])
+@jwt_required()
+@jwt_admin_required
+def mark_class_attendance(class_id):
+    """
+    Record a class's attendance for one day in a single request.
+
+    Body: {"date": "YYYY-MM-DD" (default today),
+           "statuses": {"<student_id>": "present" | "absent", ...},
+           "version": <sheet version the device loaded> (optional),
+           "base": {"<student_id>": status or null, ...} (optional)}
+
+    The whole batch is validated before anything is written, then saved
+    with one bulk upsert. Sending the same batch again leaves the same
+    result, so a device can safely retry after a dropped connection.
+    Absence notices go only to parents whose child was not already marked
+    absent that day.
+
+    With `version` (and the statuses it showed as `base`), a sheet that
+    another admin saved in the meantime is merged: only the students this
+    device changed are written. If both changed the same student to
+    different statuses nothing is written and 409 lists the conflicts with
+    the current sheet, to be resolved and sent again.
+    """
+    classe = Classe.query.get(class_id)
+    if not classe:
+        return jsonify({'error': 'Class not found'}), 404
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('statuses'), dict) or not data['statuses']:
+        return jsonify({'error': 'statuses must map student ids to "present" or "absent"'}), 400
+
+    attendance_date = _attendance_date(data.get('date'))
+    if not attendance_date:
+        return jsonify({'error': 'Invalid date, expected YYYY-MM-DD'}), 400
+
+    try:
+        statuses = {int(student_id): status for student_id, status in data['statuses'].items()}
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Student ids must be integers'}), 400
+    invalid = sorted(sid for sid, status in statuses.items() if status not in ATTENDANCE_STATUSES)
+    if invalid:
+        return jsonify({'error': 'Status must be "present" or "absent"', 'student_ids': invalid}), 400
+
+    base_version = data.get('version')
+    # bool is an int subclass; JSON true/false is not a version
+    if base_version is not None and (not isinstance(base_version, int) or isinstance(base_version, bool)
+                                     or base_version < 0):
+        return jsonify({'error': 'version must be a non-negative integer'}), 400
+    base = data.get('base') or {}
+    if not isinstance(base, dict):
+        return jsonify({'error': 'base must map student ids to statuses'}), 400
+    try:
+        base_statuses = {int(student_id): status for student_id, status in base.items() if status}
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Student ids must be integers'}), 400
+
+    students = Student.query.options(joinedload(Student.parent)).filter_by(class_id=class_id).all()
+    roster = {student.id: student for student in students}
+    unknown = sorted(set(statuses) - set(roster))
+    if unknown:
+        return jsonify({'error': 'Students are not in this class', 'student_ids': unknown}), 400
+
+    previous = AttendanceService.day_statuses(attendance_date, student_ids=statuses.keys())
+    admin_id = int(get_jwt_identity())
+    result = AttendanceService.save_sheet(
+        class_id, attendance_date, statuses, admin_id, base_version, base_statuses
+    )
+    if not result.saved:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Attendance was changed by another admin',
+            'version': result.version,
+            'conflicts': [
+                {'student_id': sid, 'current': current, 'submitted': submitted}
+                for sid, (current, submitted) in sorted(result.conflicts.items())
+            ],
+            'statuses': {str(sid): status for sid, status in result.statuses.items()}
+        }), 409
+
+    newly_absent = [
+        roster[sid] for sid, status in result.applied.items()
+        if status == 'absent' and previous.get(sid) != 'absent'
+    ]
+    batch = None
+    queued = 0
+    if newly_absent:
+        batch = NotificationService.create_batch(
+            'attendance', f'{classe.name} - {attendance_date.isoformat()}', created_by=admin_id
+        )
+        queued = NotificationService.enqueue_absences(newly_absent, attendance_date, batch)
+        if not queued:
+            NotificationService.discard_batch(batch)
+            batch = None
+
+    # Save attendance and its notifications together
+    db.session.commit()
+    if queued:
+        dispatcher.wake()
+
+    return jsonify({
+        'class_id': class_id,
+        'date': attendance_date.isoformat(),
+        'version': result.version,
+        'merged': result.merged,
+        'marked': len(result.applied),
+        'present': sum(1 for status in result.applied.values() if status == 'present'),
+        'absent': sum(1 for status in result.applied.values() if status == 'absent'),
+        'unmarked_student_ids': sorted(set(roster) - set(statuses)),
+        'notifications_queued': queued,
+        'notification_batch_id': batch.id if batch else None
+    }), 200
+
+
+@api_bp.route('/admin/classes/<int:class_id>/announcements', methods=['POST'])
+@jwt_required()
+@jwt_admin_required
+def announce_to_class(class_id):
+    """
+    Push an announcement to the parents of a class.
+
+    Body: {"title": "...", "body": "..."}
+
+    Queued for one send to the class's FCM topic, which every parent
+    device of the class follows, so the cost does not grow with the class
+    size.
+    """
+    classe = Classe.query.get(class_id)
+    if not classe:
+        return jsonify({'error': 'Class not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    title = (data.get('title') or '').strip()
+    body = (data.get('body') or '').strip()
+    if not title or not body:
+        return jsonify({'error': 'title and body are required'}), 400
+
+    notification = NotificationService.enqueue(None, 'announcement', title, body, data={
+        'type': 'announcement',
+        'class_id': str(class_id)
+    }, topic=class_topic(class_id))
+    db.session.commit()
+    dispatcher.wake()
+
+    return jsonify({'class_id': class_id, 'notification_id': notification.id}), 202
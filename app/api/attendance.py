@@ -0,0 +1,99 @@
+from datetime import date
+from itertools import islice
+from flask import jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import and_, or_
+from app.models import Attendance, StudentMonthAttendance
+from app.services.access_service import AccessService
+from app.services.attendance_service import AttendanceService
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.serializers import serialize_attendance
+from . import api_bp
+
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+
+
+@api_bp.route('/students/<int:student_id>/attendance', methods=['GET'])
+@jwt_required()
+def get_student_attendance_history(student_id):
+    """
+    Get a student's attendance history, newest first.
+
+    Uses keyset pagination on (date, id): pass the returned `next_cursor`
+    as `cursor` to fetch the following page. Page cost does not grow with
+    how far back the parent scrolls. Records of compacted class-days are
+    included as usual.
+    """
+    parent_id = int(get_jwt_identity())
+    if not AccessService.owns_student(parent_id, student_id):
+        return jsonify({'error': 'Student not found'}), 404
+
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+
+    query = Attendance.query.filter(Attendance.student_id == student_id)
+
+    cursor = request.args.get('cursor')
+    cursor_date = None
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            cursor_date = date.fromisoformat(cursor_date)
+            cursor_id = int(cursor_id)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(or_(
+            Attendance.date < cursor_date,
+            and_(Attendance.date == cursor_date, Attendance.id < cursor_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    records = query.order_by(Attendance.date.desc(), Attendance.id.desc()).limit(limit + 1).all()
+
+    # Older class-days may be compacted; merge in as many as could show on this page
+    archived = AttendanceService.compact_records(
+        student_ids=[student_id], end_date=cursor_date, newest_first=True
+    )
+    if cursor_date:
+        archived = (r for r in archived if (r.date, r.id) < (cursor_date, cursor_id))
+    records += islice(archived, limit + 1)
+    records = sorted(records, key=lambda r: (r.date, r.id), reverse=True)[:limit + 1]
+
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = records[-1]
+        next_cursor = encode_cursor(last.date.isoformat(), last.id)
+
+    return jsonify({
+        'records': serialize_attendance(records),
+        'next_cursor': next_cursor
+    }), 200
+
+
+@api_bp.route('/students/<int:student_id>/attendance/monthly', methods=['GET'])
+@jwt_required()
+def get_student_attendance_monthly(student_id):
+    """
+    Get a student's present/absent counts and attendance rate per month.
+
+    Covers the last `months` months (default 12, including the current one),
+    read from the student-month attendance rollup.
+    """
+    parent_id = int(get_jwt_identity())
+    if not AccessService.owns_student(parent_id, student_id):
+        return jsonify({'error': 'Student not found'}), 404
+
+    months = min(max(request.args.get('months', 12, type=int), 1), 120)
+    today = date.today()
+    first_month = today.year * 12 + today.month - months
+
+    # Read the pre-aggregated monthly rollup rather than raw attendance
+    rows = StudentMonthAttendance.query.filter(
+        StudentMonthAttendance.student_id == student_id,
+        StudentMonthAttendance.year * 12 + StudentMonthAttendance.month > first_month
+    ).order_by(StudentMonthAttendance.year.desc(), StudentMonthAttendance.month.desc()).all()
+
+    return jsonify([row.to_dict() for row in rows]), 200
@@ -5,12 +5,12 @@ from flask_jwt_extended import (
 )
 from datetime import datetime
 from app.models import User
+from app.services.device_service import DeviceService
 from . import api_bp
 
 
-@api_bp.route('/auth/login', methods=['POST'])
-def login():
-    """Parent login endpoint."""
+def _login(role, denied_message):
+    """Check the posted credentials of a `role` user and issue its tokens."""
     data = request.get_json()
 
     if not data:
@@ -30,8 +30,8 @@ def login():
     if not user.is_active:
         return jsonify({'error': 'Account is deactivated'}), 401
 
-    if user.role != 'parent':
-        return jsonify({'error': 'Access denied. Parents only.'}), 403
+    if user.role != role:
+        return jsonify({'error': denied_message}), 403
 
     access_token = create_access_token(identity=str(user.id))
     refresh_token = create_refresh_token(identity=str(user.id))
@@ -43,6 +43,18 @@ def login():
     }), 200
 
 
+@api_bp.route('/auth/login', methods=['POST'])
+def login():
+    """Parent login endpoint."""
+    return _login('parent', 'Access denied. Parents only.')
+
+
+@api_bp.route('/auth/admin/login', methods=['POST'])
+def admin_login():
+    """Admin login endpoint, for staff devices using the /api/admin routes."""
+    return _login('admin', 'Access denied. Admins only.')
+
+
 @api_bp.route('/auth/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
@@ -69,7 +81,12 @@ def get_current_user():
 @api_bp.route('/auth/fcm-token', methods=['POST'])
 @jwt_required()
 def update_fcm_token():
-    """Update user's FCM token for push notifications."""
+    """
+    Register this device's FCM token for push notifications.
+
+    A user can have several devices; each one calls this with its own
+    token (and optionally "platform") whenever the app starts.
+    """
     from app.extensions import db
 
     current_user_id = int(get_jwt_identity())
@@ -78,18 +95,37 @@ def update_fcm_token():
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
-    data = request.get_json()
+    data = request.get_json() or {}
     fcm_token = data.get('fcm_token')
 
     if not fcm_token:
         return jsonify({'error': 'FCM token is required'}), 400
 
-    user.fcm_token = fcm_token
+    DeviceService.register(user.id, fcm_token, data.get('platform'))
     db.session.commit()
 
     return jsonify({'message': 'FCM token updated successfully'}), 200
 
 
+@api_bp.route('/auth/fcm-token', methods=['DELETE'])
+@jwt_required()
+def delete_fcm_token():
+    """Unregister this device's FCM token, e.g. when signing out."""
+    from app.extensions import db
+
+    data = request.get_json(silent=True) or {}
+    fcm_token = data.get('fcm_token')
+
+    if not fcm_token:
+        return jsonify({'error': 'FCM token is required'}), 400
+
+    if not DeviceService.unregister(int(get_jwt_identity()), fcm_token):
+        return jsonify({'error': 'Device not found'}), 404
+    db.session.commit()
+
+    return jsonify({'message': 'FCM token removed successfully'}), 200
+
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """
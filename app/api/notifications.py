@@ -1,7 +1,12 @@
-from flask import jsonify, request
+from flask import Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import User, Student, Payment
-from app.services.firebase_service import FirebaseService
+from app.extensions import db
+from app.models import User, TokenAudit, UserDevice
+from app.services.device_service import DeviceService
+from app.services.notification_service import NotificationService, dispatcher
+from app.services.payment_reminder_service import PaymentReminderService
+from app.services.token_audit_service import TokenAuditService
+from app.services.topic_service import class_topic
 from app.utils.decorators import jwt_admin_required
 from . import api_bp
 
@@ -16,151 +21,98 @@ def send_test_notification():
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
-    if not user.fcm_token:
+    tokens = DeviceService.tokens_by_user([user.id]).get(user.id)
+    if not tokens:
         return jsonify({'error': 'User has no FCM token registered'}), 400
 
     data = request.get_json() or {}
     title = data.get('title', 'Test Notification')
     body = data.get('body', 'This is a test notification from KIA Academy')
 
-    result = FirebaseService.send_notification(
-        token=user.fcm_token,
-        title=title,
-        body=body,
-        data={'type': 'test'}
-    )
+    response = DeviceService.send_multicast(tokens, title, body, data={'type': 'test'})
+    db.session.commit()
 
-    if result:
+    message_ids = [result.message_id for result in response.responses if result.success]
+    if message_ids:
         return jsonify({
             'message': 'Test notification sent successfully',
-            'message_id': result
+            'message_id': message_ids[0],
+            'devices': len(tokens),
+            'delivered': len(message_ids)
         }), 200
     else:
         return jsonify({'error': 'Failed to send notification'}), 500
 
 
-@api_bp.route('/notifications/check-and-test-all', methods=['GET'])
-def check_and_test_all_fcm_tokens():
-    """Check all users with FCM tokens and send test notifications. Admin only."""
-
-    # Get all users with FCM tokens
-    users_with_tokens = User.query.filter(User.fcm_token.isnot(None)).all()
-    users_without_tokens = User.query.filter(User.fcm_token.is_(None)).all()
-
-    report = {
-        'total_users': User.query.count(),
-        'users_with_tokens': len(users_with_tokens),
-        'users_without_tokens': len(users_without_tokens),
-        'notifications_sent': 0,
-        'notifications_failed': 0,
-        'users_with_tokens_list': [],
-        'users_without_tokens_list': [],
-        'notification_results': []
-    }
-
-    # Build list of users with tokens
-    for user in users_with_tokens:
-        report['users_with_tokens_list'].append({
-            'id': user.id,
-            'email': user.email,
-            'full_name': user.full_name,
-            'role': user.role
-        })
-
-    # Build list of users without tokens
-    for user in users_without_tokens:
-        report['users_without_tokens_list'].append({
-            'id': user.id,
-            'email': user.email,
-            'full_name': user.full_name,
-            'role': user.role
-        })
-
-    # Send test notifications to users with tokens
-    title = "إشعار تجريبي - Test Notification"
-    body = "هذا إشعار تجريبي من أكاديمية كيا للتحقق من عمل النظام"
-
-    for user in users_with_tokens:
-        try:
-            result = FirebaseService.send_notification(
-                token=user.fcm_token,
-                title=title,
-                body=body,
-                data={
-                    'type': 'admin_test',
-                    'user_id': str(user.id)
-                }
-            )
-
-            if result:
-                report['notifications_sent'] += 1
-                report['notification_results'].append({
-                    'user_id': user.id,
-                    'email': user.email,
-                    'status': 'success',
-                    'message_id': result
-                })
-            else:
-                report['notifications_failed'] += 1
-                report['notification_results'].append({
-                    'user_id': user.id,
-                    'email': user.email,
-                    'status': 'failed',
-                    'error': 'Firebase returned None'
-                })
-        except Exception as e:
-            report['notifications_failed'] += 1
-            report['notification_results'].append({
-                'user_id': user.id,
-                'email': user.email,
-                'status': 'error',
-                'error': str(e)
-            })
-
-    return jsonify(report), 200
+@api_bp.route('/notifications/audits', methods=['POST'])
+@jwt_required()
+@jwt_admin_required
+def start_token_audit():
+    """
+    Queue a background check of every FCM token: a test push to each
+    registered device. It stays pending until the notification worker or
+    the scheduled `flask notifications audit-tokens` picks it up. Poll
+    GET /notifications/audits/<id> for progress, then fetch the report.
+    """
+    active = TokenAuditService.active()
+    if active:
+        return jsonify({'error': 'An audit is already running', 'audit': active.to_dict()}), 409
 
+    audit = TokenAuditService.start(created_by=int(get_jwt_identity()))
+    return jsonify(audit.to_dict()), 202
 
-def send_payment_reminder(payment_id):
-    """Send payment reminder notification to parent."""
-    from app.extensions import db
 
-    payment = Payment.query.get(payment_id)
-    if not payment:
-        print(f"Payment {payment_id} not found")
-        return False
+@api_bp.route('/notifications/audits/<int:audit_id>', methods=['GET'])
+@jwt_required()
+@jwt_admin_required
+def get_token_audit(audit_id):
+    """Get an audit's status and counters."""
+    audit = TokenAudit.query.get(audit_id)
+    if not audit:
+        return jsonify({'error': 'Audit not found'}), 404
+    return jsonify(audit.to_dict()), 200
 
-    student = Student.query.get(payment.student_id)
-    if not student:
-        print(f"Student {payment.student_id} not found")
-        return False
 
-    parent = User.query.get(student.parent_id)
-    if not parent or not parent.fcm_token:
-        print(f"Parent not found or no FCM token for student {student.id}")
-        return False
+@api_bp.route('/notifications/audits/<int:audit_id>/report', methods=['GET'])
+@jwt_required()
+@jwt_admin_required
+def download_token_audit_report(audit_id):
+    """Download an audit's per-user results as CSV; partial while it is still running."""
+    audit = TokenAudit.query.get(audit_id)
+    if not audit:
+        return jsonify({'error': 'Audit not found'}), 404
 
-    title = "تذكير بالدفع - Payment Reminder"
-    body = f"مستحق دفع {payment.amount} ريال للطالب {student.full_name}"
+    response = Response(stream_with_context(TokenAuditService.stream_report(audit.id)),
+                        mimetype='text/csv; charset=utf-8')
+    response.headers['Content-Disposition'] = f'attachment; filename=token_audit_{audit.id}.csv'
+    return response
 
-    result = FirebaseService.send_notification(
-        token=parent.fcm_token,
-        title=title,
-        body=body,
-        data={
-            'type': 'payment_reminder',
-            'payment_id': str(payment.id),
-            'student_id': str(student.id),
-            'amount': str(payment.amount),
-        }
-    )
 
-    return result is not None
+# The helpers below queue their notification in the outbox and wake the
+# dispatcher; see NotificationService for deduplication, rate limits and
+# digests. Each returns True if a notification was queued.
+
+def send_payment_reminder(payment_id):
+    """
+    Queue a payment reminder to the parent now, whatever its due date.
+    Scheduled reminders come from `flask payments send-reminders`.
+    """
+    rows = PaymentReminderService.due_payments(payment_ids=[payment_id])
+    if not rows:
+        print(f"Payment {payment_id} not found, paid, or its parent has no FCM token")
+        return False
+
+    parents, _ = PaymentReminderService.enqueue(rows)
+    if not parents:
+        return False
+    db.session.commit()
+    dispatcher.wake()
+    return True
 
 
 def send_new_material_notification(material_id):
-    """Send notification about new educational material."""
-    from app.models import Material, Subject, Student
-    from app.extensions import db
+    """Queue a notice about new educational material to the class topic."""
+    from app.models import Material, Subject
 
     material = Material.query.get(material_id)
     if not material:
@@ -172,27 +124,12 @@ def send_new_material_notification(material_id):
         print(f"Subject {material.subject_id} not found")
         return False
 
-    # Get all students in this class
-    students = Student.query.filter_by(class_id=subject.class_id).all()
-
-    # Get unique parents
-    parent_ids = list(set([s.parent_id for s in students]))
-    parents = User.query.filter(
-        User.id.in_(parent_ids),
-        User.fcm_token.isnot(None)
-    ).all()
-
-    if not parents:
-        print(f"No parents with FCM tokens found for class {subject.class_id}")
-        return False
-
     title = "محتوى تعليمي جديد - New Material"
     body = f"تم إضافة محتوى جديد: {material.title} في مادة {subject.name}"
 
-    tokens = [p.fcm_token for p in parents]
-
-    result = FirebaseService.send_multicast_notification(
-        tokens=tokens,
+    # One send to the class topic reaches every parent device in the class
+    notification = NotificationService.enqueue(
+        None, 'new_material',
         title=title,
         body=body,
         data={
@@ -200,56 +137,70 @@ def send_new_material_notification(material_id):
             'material_id': str(material.id),
             'subject_id': str(subject.id),
             'subject_name': subject.name,
-        }
+        },
+        idempotency_key=f'new_material:{material.id}',
+        topic=class_topic(subject.class_id)
     )
-
-    return result is not None
+    return _commit_and_wake(notification)
 
 
 def send_welcome_notification(user_id):
-    """Send welcome notification to new parent."""
+    """Queue a welcome notification to a new parent, once."""
     user = User.query.get(user_id)
-    if not user or not user.fcm_token:
+    if not user or not DeviceService.user_ids_with_devices([user_id]):
         print(f"User {user_id} not found or no FCM token")
         return False
 
     title = "مرحباً بك في أكاديمية كيا - Welcome to KIA"
     body = f"أهلاً {user.full_name}! نحن سعداء بانضمامك إلى أكاديمية كيا الدولية"
 
-    result = FirebaseService.send_notification(
-        token=user.fcm_token,
+    notification = NotificationService.enqueue(
+        user.id, 'welcome',
         title=title,
         body=body,
         data={
             'type': 'welcome',
-        }
+        },
+        idempotency_key=f'welcome:{user.id}'
     )
-
-    return result is not None
+    return _commit_and_wake(notification)
 
 
 def send_push_notification(fcm_token, title, body, data=None):
     """
-    Send a push notification to a specific FCM token.
+    Queue a push notification to the user of a specific FCM token. It
+    reaches all of that user's devices.
 
     Args:
-        fcm_token: The FCM token to send to
+        fcm_token: The FCM token of a registered device
         title: Notification title
         body: Notification body
         data: Optional dictionary of data to send with notification
 
     Returns:
-        True if successful, False otherwise
+        True if queued, False otherwise
     """
     if not fcm_token:
         print("No FCM token provided")
         return False
 
-    result = FirebaseService.send_notification(
-        token=fcm_token,
+    device = UserDevice.query.filter_by(token=fcm_token).first()
+    if not device:
+        print("FCM token is not registered")
+        return False
+
+    notification = NotificationService.enqueue(
+        device.user_id, 'push',
         title=title,
         body=body,
-        data=data or {}
+        data=data
     )
+    return _commit_and_wake(notification)
 
-    return result is not None
+
+def _commit_and_wake(notification):
+    if notification is None:
+        return False
+    db.session.commit()
+    dispatcher.wake()
+    return True
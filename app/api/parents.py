@@ -0,0 +1,80 @@
+from flask import Response, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.extensions import db
+from app.models import User, Student, Subject
+from app.services.event_service import event_broker
+from app.utils.conditional import conditional_json
+from app.utils.serializers import serialize_subjects
+from .students import serialize_students_with_attendance
+from .payments import build_payments_summary
+from . import api_bp
+
+
+@api_bp.route('/parents/me/home', methods=['GET'])
+@jwt_required()
+def get_parent_home():
+    """
+    Get everything the app's home screen needs in one round trip.
+
+    Bundles the parent profile, children with today's attendance, the
+    payment summary and each child's subjects. Runs a fixed number of
+    queries regardless of how many children the parent has, and answers
+    304 when the bundle is unchanged since the client's ETag.
+    """
+    parent_id = int(get_jwt_identity())
+    user = User.query.get(parent_id)
+
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    students = Student.query.filter_by(parent_id=parent_id).all()
+
+    # Fetch subjects for all children's classes at once
+    class_ids = {s.class_id for s in students if s.class_id}
+    subjects_by_class = {class_id: [] for class_id in class_ids}
+    if class_ids:
+        subjects = Subject.query.filter(Subject.class_id.in_(class_ids)).order_by(Subject.id).all()
+        for subject_dict in serialize_subjects(subjects):
+            subjects_by_class[subject_dict['class_id']].append(subject_dict)
+
+    children = serialize_students_with_attendance(students)
+    for child in children:
+        child['subjects'] = subjects_by_class.get(child['class_id'], [])
+
+    return conditional_json({
+        'user': user.to_dict(),
+        'students': children,
+        'payments_summary': build_payments_summary(students)
+    })
+
+
+@api_bp.route('/parents/me/events', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def get_parent_events():
+    """
+    Stream the parent's attendance updates as Server-Sent Events.
+
+    EventSource cannot set headers, so the access token may also be passed
+    as `?jwt=`. The stream opens with a `students` event (the children with
+    today's attendance, as GET /api/students), then sends an `attendance`
+    event whenever a child is marked. It ends when the token expires, and
+    the client reconnects with a fresh one.
+    """
+    parent_id = int(get_jwt_identity())
+    # Subscribe before reading the snapshot so no update falls in between
+    subscription = event_broker.subscribe(parent_id)
+
+    students = Student.query.filter_by(parent_id=parent_id).all()
+    snapshot = serialize_students_with_attendance(students)
+    # Idle streams must not hold a database connection
+    db.session.remove()
+
+    response = Response(
+        event_broker.stream(parent_id, subscription, [('students', snapshot)], until=get_jwt()['exp']),
+        mimetype='text/event-stream'
+    )
+    response.call_on_close(lambda: event_broker.unsubscribe(parent_id, subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,11 +1,35 @@
 from flask import jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Payment, Student
+from sqlalchemy import select
+from app.models import Payment, Student, Classe
+from app.utils.conditional import etag_from_version, table_version, fetch_version
+from app.utils.serializers import serialize_students
 from . import api_bp
 
 
+def _student_payments_version(student_id):
+    parent_id = int(get_jwt_identity())
+    version = fetch_version(
+        *table_version(Student, Student.id == student_id, Student.parent_id == parent_id),
+        *table_version(Payment, Payment.student_id == student_id),
+    )
+    # Unknown or foreign student: let the view answer 404
+    return (parent_id,) + version if version[0] else None
+
+
+def _payments_summary_version():
+    parent_id = int(get_jwt_identity())
+    own_students = Student.parent_id == parent_id
+    return (parent_id,) + fetch_version(
+        *table_version(Student, own_students),
+        *table_version(Classe, Classe.id.in_(select(Student.class_id).where(own_students))),
+        *table_version(Payment, Payment.student_id.in_(select(Student.id).where(own_students))),
+    )
+
+
 @api_bp.route('/students/<int:student_id>/payments', methods=['GET'])
 @jwt_required()
+@etag_from_version(_student_payments_version)
 def get_student_payments(student_id):
     """Get all payments for a student."""
     parent_id = int(get_jwt_identity())
@@ -17,65 +41,65 @@ def get_student_payments(student_id):
 
     payments = Payment.query.filter_by(student_id=student_id).order_by(Payment.due_date.desc()).all()
 
-    # Calculate summary
-    total_due = sum(p.amount for p in payments if not p.is_paid)
-    total_paid = sum(p.amount for p in payments if p.is_paid)
-    next_payment = Payment.query.filter_by(
-        student_id=student_id,
-        is_paid=False
-    ).order_by(Payment.due_date).first()
+    # Calculate summary in SQL
+    total_due, total_paid, _ = Payment.totals_by_student([student_id]).get(student_id, (0, 0, 0))
+    next_payment = Payment.next_due_by_student([student_id]).get(student_id)
 
     return jsonify({
-        'payments': [payment.to_dict() for payment in payments],
+        'payments': [payment.to_dict(student_name=student.full_name) for payment in payments],
         'summary': {
-            'total_due': total_due,
-            'total_paid': total_paid,
-            'next_payment': next_payment.to_dict() if next_payment else None
+            'total_due': float(total_due),
+            'total_paid': float(total_paid),
+            'next_payment': next_payment.to_dict(student_name=student.full_name) if next_payment else None
         }
     }), 200
 
 
-@api_bp.route('/payments/summary', methods=['GET'])
-@jwt_required()
-def get_payments_summary():
-    """Get payment summary for all children of the parent."""
-    parent_id = int(get_jwt_identity())
-
-    students = Student.query.filter_by(parent_id=parent_id).all()
+def build_payments_summary(students):
+    """Build the payment summary for a parent's children from grouped SQL aggregates."""
     student_ids = [s.id for s in students]
 
     if not student_ids:
-        return jsonify({
+        return {
             'total_due': 0,
             'total_paid': 0,
             'pending_count': 0,
             'children_summary': []
-        }), 200
+        }
 
-    all_payments = Payment.query.filter(Payment.student_id.in_(student_ids)).all()
+    totals = Payment.totals_by_student(student_ids)
+    next_payments = Payment.next_due_by_student(student_ids)
 
-    total_due = sum(p.amount for p in all_payments if not p.is_paid)
-    total_paid = sum(p.amount for p in all_payments if p.is_paid)
-    pending_count = sum(1 for p in all_payments if not p.is_paid)
+    total_due = sum(t[0] for t in totals.values())
+    total_paid = sum(t[1] for t in totals.values())
+    pending_count = sum(t[2] for t in totals.values())
 
     # Summary per child
     children_summary = []
-    for student in students:
-        student_payments = [p for p in all_payments if p.student_id == student.id]
-        next_payment = next(
-            (p for p in sorted(student_payments, key=lambda x: x.due_date) if not p.is_paid),
-            None
-        )
+    for student, student_dict in zip(students, serialize_students(students)):
+        child_due, child_paid, _ = totals.get(student.id, (0, 0, 0))
+        next_payment = next_payments.get(student.id)
         children_summary.append({
-            'student': student.to_dict(),
-            'total_due': sum(p.amount for p in student_payments if not p.is_paid),
-            'total_paid': sum(p.amount for p in student_payments if p.is_paid),
-            'next_payment': next_payment.to_dict() if next_payment else None
+            'student': student_dict,
+            'total_due': float(child_due),
+            'total_paid': float(child_paid),
+            'next_payment': next_payment.to_dict(student_name=student.full_name) if next_payment else None
         })
 
-    return jsonify({
-        'total_due': total_due,
-        'total_paid': total_paid,
+    return {
+        'total_due': float(total_due),
+        'total_paid': float(total_paid),
         'pending_count': pending_count,
         'children_summary': children_summary
-    }), 200
+    }
+
+
+@api_bp.route('/payments/summary', methods=['GET'])
+@jwt_required()
+@etag_from_version(_payments_summary_version)
+def get_payments_summary():
+    """Get payment summary for all children of the parent."""
+    parent_id = int(get_jwt_identity())
+    students = Student.query.filter_by(parent_id=parent_id).all()
+
+    return jsonify(build_payments_summary(students)), 200
@@ -1,19 +1,58 @@
+from datetime import date
 from flask import jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Student, Subject
+from sqlalchemy import select
+from app.models import Student, Subject, Material, Classe, Attendance
+from app.services.cache_service import response_cache, class_subjects_key
+from app.utils.conditional import etag_from_version, table_version, fetch_version
+from app.utils.serializers import serialize_students, serialize_subjects
 from . import api_bp
 
 
-@api_bp.route('/students', methods=['GET'])
-@jwt_required()
-def get_students():
-    """Get all children of the current parent with today's attendance status."""
-    from datetime import date
-    from app.models import Attendance
+def _students_version():
+    parent_id = int(get_jwt_identity())
+    today = date.today()
+    own_students = Student.parent_id == parent_id
+    return (parent_id, today.isoformat()) + fetch_version(
+        *table_version(Student, own_students),
+        *table_version(Classe, Classe.id.in_(select(Student.class_id).where(own_students))),
+        *table_version(Attendance,
+                       Attendance.student_id.in_(select(Student.id).where(own_students)),
+                       Attendance.date == today),
+    )
 
+
+def _student_version(id):
     parent_id = int(get_jwt_identity())
-    students = Student.query.filter_by(parent_id=parent_id).all()
+    own_student = (Student.id == id, Student.parent_id == parent_id)
+    class_id = select(Student.class_id).where(*own_student).scalar_subquery()
+    version = fetch_version(
+        *table_version(Student, *own_student),
+        *table_version(Classe, Classe.id == class_id),
+    )
+    # Unknown or foreign student: let the view answer 404
+    return (parent_id,) + version if version[0] else None
+
 
+def _student_subjects_version(id):
+    parent_id = int(get_jwt_identity())
+    class_id = select(Student.class_id).where(
+        Student.id == id, Student.parent_id == parent_id
+    ).scalar_subquery()
+    version = fetch_version(
+        class_id,
+        *table_version(Classe, Classe.id == class_id),
+        *table_version(Subject, Subject.class_id == class_id),
+        *table_version(Material, Material.subject_id.in_(
+            select(Subject.id).where(Subject.class_id == class_id)
+        )),
+    )
+    # Unknown, foreign or unassigned student: let the view answer the error
+    return (parent_id,) + version if version[0] else None
+
+
+def serialize_students_with_attendance(students):
+    """Serialize students with today's attendance status in a fixed number of queries."""
     # Get today's date
     today = date.today()
 
@@ -29,22 +68,31 @@ def get_students():
             today_attendance[record.student_id] = record.status
 
     # Add attendance status to each student dict
-    result = []
-    for student in students:
-        student_dict = student.to_dict()
-        student_dict['today_attendance'] = today_attendance.get(student.id, 'not_marked')
-        result.append(student_dict)
+    result = serialize_students(students)
+    for student_dict in result:
+        student_dict['today_attendance'] = today_attendance.get(student_dict['id'], 'not_marked')
+
+    return result
 
-    return jsonify(result), 200
+
+@api_bp.route('/students', methods=['GET'])
+@jwt_required()
+@etag_from_version(_students_version)
+def get_students():
+    """Get all children of the current parent with today's attendance status."""
+    parent_id = int(get_jwt_identity())
+    students = Student.query.filter_by(parent_id=parent_id).all()
+
+    return jsonify(serialize_students_with_attendance(students)), 200
 
 
 @api_bp.route('/students/<int:id>', methods=['GET'])
 @jwt_required()
+@etag_from_version(_student_version)
 def get_student(id):
     """Get a single child by ID."""
     parent_id = int(get_jwt_identity())
     student = Student.query.filter_by(id=id, parent_id=parent_id).first()
-
     if not student:
         return jsonify({'error': 'Student not found'}), 404
 
@@ -53,29 +101,30 @@ def get_student(id):
 
 @api_bp.route('/students/<int:id>/subjects', methods=['GET'])
 @jwt_required()
+@etag_from_version(_student_subjects_version)
 def get_student_subjects(id):
     """Get all subjects for a student's class."""
     parent_id = int(get_jwt_identity())
     student = Student.query.filter_by(id=id, parent_id=parent_id).first()
-
     if not student:
         return jsonify({'error': 'Student not found'}), 404
 
     if not student.class_id:
         return jsonify({'error': 'Student is not assigned to a class'}), 400
 
-    subjects = Subject.query.filter_by(class_id=student.class_id).all()
+    # Identical for every parent with a child in the class
+    class_id = student.class_id
+    payload = response_cache.get_or_set(class_subjects_key(class_id), lambda: serialize_subjects(
+        Subject.query.filter_by(class_id=class_id).all()
+    ))
 
-    return jsonify([subject.to_dict() for subject in subjects]), 200
+    return jsonify(payload), 200
 
 
 @api_bp.route('/students/<int:student_id>/attendance/today', methods=['GET'])
 @jwt_required()
 def get_student_attendance_today(student_id):
     """Get today's attendance status for a specific student"""
-    from datetime import date
-    from app.models import Attendance
-    
     current_user_id = int(get_jwt_identity())
     student = Student.query.get_or_404(student_id)
     
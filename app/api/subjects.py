@@ -1,34 +1,57 @@
 from flask import jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Subject, Material, Student
+from sqlalchemy import select
+from app.models import Subject, Material, Classe
+from app.services.access_service import AccessService
+from app.services.cache_service import response_cache, subject_materials_key
+from app.utils.conditional import etag_from_version, table_version, fetch_version
+from app.utils.serializers import serialize_subjects, serialize_materials
 from . import api_bp
 
 
+def _subject_version(id):
+    parent_id = int(get_jwt_identity())
+    class_ids = AccessService.for_parent(parent_id).class_ids
+    version = fetch_version(
+        *table_version(Subject, Subject.id == id, Subject.class_id.in_(class_ids)),
+        *table_version(Classe, Classe.id == select(Subject.class_id).where(Subject.id == id).scalar_subquery()),
+        *table_version(Material, Material.subject_id == id),
+    )
+    # Unknown subject or no child in its class: let the view answer the error
+    return (parent_id,) + version if version[0] else None
+
+
+def _subject_materials_version(id):
+    parent_id = int(get_jwt_identity())
+    class_ids = AccessService.for_parent(parent_id).class_ids
+    version = fetch_version(
+        *table_version(Subject, Subject.id == id, Subject.class_id.in_(class_ids)),
+        *table_version(Material, Material.subject_id == id),
+    )
+    return (parent_id,) + version if version[0] else None
+
+
 @api_bp.route('/subjects/<int:id>', methods=['GET'])
 @jwt_required()
+@etag_from_version(_subject_version)
 def get_subject(id):
     """Get a subject by ID."""
     parent_id = int(get_jwt_identity())
 
-    # Verify the parent has a child in the subject's class
     subject = Subject.query.get(id)
     if not subject:
         return jsonify({'error': 'Subject not found'}), 404
 
     # Check if parent has a child in this class
-    has_child = Student.query.filter_by(
-        parent_id=parent_id,
-        class_id=subject.class_id
-    ).first()
-
-    if not has_child:
+    if not AccessService.has_child_in_class(parent_id, subject.class_id):
         return jsonify({'error': 'Access denied'}), 403
 
-    return jsonify(subject.to_dict()), 200
+    return jsonify(serialize_subjects([subject])[0]), 200
 
 
 @api_bp.route('/subjects/<int:id>/materials', methods=['GET'])
 @jwt_required()
+@etag_from_version(_subject_materials_version)
 def get_subject_materials(id):
     """Get all materials for a subject."""
     parent_id = int(get_jwt_identity())
@@ -38,14 +61,12 @@ def get_subject_materials(id):
         return jsonify({'error': 'Subject not found'}), 404
 
     # Check if parent has a child in this class
-    has_child = Student.query.filter_by(
-        parent_id=parent_id,
-        class_id=subject.class_id
-    ).first()
-
-    if not has_child:
+    if not AccessService.has_child_in_class(parent_id, subject.class_id):
         return jsonify({'error': 'Access denied'}), 403
 
-    materials = Material.query.filter_by(subject_id=id).order_by(Material.order_index).all()
+    # Identical for every parent with a child in the class
+    payload = response_cache.get_or_set(subject_materials_key(id), lambda: serialize_materials(
+        Material.query.filter_by(subject_id=id).order_by(Material.order_index).all()
+    ))
 
-    return jsonify([material.to_dict() for material in materials]), 200
+    return jsonify(payload), 200
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from flask import jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select, or_, true
+from app.models import Student, Subject, Material, Payment, Attendance, Tombstone
+from app.services.attendance_service import AttendanceService
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.serializers import (serialize_students, serialize_subjects, serialize_materials,
+                                   serialize_payments, serialize_attendance)
+from . import api_bp
+
+# Rows committed while a sync request was running can carry an updated_at
+# slightly older than the cursor it returned, so each sync re-reads this
+# window. Clients apply rows as upserts, so the overlap is harmless.
+SYNC_CURSOR_OVERLAP = timedelta(seconds=5)
+
+
+def _changed_since(column, window):
+    return column > window if window is not None else true()
+
+
+@api_bp.route('/sync', methods=['GET'])
+@jwt_required()
+def sync():
+    """
+    Get the parent's rows created, updated or deleted since a sync cursor.
+
+    Without `since` a full snapshot is returned, as it is when one of the
+    parent's children has changed class or been moved to them since; `full`
+    tells clients to replace their local data. Every response carries a
+    new opaque `cursor` to pass as `since` next time, and deletions are
+    reported in `deleted` as (entity, id) tombstones. A child moved to
+    another parent is reported deleted; clients drop its payments and
+    attendance with it. Subjects and materials of the class of a newly
+    added child are sent in full.
+    """
+    parent_id = int(get_jwt_identity())
+
+    since = None
+    cursor = request.args.get('since')
+    if cursor:
+        try:
+            since = datetime.fromisoformat(decode_cursor(cursor)[0])
+        except (ValueError, IndexError, TypeError):
+            return jsonify({'error': 'Invalid sync cursor'}), 400
+
+    synced_at = datetime.utcnow()
+    window = since - SYNC_CURSOR_OVERLAP if since else None
+
+    students = Student.query.filter_by(parent_id=parent_id).all()
+    if window is not None and any(s.moved_at and s.moved_at > window for s in students):
+        # Rows of the old class or parent would be left behind by a delta
+        window = None
+    student_ids = [s.id for s in students]
+    class_ids = {s.class_id for s in students if s.class_id}
+
+    changed_students = [
+        s for s in students
+        if window is None or (s.updated_at or s.created_at) > window
+    ]
+    # Classes that became visible through a changed student are resent in full
+    new_class_ids = {s.class_id for s in changed_students if s.class_id}
+
+    subjects = Subject.query.filter(
+        Subject.class_id.in_(class_ids),
+        or_(_changed_since(Subject.updated_at, window), Subject.class_id.in_(new_class_ids))
+    ).order_by(Subject.id).all()
+
+    visible_subject_ids = select(Subject.id).where(Subject.class_id.in_(class_ids))
+    new_subject_ids = select(Subject.id).where(Subject.class_id.in_(new_class_ids))
+    materials = Material.query.filter(
+        Material.subject_id.in_(visible_subject_ids),
+        or_(_changed_since(Material.updated_at, window), Material.subject_id.in_(new_subject_ids))
+    ).order_by(Material.subject_id, Material.order_index).all()
+
+    payments = Payment.query.filter(
+        Payment.student_id.in_(student_ids),
+        _changed_since(Payment.updated_at, window)
+    ).order_by(Payment.due_date.desc()).all()
+
+    attendance = Attendance.query.filter(
+        Attendance.student_id.in_(student_ids),
+        _changed_since(Attendance.updated_at, window)
+    ).order_by(Attendance.date.desc()).all()
+    if window is None:
+        # Compacted class-days are old and unchanged, so only snapshots need them
+        attendance += AttendanceService.compact_records(student_ids=student_ids, newest_first=True)
+        attendance.sort(key=lambda r: r.date, reverse=True)
+
+    deleted = []
+    if window is not None:
+        deleted = Tombstone.query.filter(
+            Tombstone.deleted_at > window,
+            or_(
+                Tombstone.parent_id == parent_id,
+                Tombstone.student_id.in_(student_ids),
+                Tombstone.class_id.in_(class_ids),
+                Tombstone.subject_id.in_(visible_subject_ids)
+            )
+        ).order_by(Tombstone.deleted_at).all()
+
+    return jsonify({
+        'cursor': encode_cursor(synced_at.isoformat()),
+        'full': window is None,
+        'students': serialize_students(changed_students),
+        'subjects': serialize_subjects(subjects),
+        'materials': serialize_materials(materials),
+        'payments': serialize_payments(payments),
+        'attendance': serialize_attendance(attendance),
+        'deleted': [t.to_dict() for t in deleted]
+    }), 200
@@ -0,0 +1,174 @@
+import time
+from datetime import date, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.extensions import db
+from app.models import TokenAudit
+from app.services.attendance_service import AttendanceService
+from app.services.notification_service import NotificationService
+from app.services.payment_reminder_service import PaymentReminderService
+from app.services.search_service import SearchService
+from app.services.token_audit_service import TokenAuditService
+from app.services.topic_service import TopicService
+
+notifications_cli = AppGroup('notifications', help='Push notification outbox.')
+attendance_cli = AppGroup('attendance', help='Attendance maintenance.')
+payments_cli = AppGroup('payments', help='Payment reminders.')
+search_cli = AppGroup('search', help='Student and parent search index.')
+
+
+@notifications_cli.command('dispatch')
+@click.option('--batch-size', default=50, show_default=True, help='Notifications claimed per round.')
+def dispatch_notifications(batch_size):
+    """Send every notification that is currently due, then exit."""
+    click.echo(f'Processed {_dispatch_all(batch_size)} notifications.')
+
+
+def _dispatch_all(batch_size):
+    total = 0
+    while True:
+        processed = NotificationService.dispatch_due(batch_size=batch_size)
+        if not processed:
+            return total
+        total += processed
+
+
+@notifications_cli.command('worker')
+@click.option('--batch-size', default=50, show_default=True, help='Notifications claimed per round.')
+@click.option('--interval', default=5.0, show_default=True, help='Seconds to sleep when the outbox is idle.')
+def notification_worker(batch_size, interval):
+    """Keep sending due notifications, and running queued token audits, until interrupted."""
+    click.echo('Notification worker started.')
+    while True:
+        try:
+            if NotificationService.dispatch_due(batch_size=batch_size):
+                continue
+            for audit in TokenAuditService.run_pending():
+                _echo_audit(audit)
+        except Exception as e:
+            click.echo(f'Error dispatching notifications: {e}', err=True)
+            db.session.rollback()
+        time.sleep(interval)
+
+
+@notifications_cli.command('sync-topics')
+def sync_topics():
+    """
+    Subscribe every registered device to the topics of its user's classes.
+
+    Repairs subscriptions lost to failed FCM calls and covers devices
+    registered before class topics existed. FCM cannot list a topic's
+    members, so stale subscriptions are only removed as data changes.
+    """
+    changes = {
+        (topic, token): True
+        for topic, tokens in TopicService.subscriptions().items() for token in tokens
+    }
+    failures = TopicService.apply(changes)
+    click.echo(f'Subscribed {len(changes) - failures} of {len(changes)} device topic subscriptions.')
+
+
+@notifications_cli.command('audit-tokens')
+@click.option('--new', 'queue_new', is_flag=True, help='Queue an audit first instead of only running queued ones.')
+def audit_tokens(queue_new):
+    """
+    Run the token audits queued from the API: a test push to every
+    registered device, recording the results. Meant to run on a schedule
+    when no notification worker is running.
+    """
+    if queue_new:
+        db.session.add(TokenAudit(status='pending'))
+        db.session.commit()
+    audits = TokenAuditService.run_pending()
+    for audit in audits:
+        _echo_audit(audit)
+    if not audits:
+        click.echo('No audits queued.')
+
+
+def _echo_audit(audit):
+    click.echo(f'Audit {audit.id} {audit.status}: {audit.sent} sent, {audit.failed} failed, '
+               f'{audit.pruned} devices removed, {audit.users_without_devices} users without a device.')
+
+
+@attendance_cli.command('rebuild-rollups')
+def rebuild_attendance_rollups():
+    """Recompute the class-day and student-month rollups from raw attendance."""
+    AttendanceService.rebuild_rollups()
+    db.session.commit()
+    click.echo('Attendance rollups rebuilt.')
+
+
+@attendance_cli.command('compact')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Pack class-days before this date [default: ATTENDANCE_COMPACT_AFTER_DAYS ago].')
+@click.option('--batch-size', default=500, show_default=True, help='Class-days packed per transaction.')
+def compact_attendance(before, batch_size):
+    """Move old class-days from attendance rows into compact rows."""
+    if before:
+        before = before.date()
+    else:
+        before = date.today() - timedelta(days=current_app.config.get('ATTENDANCE_COMPACT_AFTER_DAYS', 180))
+    total = 0
+    while True:
+        packed = AttendanceService.compact(before, limit=batch_size)
+        db.session.commit()
+        if not packed:
+            break
+        total += packed
+    click.echo(f'Compacted {total} class-days before {before.isoformat()}.')
+
+
+@attendance_cli.command('expand')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Only unpack class-days from this date on [default: all].')
+@click.option('--batch-size', default=500, show_default=True, help='Class-days unpacked per transaction.')
+def expand_attendance(since, batch_size):
+    """Move compact class-days back into attendance rows (reverses `compact`)."""
+    since = since.date() if since else None
+    total = 0
+    while True:
+        unpacked = AttendanceService.expand(since, limit=batch_size)
+        db.session.commit()
+        if not unpacked:
+            break
+        total += unpacked
+    click.echo(f'Expanded {total} class-days.')
+
+
+@payments_cli.command('send-reminders')
+@click.option('--days-ahead', type=int,
+              help='Remind about payments due within this many days [default: PAYMENT_REMINDER_DAYS_AHEAD].')
+@click.option('--interval-days', type=int,
+              help='Days before a payment is reminded again [default: PAYMENT_REMINDER_INTERVAL_DAYS].')
+@click.option('--dispatch/--no-dispatch', default=True, show_default=True,
+              help='Wait out the coalescing window and send the queued reminders before exiting.')
+def send_payment_reminders(days_ahead, interval_days, dispatch):
+    """
+    Queue one reminder per parent for unpaid payments that are due soon or
+    overdue. Meant to run on a schedule (e.g. daily from cron); payments
+    reminded within the interval are skipped, so reruns are cheap.
+    """
+    parents, payments = PaymentReminderService.sweep(days_ahead=days_ahead, interval_days=interval_days)
+    click.echo(f'Queued reminders about {payments} payments to {parents} parents.')
+    if dispatch and parents:
+        time.sleep(current_app.config.get('NOTIFICATION_COALESCE_SECONDS', 60))
+        click.echo(f'Processed {_dispatch_all(50)} notifications.')
+
+
+@search_cli.command('reindex')
+def reindex_search():
+    """Rebuild the search entries, creating the SQLite FTS5 index if missing."""
+    connection = db.session.connection()
+    fts = SearchService.create_fts(connection)
+    indexed = SearchService.reindex(connection)
+    db.session.commit()
+    click.echo(f'Indexed {indexed} students and parents{" with FTS5" if fts else ""}.')
+
+
+def register_cli(app):
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(attendance_cli)
+    app.cli.add_command(payments_cli)
+    app.cli.add_command(search_cli)
@@ -18,6 +18,42 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
 
+    # Seconds a parent's cached children/classes authorization map stays valid
+    AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 300))
+
+    # Shared subject/material listings; set a Redis URL when running several workers
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 600))
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL')
+
+    # Push notification outbox. The in-process dispatcher can be turned off
+    # when a `flask notifications worker` process runs instead.
+    NOTIFICATION_BACKGROUND_DISPATCH = os.environ.get('NOTIFICATION_BACKGROUND_DISPATCH', '1') == '1'
+    NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', 4))
+    NOTIFICATION_POLL_SECONDS = int(os.environ.get('NOTIFICATION_POLL_SECONDS', 30))
+    # Notifications for the same recipient queued within this many seconds
+    # go out as one digest push; each recipient gets at most
+    # NOTIFICATION_RATE_LIMIT pushes per NOTIFICATION_RATE_WINDOW_SECONDS
+    NOTIFICATION_COALESCE_SECONDS = int(os.environ.get('NOTIFICATION_COALESCE_SECONDS', 60))
+    NOTIFICATION_RATE_LIMIT = int(os.environ.get('NOTIFICATION_RATE_LIMIT', 6))
+    NOTIFICATION_RATE_WINDOW_SECONDS = int(os.environ.get('NOTIFICATION_RATE_WINDOW_SECONDS', 3600))
+    # FCM token audits queued from the API run on `flask notifications
+    # worker` or a scheduled `audit-tokens`; set this to run them on a
+    # thread of the web process instead, where the server allows threads
+    TOKEN_AUDIT_BACKGROUND_THREAD = os.environ.get('TOKEN_AUDIT_BACKGROUND_THREAD', '0') == '1'
+    # `flask payments send-reminders` covers unpaid payments due within this
+    # many days or overdue, reminding about each at most every N days
+    PAYMENT_REMINDER_DAYS_AHEAD = int(os.environ.get('PAYMENT_REMINDER_DAYS_AHEAD', 3))
+    PAYMENT_REMINDER_INTERVAL_DAYS = int(os.environ.get('PAYMENT_REMINDER_INTERVAL_DAYS', 3))
+    # Chunks of up to 500 tokens sent at once by multicast notifications
+    FCM_MULTICAST_WORKERS = int(os.environ.get('FCM_MULTICAST_WORKERS', 4))
+
+    # Parent event streams (SSE): keep-alive interval and events buffered per stream
+    EVENT_STREAM_HEARTBEAT_SECONDS = int(os.environ.get('EVENT_STREAM_HEARTBEAT_SECONDS', 15))
+    EVENT_STREAM_QUEUE_SIZE = int(os.environ.get('EVENT_STREAM_QUEUE_SIZE', 100))
+
+    # Class-days older than this are packed by `flask attendance compact`
+    ATTENDANCE_COMPACT_AFTER_DAYS = int(os.environ.get('ATTENDANCE_COMPACT_AFTER_DAYS', 180))
+
     # Base URL for generating full file URLs
     BASE_URL = os.environ.get('BASE_URL', 'https://kiaacdemy.pythonanywhere.com')
 
@@ -1,9 +1,21 @@
 from .user import User
+from .user_device import UserDevice
 from .classe import Classe
 from .student import Student
 from .subject import Subject
 from .material import Material
 from .payment import Payment
 from .attendance import Attendance
+from .attendance_rollup import ClassDayAttendance, StudentMonthAttendance
+from .attendance_compact import CompactClassDay, CompactAttendanceSpan
+from .attendance_sheet import AttendanceSheet
+from .tombstone import Tombstone, register_tombstone_listeners
+from .search_entry import SearchEntry
+from .notification import NotificationBatch, OutboxNotification, TokenAudit, TokenAuditResult
 
-__all__ = ['User', 'Classe', 'Student', 'Subject', 'Material', 'Payment', 'Attendance']
+register_tombstone_listeners()
+
+__all__ = ['User', 'UserDevice', 'Classe', 'Student', 'Subject', 'Material', 'Payment', 'Attendance',
+           'ClassDayAttendance', 'StudentMonthAttendance', 'CompactClassDay',
+           'CompactAttendanceSpan', 'AttendanceSheet', 'Tombstone', 'SearchEntry',
+           'NotificationBatch', 'OutboxNotification', 'TokenAudit', 'TokenAuditResult']
@@ -17,19 +17,31 @@ class Attendance(db.Model):
     # Add unique constraint: one attendance record per student per day
     __table_args__ = (
         db.UniqueConstraint('student_id', 'date', name='unique_student_date_attendance'),
+        # A class's register for a day or a date range
+        db.Index('ix_attendance_class_id_date', 'class_id', 'date'),
+        # Compacted class-days keep their record ids to restore them later,
+        # so SQLite must never hand a freed id out again
+        {'sqlite_autoincrement': True},
     )
 
-    def to_dict(self):
+    def to_dict(self, student_name=None, class_name=None, marked_by_name=None):
+        # Related names can be precomputed in bulk (see app.utils.serializers)
+        if student_name is None and self.student:
+            student_name = self.student.full_name
+        if class_name is None and self.classe:
+            class_name = self.classe.name
+        if marked_by_name is None and self.admin:
+            marked_by_name = self.admin.full_name
         return {
             'id': self.id,
             'student_id': self.student_id,
-            'student_name': self.student.full_name if self.student else None,
+            'student_name': student_name,
             'class_id': self.class_id,
-            'class_name': self.classe.name if self.classe else None,
+            'class_name': class_name,
             'date': self.date.isoformat(),
             'status': self.status,
             'marked_by': self.marked_by,
-            'marked_by_name': self.admin.full_name if self.admin else None,
+            'marked_by_name': marked_by_name,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
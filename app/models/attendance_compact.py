@@ -0,0 +1,166 @@
+import json
+from collections import Counter
+from datetime import datetime
+from app.extensions import db
+from .attendance import Attendance
+
+
+def _pack_ints(values):
+    """Encode integers as zigzag deltas in LEB128 varints: sorted ids take ~1 byte each."""
+    out = bytearray()
+    previous = 0
+    for value in values:
+        delta = value - previous
+        previous = value
+        n = delta * 2 if delta >= 0 else -delta * 2 - 1
+        while n >= 0x80:
+            out.append((n & 0x7f) | 0x80)
+            n >>= 7
+        out.append(n)
+    return bytes(out)
+
+
+def _unpack_ints(data):
+    values = []
+    previous = n = shift = 0
+    for byte in data:
+        n |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += n >> 1 if not n & 1 else -((n + 1) >> 1)
+        values.append(previous)
+        n = shift = 0
+    return values
+
+
+class CompactClassDay(db.Model):
+    """
+    One class's attendance for one day packed into a single row.
+
+    Replaces the day's `attendance` rows once they are old enough to be
+    archived (see AttendanceService.compact). The roster is stored as
+    packed student ids, statuses as a present/absent bitmap keyed by roster
+    position, and the original record ids alongside so the records keep
+    their identity. The marker and timestamps shared by most of the roster
+    are stored once; records that differ are listed in `exceptions`.
+    """
+    __tablename__ = 'attendance_compact_days'
+
+    class_id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    student_ids = db.Column(db.LargeBinary, nullable=False)
+    record_ids = db.Column(db.LargeBinary, nullable=False)
+    present = db.Column(db.LargeBinary, nullable=False)  # Bit i set: roster position i was present
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    absent_count = db.Column(db.Integer, nullable=False, default=0)
+    marked_by = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    # JSON {student_id: {field: value}} for records that differ from the shared values
+    exceptions = db.Column(db.Text)
+
+    @staticmethod
+    def pack(class_id, date, records):
+        """
+        Build the column values of a compact row from the day's records,
+        given as mappings with the `attendance` columns.
+        """
+        records = sorted(records, key=lambda r: r['student_id'])
+        shared = Counter(
+            (r['marked_by'], r['created_at'], r['updated_at']) for r in records
+        ).most_common(1)[0][0]
+
+        bitmap = bytearray((len(records) + 7) // 8)
+        exceptions = {}
+        for position, record in enumerate(records):
+            if record['status'] == 'present':
+                bitmap[position // 8] |= 1 << (position % 8)
+            differs = {}
+            if record['status'] not in ('present', 'absent'):
+                differs['status'] = record['status']
+            for field, value in zip(('marked_by', 'created_at', 'updated_at'), shared):
+                if record[field] != value:
+                    differs[field] = record[field].isoformat() if isinstance(record[field], datetime) else record[field]
+            if differs:
+                exceptions[str(record['student_id'])] = differs
+
+        return {
+            'class_id': class_id,
+            'date': date,
+            'student_ids': _pack_ints(r['student_id'] for r in records),
+            'record_ids': _pack_ints(r['id'] for r in records),
+            'present': bytes(bitmap),
+            'present_count': sum(1 for r in records if r['status'] == 'present'),
+            'absent_count': sum(1 for r in records if r['status'] == 'absent'),
+            'marked_by': shared[0],
+            'created_at': shared[1],
+            'updated_at': shared[2],
+            'exceptions': json.dumps(exceptions, separators=(',', ':')) if exceptions else None
+        }
+
+    def roster(self):
+        return _unpack_ints(self.student_ids)
+
+    def unpack(self, student_ids=None):
+        return unpack_day(self, student_ids)
+
+    def records(self, student_ids=None):
+        """The day's records as detached Attendance objects (never added to the session)."""
+        return [Attendance(**record) for record in unpack_day(self, student_ids)]
+
+    def __repr__(self):
+        return f'<CompactClassDay Class:{self.class_id} Date:{self.date}>'
+
+
+class CompactAttendanceSpan(db.Model):
+    """
+    Dates between which a student appears in a class's compact rows.
+
+    Lets per-student reads find the few compact rows that can hold the
+    student without decoding every roster.
+    """
+    __tablename__ = 'attendance_compact_spans'
+
+    student_id = db.Column(db.Integer, primary_key=True)
+    class_id = db.Column(db.Integer, primary_key=True)
+    first_date = db.Column(db.Date, nullable=False)
+    last_date = db.Column(db.Date, nullable=False)
+
+    def __repr__(self):
+        return f'<CompactAttendanceSpan Student:{self.student_id} Class:{self.class_id}>'
+
+
+def unpack_day(day, student_ids=None):
+    """
+    Return the records of a compact class-day as `attendance` column
+    mappings, limited to `student_ids` when given. `day` is a
+    CompactClassDay or a result row of its table.
+    """
+    roster = _unpack_ints(day.student_ids)
+    if student_ids is None:
+        positions = range(len(roster))
+    else:
+        positions = [position for position, student_id in enumerate(roster) if student_id in student_ids]
+        if not positions:
+            return []
+    record_ids = _unpack_ints(day.record_ids)
+    exceptions = json.loads(day.exceptions) if day.exceptions else {}
+
+    records = []
+    for position in positions:
+        student_id = roster[position]
+        record = {
+            'id': record_ids[position],
+            'student_id': student_id,
+            'class_id': day.class_id,
+            'date': day.date,
+            'status': 'present' if day.present[position // 8] & (1 << (position % 8)) else 'absent',
+            'marked_by': day.marked_by,
+            'created_at': day.created_at,
+            'updated_at': day.updated_at
+        }
+        for field, value in exceptions.get(str(student_id), {}).items():
+            record[field] = datetime.fromisoformat(value) if field in ('created_at', 'updated_at') else value
+        records.append(record)
+    return records
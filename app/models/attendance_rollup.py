@@ -0,0 +1,53 @@
+from app.extensions import db
+
+
+class ClassDayAttendance(db.Model):
+    """Present/absent counts of a class on one day, derived from attendance."""
+    __tablename__ = 'attendance_class_daily'
+
+    class_id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def total(self):
+        return self.present + self.absent
+
+    @property
+    def attendance_rate(self):
+        return round(100.0 * self.present / self.total, 1) if self.total else None
+
+    def __repr__(self):
+        return f'<ClassDayAttendance Class:{self.class_id} Date:{self.date}>'
+
+
+class StudentMonthAttendance(db.Model):
+    """Present/absent counts of a student in one month, derived from attendance."""
+    __tablename__ = 'attendance_student_monthly'
+
+    student_id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def total(self):
+        return self.present + self.absent
+
+    @property
+    def attendance_rate(self):
+        return round(100.0 * self.present / self.total, 1) if self.total else None
+
+    def to_dict(self):
+        return {
+            'month': f'{self.year:04d}-{self.month:02d}',
+            'present': self.present,
+            'absent': self.absent,
+            'total': self.total,
+            'attendance_rate': self.attendance_rate
+        }
+
+    def __repr__(self):
+        return f'<StudentMonthAttendance Student:{self.student_id} {self.year}-{self.month:02d}>'
@@ -0,0 +1,22 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class AttendanceSheet(db.Model):
+    """
+    Version counter of a class's attendance for one day.
+
+    Every save of the day's attendance bumps `version`; a save made from
+    an older version is merged or rejected instead of overwriting the
+    newer marks (see AttendanceService.save_sheet).
+    """
+    __tablename__ = 'attendance_sheets'
+
+    class_id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_by = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AttendanceSheet Class:{self.class_id} Date:{self.date} v{self.version}>'
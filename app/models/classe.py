@@ -9,20 +9,27 @@ class Classe(db.Model):
     name = db.Column(db.String(50), nullable=False, unique=True)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     students = db.relationship('Student', backref='classe', lazy='dynamic')
     subjects = db.relationship('Subject', backref='classe', lazy='dynamic', cascade='all, delete-orphan')
     attendance_records = db.relationship('Attendance', backref='classe', lazy='dynamic', cascade='all, delete-orphan')
 
-    def to_dict(self):
+    def to_dict(self, student_count=None, subject_count=None):
+        # Counts can be precomputed in bulk (see app.utils.serializers)
+        if student_count is None:
+            student_count = self.students.count()
+        if subject_count is None:
+            subject_count = self.subjects.count()
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'student_count': self.students.count(),
-            'subject_count': self.subjects.count(),
-            'created_at': self.created_at.isoformat()
+            'student_count': student_count,
+            'subject_count': subject_count,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
     def __repr__(self):
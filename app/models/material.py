@@ -13,18 +13,28 @@ class Material(db.Model):
     video_url = db.Column(db.String(500))  # YouTube URL for videos
     order_index = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
+    __table_args__ = (
+        # Materials of a subject in display order
+        db.Index('ix_materials_subject_id_order_index', 'subject_id', 'order_index'),
+    )
+
+    def to_dict(self, subject_name=None):
+        # subject_name can be precomputed in bulk (see app.utils.serializers)
+        if subject_name is None and self.subject:
+            subject_name = self.subject.name
         return {
             'id': self.id,
             'subject_id': self.subject_id,
-            'subject_name': self.subject.name if self.subject else None,
+            'subject_name': subject_name,
             'title': self.title,
             'type': self.type,
             'file_url': self.file_url,
             'video_url': self.video_url,
             'order_index': self.order_index,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
     def __repr__(self):
@@ -0,0 +1,151 @@
+import json
+from datetime import datetime
+from app.extensions import db
+
+
+class NotificationBatch(db.Model):
+    """A group of queued notifications created by one admin action."""
+    __tablename__ = 'notification_batches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # 'attendance', ...
+    description = db.Column(db.String(200))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Relationships
+    notifications = db.relationship('OutboxNotification', backref='batch', lazy='dynamic',
+                                    cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<NotificationBatch {self.id} {self.kind}>'
+
+
+class OutboxNotification(db.Model):
+    """
+    A push notification waiting to be sent, or already sent.
+
+    Rows are written in the same transaction as the change they announce
+    and delivered later by NotificationService.dispatch_due. A row goes to
+    the devices of `user_id`, or to an FCM `topic` for class-wide notices.
+    Rows for the same recipient that fall due together are sent as one
+    digest push.
+    """
+    __tablename__ = 'notification_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('notification_batches.id'), index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
+    topic = db.Column(db.String(100))  # Set instead of user_id for topic sends
+    # Queuing the same key again is a no-op, e.g. 'absence:<student_id>:<date>'
+    idempotency_key = db.Column(db.String(120), unique=True)
+    kind = db.Column(db.String(30), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    data_json = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'sending', 'sent', 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32))
+    locked_until = db.Column(db.DateTime)
+    message_id = db.Column(db.String(200))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Workers poll for due rows
+        db.Index('ix_notification_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+        # Enqueue joins a recipient's open coalescing window; dispatch counts recent pushes
+        db.Index('ix_notification_outbox_user_id_status_next_attempt_at', 'user_id', 'status', 'next_attempt_at'),
+        db.Index('ix_notification_outbox_user_id_sent_at', 'user_id', 'sent_at'),
+        db.Index('ix_notification_outbox_topic_sent_at', 'topic', 'sent_at'),
+    )
+
+    # Relationships
+    user = db.relationship('User')
+
+    @property
+    def data(self):
+        return json.loads(self.data_json) if self.data_json else {}
+
+    @data.setter
+    def data(self, value):
+        self.data_json = json.dumps(value) if value else None
+
+    def __repr__(self):
+        return f'<OutboxNotification {self.id} {self.kind} {self.status}>'
+
+
+class TokenAudit(db.Model):
+    """
+    A run of the FCM token check: a test push to every registered device.
+
+    Runs on a worker (see TokenAuditService); the counters are
+    updated after each round of sends so the progress can be polled.
+    """
+    __tablename__ = 'token_audits'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'running', 'completed', 'failed'
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    total_devices = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    sent = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    pruned = db.Column(db.Integer, nullable=False, default=0)  # Devices removed as unregistered
+    users_without_devices = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    # Relationships
+    results = db.relationship('TokenAuditResult', backref='audit', lazy='dynamic',
+                              cascade='all, delete-orphan', passive_deletes=True)
+
+    def to_dict(self):
+        if self.status == 'completed':
+            progress = 1.0
+        else:
+            progress = self.processed / self.total_devices if self.total_devices else 0.0
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total_devices': self.total_devices,
+            'processed': self.processed,
+            'sent': self.sent,
+            'failed': self.failed,
+            'pruned': self.pruned,
+            'users_without_devices': self.users_without_devices,
+            'progress': round(progress, 3),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<TokenAudit {self.id} {self.status}>'
+
+
+class TokenAuditResult(db.Model):
+    """Outcome of a token audit for one device, or for a user without any."""
+    __tablename__ = 'token_audit_results'
+
+    id = db.Column(db.Integer, primary_key=True)
+    audit_id = db.Column(db.Integer, db.ForeignKey('token_audits.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    device_id = db.Column(db.Integer)  # user_devices.id at the time; the device may since be pruned
+    status = db.Column(db.String(20), nullable=False)  # 'success', 'error', 'no_device'
+    message_id = db.Column(db.String(200))
+    error = db.Column(db.Text)
+
+    __table_args__ = (
+        # Report download: an audit's results in user order
+        db.Index('ix_token_audit_results_audit_id_user_id', 'audit_id', 'user_id'),
+    )
+
+    def __repr__(self):
+        return f'<TokenAuditResult {self.audit_id} User:{self.user_id} {self.status}>'
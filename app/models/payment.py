@@ -1,4 +1,6 @@
 from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import func, case, select
 from app.extensions import db
 
 
@@ -7,25 +9,87 @@ class Payment(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    due_date = db.Column(db.Date, nullable=False)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    due_date = db.Column(db.Date, nullable=False, index=True)
     paid_date = db.Column(db.Date, nullable=True)
     is_paid = db.Column(db.Boolean, default=False)
     notes = db.Column(db.Text)
+    last_reminded_at = db.Column(db.DateTime)  # Set by PaymentReminderService
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
+    __table_args__ = (
+        # Admin payments list: paid/unpaid filter ordered by due date
+        db.Index('ix_payments_is_paid_due_date', 'is_paid', 'due_date'),
+        # A student's payments, split into paid/unpaid and ordered by due date
+        db.Index('ix_payments_student_id_is_paid_due_date', 'student_id', 'is_paid', 'due_date'),
+    )
+
+    def to_dict(self, student_name=None):
+        # student_name can be precomputed in bulk (see app.utils.serializers)
+        if student_name is None and self.student:
+            student_name = self.student.full_name
         return {
             'id': self.id,
             'student_id': self.student_id,
-            'student_name': self.student.full_name if self.student else None,
-            'amount': self.amount,
+            'student_name': student_name,
+            'amount': float(self.amount) if self.amount is not None else None,
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'paid_date': self.paid_date.isoformat() if self.paid_date else None,
             'is_paid': self.is_paid,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+    @classmethod
+    def totals_by_student(cls, student_ids):
+        """
+        Aggregate payments per student with one GROUP BY.
+
+        Returns {student_id: (total_due, total_paid, pending_count)} with exact
+        Decimal totals. Students without payments are absent from the result.
+        """
+        if not student_ids:
+            return {}
+
+        paid = cls.is_paid.is_(True)
+        rows = db.session.query(
+            cls.student_id,
+            func.coalesce(func.sum(case((paid, 0), else_=cls.amount)), 0),
+            func.coalesce(func.sum(case((paid, cls.amount), else_=0)), 0),
+            func.sum(case((paid, 0), else_=1))
+        ).filter(cls.student_id.in_(student_ids)).group_by(cls.student_id).all()
+
+        cents = Decimal('0.01')
+        return {
+            student_id: (Decimal(due).quantize(cents), Decimal(paid_total).quantize(cents), int(pending))
+            for student_id, due, paid_total, pending in rows
+        }
+
+    @classmethod
+    def next_due_by_student(cls, student_ids):
+        """
+        Find each student's earliest unpaid payment in one query.
+
+        Returns {student_id: Payment}.
+        """
+        if not student_ids:
+            return {}
+
+        ranked = select(
+            cls.id,
+            func.row_number().over(
+                partition_by=cls.student_id,
+                order_by=(cls.due_date, cls.id)
+            ).label('position')
+        ).where(
+            cls.student_id.in_(student_ids),
+            cls.is_paid.isnot(True)
+        ).subquery()
+
+        payments = cls.query.join(ranked, ranked.c.id == cls.id).filter(ranked.c.position == 1).all()
+        return {p.student_id: p for p in payments}
+
     def __repr__(self):
         return f'<Payment {self.id} - {self.amount}>'
@@ -0,0 +1,18 @@
+from app.extensions import db
+
+
+class SearchEntry(db.Model):
+    """Normalized search text for a student or parent (see SearchService)."""
+    __tablename__ = 'search_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'student' or 'parent'
+    ref_id = db.Column(db.Integer, nullable=False)
+    content = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'ref_id', name='unique_search_entry'),
+    )
+
+    def __repr__(self):
+        return f'<SearchEntry {self.kind}:{self.ref_id}>'
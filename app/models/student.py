@@ -6,27 +6,47 @@ class Student(db.Model):
     __tablename__ = 'students'
 
     id = db.Column(db.Integer, primary_key=True)
-    parent_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=True)
-    full_name = db.Column(db.String(100), nullable=False)
+    # The previous parent and class are loaded when these change, so flush
+    # hooks can tell whom a move affected (access cache, class topics)
+    parent_id = db.column_property(db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False),
+                                   active_history=True)
+    class_id = db.column_property(db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=True),
+                                  active_history=True)
+    full_name = db.Column(db.String(100), nullable=False, index=True)
     date_of_birth = db.Column(db.Date)
     profile_image_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Last change of parent or class; delta sync answers with a full snapshot after one
+    moved_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Admin students list: class filter ordered by name
+        db.Index('ix_students_class_id_full_name', 'class_id', 'full_name'),
+        # A parent's children: API listings and ownership checks
+        db.Index('ix_students_parent_id', 'parent_id'),
+        # Dashboard: most recently added students
+        db.Index('ix_students_created_at', 'created_at'),
+    )
 
     # Relationships
     payments = db.relationship('Payment', backref='student', lazy='dynamic', cascade='all, delete-orphan')
     attendance_records = db.relationship('Attendance', backref='student', lazy='dynamic', cascade='all, delete-orphan')
 
-    def to_dict(self):
+    def to_dict(self, class_name=None):
+        # class_name can be precomputed in bulk (see app.utils.serializers)
+        if class_name is None and self.classe:
+            class_name = self.classe.name
         return {
             'id': self.id,
             'parent_id': self.parent_id,
             'class_id': self.class_id,
-            'class_name': self.classe.name if self.classe else None,
+            'class_name': class_name,
             'full_name': self.full_name,
             'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
             'profile_image_url': self.profile_image_url,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
     def __repr__(self):
@@ -10,19 +10,31 @@ class Subject(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Subjects of a class ordered by name
+        db.Index('ix_subjects_class_id_name', 'class_id', 'name'),
+    )
 
     # Relationships
     materials = db.relationship('Material', backref='subject', lazy='dynamic', cascade='all, delete-orphan')
 
-    def to_dict(self):
+    def to_dict(self, class_name=None, material_count=None):
+        # Related values can be precomputed in bulk (see app.utils.serializers)
+        if class_name is None and self.classe:
+            class_name = self.classe.name
+        if material_count is None:
+            material_count = self.materials.count()
         return {
             'id': self.id,
             'class_id': self.class_id,
-            'class_name': self.classe.name if self.classe else None,
+            'class_name': class_name,
             'name': self.name,
             'description': self.description,
-            'material_count': self.materials.count(),
-            'created_at': self.created_at.isoformat()
+            'material_count': material_count,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
     def __repr__(self):
@@ -0,0 +1,79 @@
+from datetime import datetime
+from sqlalchemy import event, inspect
+from app.extensions import db
+
+
+class Tombstone(db.Model):
+    """Record of a deleted row, so the app's delta sync can drop it locally."""
+    __tablename__ = 'tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)  # 'student', 'subject', 'material', 'payment', 'attendance'
+    entity_id = db.Column(db.Integer, nullable=False)
+    # Scope of the deleted row, used to decide which parents receive the tombstone
+    parent_id = db.Column(db.Integer)
+    student_id = db.Column(db.Integer)
+    class_id = db.Column(db.Integer)
+    subject_id = db.Column(db.Integer)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'entity': self.entity,
+            'id': self.entity_id,
+            'deleted_at': self.deleted_at.isoformat()
+        }
+
+    def __repr__(self):
+        return f'<Tombstone {self.entity}:{self.entity_id}>'
+
+
+def _record_deletion(entity, **scope):
+    """Build an after_delete listener writing a tombstone with the given scope attributes."""
+    def listener(mapper, connection, target):
+        connection.execute(Tombstone.__table__.insert().values(
+            entity=entity,
+            entity_id=target.id,
+            deleted_at=datetime.utcnow(),
+            **{column: getattr(target, attr) for column, attr in scope.items()}
+        ))
+    return listener
+
+
+def _record_move(mapper, connection, target):
+    """
+    Stamp moved_at on a student whose parent or class changed, and leave the
+    previous parent a tombstone for them. Delta sync only reports changed
+    rows, so it would otherwise leave the old parent with the child and the
+    current one with the old class's subjects.
+    """
+    state = inspect(target)
+    parent_history = state.attrs.parent_id.history
+    if not (parent_history.has_changes() or state.attrs.class_id.history.has_changes()):
+        return
+
+    now = datetime.utcnow()
+    target.moved_at = now
+    previous_parent_id = parent_history.deleted[0] if parent_history.deleted else None
+    if previous_parent_id is not None and previous_parent_id != target.parent_id:
+        connection.execute(Tombstone.__table__.insert().values(
+            entity='student',
+            entity_id=target.id,
+            parent_id=previous_parent_id,
+            deleted_at=now
+        ))
+
+
+def register_tombstone_listeners():
+    from .student import Student
+    from .subject import Subject
+    from .material import Material
+    from .payment import Payment
+    from .attendance import Attendance
+
+    event.listen(Student, 'after_delete', _record_deletion('student', parent_id='parent_id'))
+    event.listen(Student, 'before_update', _record_move)
+    event.listen(Subject, 'after_delete', _record_deletion('subject', class_id='class_id'))
+    event.listen(Material, 'after_delete', _record_deletion('material', subject_id='subject_id'))
+    event.listen(Payment, 'after_delete', _record_deletion('payment', student_id='student_id'))
+    event.listen(Attendance, 'after_delete', _record_deletion('attendance', student_id='student_id'))
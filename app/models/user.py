@@ -13,12 +13,18 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), nullable=False, default='parent')  # 'admin' or 'parent'
     full_name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20))
-    fcm_token = db.Column(db.String(255))  # Firebase Cloud Messaging token
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Admin parents list, filtered by role and sorted by date or name
+        db.Index('ix_users_role_created_at', 'role', 'created_at'),
+        db.Index('ix_users_role_full_name', 'role', 'full_name'),
+    )
+
     # Relationships
     students = db.relationship('Student', backref='parent', lazy='dynamic')
+    devices = db.relationship('UserDevice', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     marked_attendance = db.relationship('Attendance', backref='admin', lazy='dynamic', foreign_keys='Attendance.marked_by')
 
     def set_password(self, password):
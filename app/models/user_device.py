@@ -0,0 +1,28 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class UserDevice(db.Model):
+    """
+    A device registered for push notifications.
+
+    A user has one row per phone or tablet that called /api/auth/fcm-token.
+    Tokens that FCM reports as unregistered are deleted when a send finds
+    them (see DeviceService.prune), so broadcasts only reach live devices.
+    """
+    __tablename__ = 'user_devices'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    token = db.Column(db.String(255), unique=True, nullable=False)  # Firebase Cloud Messaging token
+    platform = db.Column(db.String(20))  # 'android', 'ios', ...
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # A user's devices, most recently seen first
+        db.Index('ix_user_devices_user_id_last_seen_at', 'user_id', 'last_seen_at'),
+    )
+
+    def __repr__(self):
+        return f'<UserDevice {self.id} User:{self.user_id}>'
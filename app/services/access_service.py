@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import User, Classe, Student
+
+DEFAULT_TTL = 300  # seconds
+
+ParentAccess = namedtuple('ParentAccess', ['student_ids', 'class_ids'])
+
+
+class AccessService:
+    """
+    Per-parent authorization map: the ids of a parent's children and of
+    the classes they are in.
+
+    Maps are cached in-process for AUTH_CACHE_TTL seconds and dropped as
+    soon as a commit changes a student's parent or class, so ownership
+    checks are set lookups instead of queries. The TTL bounds staleness
+    for writes made by other processes.
+    """
+    _cache = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def for_parent(cls, parent_id):
+        """Return the ParentAccess for `parent_id`, loading it on a miss."""
+        now = time.monotonic()
+        entry = cls._cache.get(parent_id)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        rows = db.session.query(Student.id, Student.class_id).filter(Student.parent_id == parent_id).all()
+        access = ParentAccess(
+            student_ids=frozenset(student_id for student_id, _ in rows),
+            class_ids=frozenset(class_id for _, class_id in rows if class_id is not None)
+        )
+        ttl = current_app.config.get('AUTH_CACHE_TTL', DEFAULT_TTL)
+        with cls._lock:
+            cls._cache[parent_id] = (now + ttl, access)
+        return access
+
+    @classmethod
+    def owns_student(cls, parent_id, student_id):
+        return student_id in cls.for_parent(parent_id).student_ids
+
+    @classmethod
+    def has_child_in_class(cls, parent_id, class_id):
+        return class_id in cls.for_parent(parent_id).class_ids
+
+    @classmethod
+    def invalidate(cls, parent_ids=None):
+        """Drop the cached maps of `parent_ids`, or every map when None."""
+        with cls._lock:
+            if parent_ids is None:
+                cls._cache.clear()
+            else:
+                for parent_id in parent_ids:
+                    cls._cache.pop(parent_id, None)
+
+
+# Collect affected parents while flushing and drop their maps once the
+# transaction commits, so a concurrent request cannot re-cache old rows.
+
+_STALE_KEY = 'access_stale_parents'
+_ALL = object()
+
+
+def _changed(target, *attrs):
+    state = inspect(target)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _attribute_values(target, attr):
+    history = inspect(target).attrs[attr].history
+    return set(history.added) | set(history.deleted) | set(history.unchanged)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stale_parents(session, flush_context):
+    stale = session.info.setdefault(_STALE_KEY, set())
+    if _ALL in stale:
+        return
+
+    for obj in session.new:
+        if isinstance(obj, Student):
+            stale.add(obj.parent_id)
+    for obj in session.dirty:
+        if isinstance(obj, Student) and _changed(obj, 'parent_id', 'class_id'):
+            stale |= _attribute_values(obj, 'parent_id')
+    for obj in session.deleted:
+        if isinstance(obj, Student):
+            stale |= _attribute_values(obj, 'parent_id')
+        elif isinstance(obj, User):
+            stale.add(obj.id)
+        elif isinstance(obj, Classe):
+            # Its students lose their class inside the flush; drop everything
+            stale.add(_ALL)
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_stale_parents(session):
+    stale = session.info.pop(_STALE_KEY, None)
+    if stale:
+        AccessService.invalidate(None if _ALL in stale else stale - {None})
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stale_parents(session):
+    session.info.pop(_STALE_KEY, None)
@@ -0,0 +1,643 @@
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from sqlalchemy import event, inspect, insert, update, select, func, case, extract, and_, or_, tuple_, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.extensions import db
+from app.models import (User, Classe, Student, Attendance, ClassDayAttendance, StudentMonthAttendance,
+                        CompactClassDay, CompactAttendanceSpan, AttendanceSheet, Tombstone)
+from app.models.attendance_compact import unpack_day
+from app.services.event_service import event_broker
+from app.utils.upsert import NATIVE_UPSERT_DIALECTS, dialect_insert
+
+# Session.info key of attendance events waiting for the commit
+_EVENTS_KEY = 'attendance_events'
+
+# Times a sheet save re-reads and merges after losing a version race
+_SHEET_SAVE_ATTEMPTS = 5
+
+# Outcome of AttendanceService.save_sheet. `saved` is False when nothing was
+# written: `conflicts` then maps student id -> (current status, submitted
+# status). `applied` holds the statuses written, `merged` tells whether
+# the sheet had moved on since it was loaded, and `version` and `statuses`
+# are the sheet as it now stands.
+SheetSave = namedtuple('SheetSave', ['saved', 'merged', 'version', 'applied', 'conflicts', 'statuses'])
+
+
+def _month_key(day):
+    return day.year * 12 + day.month - 1
+
+
+def _first_of_month(month_key):
+    return date(month_key // 12, month_key % 12 + 1, 1)
+
+
+class AttendanceService:
+    """
+    Bulk writes of attendance records, upkeep of the attendance rollups
+    and the compact storage of old class-days.
+    """
+
+    @staticmethod
+    def mark_class(class_id, attendance_date, statuses, marked_by, method=None):
+        """
+        Record one day's attendance for a class roster.
+
+        `statuses` maps student id to 'present' or 'absent'. Each student
+        keeps a single row per date (unique_student_date_attendance), so
+        existing rows are updated in place. Uses INSERT ... ON CONFLICT
+        where the database supports it, otherwise loads the existing rows
+        in one query and writes updates and inserts as two batches.
+        `method` ('native' or 'loaded') forces a strategy.
+
+        Compacted class-days holding any of the records are unpacked first.
+        The class-day and student-month rollups of the affected rows are
+        refreshed in the same transaction. The caller commits; parents'
+        event streams are told once it does.
+        """
+        if not statuses:
+            return
+
+        # Compacted class-days being re-marked go back to attendance rows first
+        AttendanceService.restore(class_id, attendance_date, statuses.keys())
+
+        # Students moved from another class keep their row for the day; that
+        # class's rollup changes too
+        previous_class_ids = {class_id for (class_id,) in db.session.query(Attendance.class_id).filter(
+            Attendance.student_id.in_(statuses.keys()),
+            Attendance.date == attendance_date,
+            Attendance.class_id != class_id
+        ).distinct()}
+
+        if method is None:
+            method = 'native' if db.engine.dialect.name in NATIVE_UPSERT_DIALECTS else 'loaded'
+
+        now = datetime.utcnow()
+        if method == 'native':
+            AttendanceService._upsert_native(class_id, attendance_date, statuses, marked_by, now)
+        else:
+            AttendanceService._upsert_loaded(class_id, attendance_date, statuses, marked_by, now)
+
+        AttendanceService.refresh_rollups(
+            db.session.connection(), previous_class_ids | {class_id}, statuses.keys(),
+            attendance_date, attendance_date
+        )
+
+        # Parents with an open event stream in this process hear about it on commit
+        if event_broker.has_subscribers():
+            parent_ids = dict(db.session.query(Student.id, Student.parent_id).filter(
+                Student.id.in_(list(statuses))
+            ).all())
+            db.session.info.setdefault(_EVENTS_KEY, []).extend(
+                (parent_ids[student_id], {
+                    'student_id': student_id,
+                    'class_id': class_id,
+                    'date': attendance_date.isoformat(),
+                    'status': status,
+                    'marked_at': now.isoformat()
+                })
+                for student_id, status in statuses.items() if student_id in parent_ids
+            )
+
+    @staticmethod
+    def day_statuses(attendance_date, class_id=None, student_ids=None):
+        """
+        Map student id -> status recorded on `attendance_date` for a class
+        or for some students, whether stored as rows or compacted.
+        """
+        query = db.session.query(Attendance.student_id, Attendance.status).filter(Attendance.date == attendance_date)
+        if class_id is not None:
+            query = query.filter(Attendance.class_id == class_id)
+        if student_ids is not None:
+            query = query.filter(Attendance.student_id.in_(list(student_ids)))
+        statuses = dict(query.all())
+        for record in AttendanceService.compact_rows(class_id, student_ids, attendance_date, attendance_date):
+            statuses[record['student_id']] = record['status']
+        return statuses
+
+    @staticmethod
+    def sheet_version(class_id, attendance_date):
+        """Version of a class's attendance sheet for a day; 0 before its first save."""
+        return db.session.query(AttendanceSheet.version).filter_by(
+            class_id=class_id, date=attendance_date
+        ).scalar() or 0
+
+    @staticmethod
+    def save_sheet(class_id, attendance_date, statuses, marked_by, base_version=None, base_statuses=None):
+        """
+        Save a class's attendance sheet for a day, checking that it has not
+        changed since the submitter loaded it.
+
+        `base_version` and `base_statuses` describe the sheet the submitter
+        started from (see sheet_version and day_statuses). If the version
+        still matches, every status is written as with mark_class. If other
+        saves came in between, only the submitter's own changes are merged
+        on top of them: students the submitter left alone keep their current
+        status. A student changed to different values on both sides is a
+        conflict, and the save writes nothing. Without `base_version` the
+        statuses are written unconditionally.
+
+        The version check is a single conditional UPDATE of the sheet row,
+        so no lock is held between loading and submitting a sheet. The
+        caller commits; returns a SheetSave.
+        """
+        base_statuses = base_statuses or {}
+        merged = False
+        for _ in range(_SHEET_SAVE_ATTEMPTS):
+            current_version = AttendanceService.sheet_version(class_id, attendance_date)
+            changes = statuses
+            if base_version is not None and base_version != current_version:
+                merged = True
+                current = AttendanceService.day_statuses(attendance_date, class_id=class_id)
+                changes, conflicts = {}, {}
+                for student_id, status in statuses.items():
+                    base = base_statuses.get(student_id)
+                    if status == base or status == current.get(student_id):
+                        continue
+                    if current.get(student_id) != base:
+                        conflicts[student_id] = (current.get(student_id), status)
+                    else:
+                        changes[student_id] = status
+                if conflicts:
+                    return SheetSave(False, True, current_version, {}, conflicts, current)
+                if not changes:
+                    return SheetSave(True, True, current_version, {}, {}, current)
+
+            if AttendanceService._bump_sheet(class_id, attendance_date, current_version, marked_by):
+                AttendanceService.mark_class(class_id, attendance_date, changes, marked_by)
+                return SheetSave(True, merged, current_version + 1, changes, {},
+                                 AttendanceService.day_statuses(attendance_date, class_id=class_id))
+
+        # Still losing the race after several merges: hand back the latest sheet
+        current = AttendanceService.day_statuses(attendance_date, class_id=class_id)
+        conflicts = {student_id: (current.get(student_id), status)
+                     for student_id, status in statuses.items() if current.get(student_id) != status}
+        return SheetSave(False, True, AttendanceService.sheet_version(class_id, attendance_date),
+                         {}, conflicts, current)
+
+    @staticmethod
+    def _bump_sheet(class_id, attendance_date, version, marked_by):
+        """Move the sheet from `version` to the next one; False if it is no longer at `version`."""
+        now = datetime.utcnow()
+        if version:
+            result = db.session.execute(
+                update(AttendanceSheet)
+                .where(AttendanceSheet.class_id == class_id, AttendanceSheet.date == attendance_date,
+                       AttendanceSheet.version == version)
+                .values(version=version + 1, updated_by=marked_by, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            return result.rowcount == 1
+
+        row = {'class_id': class_id, 'date': attendance_date, 'version': 1,
+               'updated_by': marked_by, 'updated_at': now}
+        if db.engine.dialect.name in NATIVE_UPSERT_DIALECTS:
+            stmt = dialect_insert(db.engine.dialect.name)(AttendanceSheet.__table__).values(row)
+            return db.session.execute(stmt.on_conflict_do_nothing()).rowcount == 1
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(AttendanceSheet).values(row))
+        except IntegrityError:
+            return False
+        return True
+
+    @staticmethod
+    def _upsert_native(class_id, attendance_date, statuses, marked_by, now):
+        insert_upsert = dialect_insert(db.engine.dialect.name)
+        rows = [{
+            'student_id': student_id,
+            'class_id': class_id,
+            'date': attendance_date,
+            'status': status,
+            'marked_by': marked_by,
+            'created_at': now,
+            'updated_at': now
+        } for student_id, status in statuses.items()]
+
+        # One statement executed for every row of the roster
+        stmt = insert_upsert(Attendance.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['student_id', 'date'],
+            set_={
+                'status': stmt.excluded.status,
+                'class_id': stmt.excluded.class_id,
+                'marked_by': stmt.excluded.marked_by,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        db.session.execute(stmt, rows)
+
+    @staticmethod
+    def _upsert_loaded(class_id, attendance_date, statuses, marked_by, now):
+        existing = dict(db.session.query(Attendance.student_id, Attendance.id).filter(
+            Attendance.student_id.in_(statuses.keys()),
+            Attendance.date == attendance_date
+        ).all())
+
+        updates = [{
+            'id': existing[student_id],
+            'status': status,
+            'class_id': class_id,
+            'marked_by': marked_by,
+            'updated_at': now
+        } for student_id, status in statuses.items() if student_id in existing]
+        inserts = [{
+            'student_id': student_id,
+            'class_id': class_id,
+            'date': attendance_date,
+            'status': status,
+            'marked_by': marked_by,
+            'created_at': now,
+            'updated_at': now
+        } for student_id, status in statuses.items() if student_id not in existing]
+
+        if updates:
+            db.session.execute(update(Attendance), updates)
+        if inserts:
+            db.session.execute(insert(Attendance), inserts)
+
+    @staticmethod
+    def refresh_rollups(connection, class_ids, student_ids, start_date, end_date):
+        """
+        Recompute the rollup rows of `class_ids` for each day and of
+        `student_ids` for each month between `start_date` and `end_date`.
+
+        Only the touched keys are rewritten, straight from the attendance
+        rows and compact class-days, so a refresh never drifts from the raw
+        data.
+        """
+        attendance = Attendance.__table__
+        present = func.sum(case((attendance.c.status == 'present', 1), else_=0))
+        absent = func.sum(case((attendance.c.status == 'absent', 1), else_=0))
+
+        class_ids = [i for i in set(class_ids) if i is not None]
+        if class_ids:
+            class_daily = ClassDayAttendance.__table__
+            compact = CompactClassDay.__table__
+            in_range = (attendance.c.class_id.in_(class_ids), attendance.c.date.between(start_date, end_date))
+            connection.execute(class_daily.delete().where(
+                class_daily.c.class_id.in_(class_ids), class_daily.c.date.between(start_date, end_date)
+            ))
+            connection.execute(class_daily.insert().from_select(
+                ['class_id', 'date', 'present', 'absent'],
+                select(attendance.c.class_id, attendance.c.date, present, absent)
+                .where(*in_range).group_by(attendance.c.class_id, attendance.c.date)
+            ))
+            # A class-day is either in attendance or compacted, never both
+            connection.execute(class_daily.insert().from_select(
+                ['class_id', 'date', 'present', 'absent'],
+                select(compact.c.class_id, compact.c.date, compact.c.present_count, compact.c.absent_count).where(
+                    compact.c.class_id.in_(class_ids), compact.c.date.between(start_date, end_date)
+                )
+            ))
+
+        student_ids = [i for i in set(student_ids) if i is not None]
+        if student_ids:
+            student_monthly = StudentMonthAttendance.__table__
+            first_month, last_month = _month_key(start_date), _month_key(end_date)
+            year = extract('year', attendance.c.date)
+            month = extract('month', attendance.c.date)
+            connection.execute(student_monthly.delete().where(
+                student_monthly.c.student_id.in_(student_ids),
+                (student_monthly.c.year * 12 + student_monthly.c.month - 1).between(first_month, last_month)
+            ))
+            connection.execute(student_monthly.insert().from_select(
+                ['student_id', 'year', 'month', 'present', 'absent'],
+                select(attendance.c.student_id, year, month, present, absent).where(
+                    attendance.c.student_id.in_(student_ids),
+                    attendance.c.date >= _first_of_month(first_month),
+                    attendance.c.date < _first_of_month(last_month + 1)
+                ).group_by(attendance.c.student_id, year, month)
+            ))
+            AttendanceService._add_compact_months(
+                connection, student_ids,
+                _first_of_month(first_month), _first_of_month(last_month + 1) - timedelta(days=1)
+            )
+
+    @staticmethod
+    def _add_compact_months(connection, student_ids, start_date, end_date):
+        """Add the compact class-days of `student_ids` to their month rollups."""
+        student_ids = set(student_ids)
+        counts = {}
+        for day in _compact_days(connection, student_ids=student_ids, start_date=start_date, end_date=end_date):
+            for record in unpack_day(day, student_ids):
+                key = (record['student_id'], day.date.year, day.date.month)
+                present, absent = counts.get(key, (0, 0))
+                counts[key] = (present + (record['status'] == 'present'), absent + (record['status'] == 'absent'))
+        if not counts:
+            return
+
+        student_monthly = StudentMonthAttendance.__table__
+        existing = set(connection.execute(
+            select(student_monthly.c.student_id, student_monthly.c.year, student_monthly.c.month).where(
+                tuple_(student_monthly.c.student_id, student_monthly.c.year, student_monthly.c.month).in_(list(counts))
+            )
+        ).tuples())
+        rows = [{'b_student_id': student_id, 'b_year': year, 'b_month': month, 'b_present': present, 'b_absent': absent}
+                for (student_id, year, month), (present, absent) in counts.items()]
+        updates = [row for row in rows if (row['b_student_id'], row['b_year'], row['b_month']) in existing]
+        inserts = [row for row in rows if (row['b_student_id'], row['b_year'], row['b_month']) not in existing]
+        if updates:
+            connection.execute(student_monthly.update().where(
+                student_monthly.c.student_id == bindparam('b_student_id'),
+                student_monthly.c.year == bindparam('b_year'),
+                student_monthly.c.month == bindparam('b_month')
+            ).values(
+                present=student_monthly.c.present + bindparam('b_present'),
+                absent=student_monthly.c.absent + bindparam('b_absent')
+            ), updates)
+        if inserts:
+            connection.execute(student_monthly.insert().values(
+                student_id=bindparam('b_student_id'), year=bindparam('b_year'), month=bindparam('b_month'),
+                present=bindparam('b_present'), absent=bindparam('b_absent')
+            ), inserts)
+
+    @staticmethod
+    def rebuild_rollups():
+        """Recompute every rollup row from scratch. The caller commits."""
+        connection = db.session.connection()
+        connection.execute(ClassDayAttendance.__table__.delete())
+        connection.execute(StudentMonthAttendance.__table__.delete())
+        raw_bounds = db.session.query(func.min(Attendance.date), func.max(Attendance.date)).one()
+        compact_bounds = db.session.query(func.min(CompactClassDay.date), func.max(CompactClassDay.date)).one()
+        dates = [d for d in (*raw_bounds, *compact_bounds) if d is not None]
+        if not dates:
+            return
+        class_ids = {i for (i,) in db.session.query(Attendance.class_id).distinct()}
+        class_ids |= {i for (i,) in db.session.query(CompactClassDay.class_id).distinct()}
+        student_ids = {i for (i,) in db.session.query(Attendance.student_id).distinct()}
+        student_ids |= {i for (i,) in db.session.query(CompactAttendanceSpan.student_id).distinct()}
+        AttendanceService.refresh_rollups(connection, class_ids, student_ids, min(dates), max(dates))
+
+    # Old class-days are moved out of `attendance` into one CompactClassDay
+    # row each. The move is lossless (record ids, markers and timestamps are
+    # kept) and reversible, and leaves the rollups as they are.
+
+    @staticmethod
+    def compact(before, limit=500):
+        """
+        Pack up to `limit` class-days dated before `before` into compact
+        rows. Returns the number packed; call again until it returns 0.
+        Today is never compacted. The caller commits.
+        """
+        before = min(before, date.today())
+        attendance = Attendance.__table__
+        connection = db.session.connection()
+        keys = connection.execute(
+            select(attendance.c.class_id, attendance.c.date).where(attendance.c.date < before)
+            .group_by(attendance.c.class_id, attendance.c.date)
+            .order_by(attendance.c.class_id, attendance.c.date).limit(limit)
+        ).tuples().all()
+        if not keys:
+            return 0
+
+        in_keys = tuple_(attendance.c.class_id, attendance.c.date).in_(keys)
+        rows = connection.execute(
+            select(attendance).where(in_keys).order_by(attendance.c.class_id, attendance.c.date)
+        ).mappings()
+        days, spans = [], {}
+        for (class_id, day), records in groupby(rows, key=lambda row: (row['class_id'], row['date'])):
+            records = list(records)
+            days.append(CompactClassDay.pack(class_id, day, records))
+            for record in records:
+                first, last = spans.get((record['student_id'], class_id), (day, day))
+                spans[(record['student_id'], class_id)] = (min(first, day), max(last, day))
+
+        connection.execute(CompactClassDay.__table__.insert(), days)
+        _extend_spans(connection, spans)
+        # Core delete: these records still exist, so no tombstones are written
+        connection.execute(attendance.delete().where(in_keys))
+        return len(keys)
+
+    @staticmethod
+    def expand(start_date=None, limit=500):
+        """
+        Unpack up to `limit` compact class-days dated from `start_date` on
+        back into attendance rows, reversing compact(). Returns the number
+        unpacked. The caller commits.
+        """
+        compact = CompactClassDay.__table__
+        connection = db.session.connection()
+        query = select(compact.c.class_id, compact.c.date).order_by(compact.c.class_id, compact.c.date).limit(limit)
+        if start_date:
+            query = query.where(compact.c.date >= start_date)
+        keys = connection.execute(query).tuples().all()
+        _unpack_days(connection, keys)
+        return len(keys)
+
+    @staticmethod
+    def restore(class_id, attendance_date, student_ids):
+        """
+        Unpack the compact class-days of `attendance_date` that belong to
+        `class_id` or may hold any of `student_ids`, so the day can be
+        written as attendance rows again. The caller commits.
+        """
+        spans = CompactAttendanceSpan.__table__
+        compact = CompactClassDay.__table__
+        connection = db.session.connection()
+        span_class_ids = select(spans.c.class_id).where(
+            spans.c.student_id.in_(list(student_ids)),
+            spans.c.first_date <= attendance_date,
+            spans.c.last_date >= attendance_date
+        )
+        keys = connection.execute(select(compact.c.class_id, compact.c.date).where(
+            compact.c.date == attendance_date,
+            or_(compact.c.class_id == class_id, compact.c.class_id.in_(span_class_ids))
+        )).tuples().all()
+        if keys:
+            _unpack_days(connection, keys)
+
+    @staticmethod
+    def compact_rows(class_id=None, student_ids=None, start_date=None, end_date=None, newest_first=False):
+        """
+        Yield the records of compact class-days as `attendance` column
+        mappings, for a class and/or some students, ordered by date.
+        """
+        student_ids = set(student_ids) if student_ids is not None else None
+        for day in _compact_days(db.session.connection(), class_id, student_ids, start_date, end_date, newest_first):
+            yield from unpack_day(day, student_ids)
+
+    @staticmethod
+    def compact_records(class_id=None, student_ids=None, start_date=None, end_date=None, newest_first=False):
+        """
+        Like compact_rows(), as detached Attendance objects for code that
+        serializes or renders records. They are read-only: changing one
+        means re-marking its class-day.
+        """
+        for row in AttendanceService.compact_rows(class_id, student_ids, start_date, end_date, newest_first):
+            yield Attendance(**row)
+
+    @staticmethod
+    def with_related(records):
+        """Attach students and markers to detached records in two queries, for templates."""
+        students = {s.id: s for s in Student.query.filter(Student.id.in_({r.student_id for r in records}))}
+        admins = {u.id: u for u in User.query.filter(User.id.in_({r.marked_by for r in records}))}
+        for record in records:
+            set_committed_value(record, 'student', students.get(record.student_id))
+            set_committed_value(record, 'admin', admins.get(record.marked_by))
+        return records
+
+    @staticmethod
+    def _drop_compact(connection, class_ids=(), student_ids=()):
+        """
+        Remove the compact records of deleted classes and students, writing
+        the tombstones their attendance rows would have left. Returns the
+        (class_ids, student_ids, dates) whose rollups need a refresh.
+        """
+        class_ids, student_ids = set(class_ids), set(student_ids)
+        compact = CompactClassDay.__table__
+        days = list(_compact_days(connection, class_ids=class_ids, student_ids=student_ids, match_any=True))
+        touched_classes, touched_students, dates, tombstones = set(), set(), set(), []
+        now = datetime.utcnow()
+        for day in days:
+            records = unpack_day(day)
+            kept = [r for r in records if day.class_id not in class_ids and r['student_id'] not in student_ids]
+            if len(kept) == len(records):
+                continue
+            tombstones += [{'entity': 'attendance', 'entity_id': r['id'], 'student_id': r['student_id'],
+                            'deleted_at': now} for r in records if r not in kept]
+            touched_classes.add(day.class_id)
+            touched_students |= {r['student_id'] for r in records}
+            dates.add(day.date)
+            key = and_(compact.c.class_id == day.class_id, compact.c.date == day.date)
+            if kept:
+                connection.execute(compact.update().where(key).values(CompactClassDay.pack(day.class_id, day.date, kept)))
+            else:
+                connection.execute(compact.delete().where(key))
+        if tombstones:
+            connection.execute(Tombstone.__table__.insert(), tombstones)
+        spans = CompactAttendanceSpan.__table__
+        connection.execute(spans.delete().where(or_(
+            spans.c.class_id.in_(class_ids), spans.c.student_id.in_(student_ids)
+        )))
+        return touched_classes, touched_students, dates
+
+
+def _compact_days(connection, class_id=None, student_ids=None, start_date=None, end_date=None,
+                  newest_first=False, class_ids=None, match_any=False):
+    """
+    Yield rows of the compact class-days of a class or `class_ids`, and of
+    the days whose spans may hold `student_ids`, within a date range. The
+    class and student conditions are combined with AND, or with OR when
+    `match_any` is set.
+    """
+    compact = CompactClassDay.__table__
+    conditions = []
+    if class_id is not None:
+        conditions.append(compact.c.class_id == class_id)
+    if class_ids:
+        conditions.append(compact.c.class_id.in_(class_ids))
+    if student_ids:
+        spans = CompactAttendanceSpan.__table__
+        span_rows = connection.execute(select(spans).where(spans.c.student_id.in_(list(student_ids)))).all()
+        if span_rows:
+            conditions.append(or_(*(
+                and_(compact.c.class_id == span.class_id, compact.c.date.between(span.first_date, span.last_date))
+                for span in span_rows
+            )))
+        elif not match_any:
+            return
+    if not conditions:
+        return
+    query = select(compact).where(or_(*conditions) if match_any else and_(*conditions))
+    if start_date:
+        query = query.where(compact.c.date >= start_date)
+    if end_date:
+        query = query.where(compact.c.date <= end_date)
+    order = compact.c.date.desc() if newest_first else compact.c.date
+    rows = connection.execute(query.order_by(order, compact.c.class_id).execution_options(yield_per=500))
+    try:
+        yield from rows
+    finally:
+        # Readers may stop early (a page of history)
+        rows.close()
+
+
+def _unpack_days(connection, keys):
+    """Move the compact class-days `keys` back into attendance rows."""
+    compact = CompactClassDay.__table__
+    in_keys = tuple_(compact.c.class_id, compact.c.date).in_(keys)
+    records = []
+    for row in connection.execute(select(compact).where(in_keys)):
+        records += unpack_day(row)
+    if records:
+        connection.execute(Attendance.__table__.insert(), records)
+    connection.execute(compact.delete().where(in_keys))
+
+
+def _extend_spans(connection, spans):
+    """Widen the {(student_id, class_id): (first, last)} spans, creating missing ones."""
+    table = CompactAttendanceSpan.__table__
+    existing = {
+        (row.student_id, row.class_id): (row.first_date, row.last_date)
+        for row in connection.execute(select(table).where(
+            tuple_(table.c.student_id, table.c.class_id).in_(list(spans))
+        ))
+    }
+    updates, inserts = [], []
+    for (student_id, class_id), (first, last) in spans.items():
+        row = {'b_student_id': student_id, 'b_class_id': class_id, 'b_first': first, 'b_last': last}
+        if (student_id, class_id) in existing:
+            old_first, old_last = existing[(student_id, class_id)]
+            row.update(b_first=min(first, old_first), b_last=max(last, old_last))
+            updates.append(row)
+        else:
+            inserts.append(row)
+    if updates:
+        connection.execute(table.update().where(
+            table.c.student_id == bindparam('b_student_id'), table.c.class_id == bindparam('b_class_id')
+        ).values(first_date=bindparam('b_first'), last_date=bindparam('b_last')), updates)
+    if inserts:
+        connection.execute(table.insert().values(
+            student_id=bindparam('b_student_id'), class_id=bindparam('b_class_id'),
+            first_date=bindparam('b_first'), last_date=bindparam('b_last')
+        ), inserts)
+
+
+# Attendance rows changed through the ORM (including cascaded deletes of a
+# student or class) refresh their rollups at the end of the flush. Bulk
+# writes in AttendanceService refresh them directly. Deleting a student or
+# class also removes its compact records, and a class its sheet versions.
+
+def _values(target, attr):
+    history = inspect(target).attrs[attr].history
+    return set(history.added) | set(history.deleted) | set(history.unchanged)
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_changed_rollups(session, flush_context):
+    class_ids, student_ids, dates = set(), set(), set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Attendance):
+            class_ids |= _values(obj, 'class_id')
+            student_ids |= _values(obj, 'student_id')
+            dates |= _values(obj, 'date')
+
+    # Compact records of deleted classes and students go with them
+    deleted_classes = {obj.id for obj in session.deleted if isinstance(obj, Classe)}
+    deleted_students = {obj.id for obj in session.deleted if isinstance(obj, Student)}
+    if deleted_classes:
+        session.connection().execute(
+            AttendanceSheet.__table__.delete().where(AttendanceSheet.class_id.in_(deleted_classes))
+        )
+    if deleted_classes or deleted_students:
+        touched = AttendanceService._drop_compact(session.connection(), deleted_classes, deleted_students)
+        class_ids |= touched[0]
+        student_ids |= touched[1]
+        dates |= touched[2]
+    dates.discard(None)
+    if dates:
+        AttendanceService.refresh_rollups(session.connection(), class_ids, student_ids, min(dates), max(dates))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_attendance_events(session):
+    for parent_id, data in session.info.pop(_EVENTS_KEY, ()):
+        event_broker.publish(parent_id, 'attendance', data)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_attendance_events(session):
+    session.info.pop(_EVENTS_KEY, None)
@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models import Classe, Subject, Material
+
+
+class LRUCacheBackend:
+    """In-process cache holding at most `max_entries` values."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by every worker, stored as JSON in Redis."""
+
+    def __init__(self, url, prefix='kia:response:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(self.prefix + key, json.dumps(value), ex=int(ttl))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(self.prefix + '*'))
+        if keys:
+            self._client.delete(*keys)
+
+
+class ResponseCache:
+    """
+    Cache for payloads shared by many parents, such as a class's subjects.
+
+    Uses Redis when RESPONSE_CACHE_REDIS_URL is set, otherwise an
+    in-process LRU. Concurrent misses on the same key in one process wait
+    for a single computation instead of each querying the database.
+    """
+
+    def __init__(self):
+        self.backend = LRUCacheBackend()
+        self.ttl = 600
+        self._key_locks = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', 600)
+        redis_url = app.config.get('RESPONSE_CACHE_REDIS_URL')
+        if redis_url:
+            try:
+                self.backend = RedisCacheBackend(redis_url)
+                return
+            except ImportError:
+                print("Warning: redis package not installed, using in-process response cache")
+        self.backend = LRUCacheBackend(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+
+    def get_or_set(self, key, compute):
+        """Return the cached value for `key`, computing and storing it on a miss."""
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock, waiters = self._key_locks.get(key, (threading.Lock(), 0))
+            self._key_locks[key] = (key_lock, waiters + 1)
+        try:
+            with key_lock:
+                value = self.backend.get(key)
+                if value is None:
+                    generation = self._generations.get(key, 0)
+                    value = compute()
+                    # Skip storing if the key was invalidated while computing
+                    if self._generations.get(key, 0) == generation:
+                        self.backend.set(key, value, self.ttl)
+                return value
+        finally:
+            with self._lock:
+                key_lock, waiters = self._key_locks[key]
+                if waiters == 1:
+                    del self._key_locks[key]
+                else:
+                    self._key_locks[key] = (key_lock, waiters - 1)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+        self.backend.delete(*keys)
+
+    def clear(self):
+        with self._lock:
+            for key in self._generations:
+                self._generations[key] += 1
+        self.backend.clear()
+
+
+response_cache = ResponseCache()
+
+
+def class_subjects_key(class_id):
+    return f'class:{class_id}:subjects'
+
+
+def subject_materials_key(subject_id):
+    return f'subject:{subject_id}:materials'
+
+
+# Collect the entries a flush makes stale and drop them once the
+# transaction commits, so no request re-caches the old rows meanwhile.
+
+_STALE_KEY = 'response_cache_stale_keys'
+
+
+def _values(target, attr):
+    history = inspect(target).attrs[attr].history
+    return set(history.added) | set(history.deleted) | set(history.unchanged)
+
+
+def _subject_class_ids(subject_ids, session):
+    ids = {i for i in subject_ids if i is not None}
+    if not ids:
+        return set()
+    with session.no_autoflush:
+        return {class_id for (class_id,) in session.query(Subject.class_id).filter(Subject.id.in_(ids))}
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stale_responses(session, flush_context):
+    stale = session.info.setdefault(_STALE_KEY, set())
+    changed = session.new | session.dirty | session.deleted
+    subject_ids = set()
+
+    for obj in changed:
+        if isinstance(obj, Material):
+            # A material changes its subject's listing and the subject's count
+            for subject_id in _values(obj, 'subject_id'):
+                stale.add(subject_materials_key(subject_id))
+                subject_ids.add(subject_id)
+        elif isinstance(obj, Subject):
+            stale.add(subject_materials_key(obj.id))
+            for class_id in _values(obj, 'class_id'):
+                stale.add(class_subjects_key(class_id))
+        elif isinstance(obj, Classe):
+            stale.add(class_subjects_key(obj.id))
+
+    stale.update(class_subjects_key(class_id) for class_id in _subject_class_ids(subject_ids, session))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_stale_responses(session):
+    stale = session.info.pop(_STALE_KEY, None)
+    if stale:
+        response_cache.invalidate(*stale)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stale_responses(session):
+    session.info.pop(_STALE_KEY, None)
@@ -0,0 +1,84 @@
+from datetime import datetime
+from app.extensions import db
+from app.models import UserDevice
+from app.services.firebase_service import FirebaseService
+from app.services.topic_service import TopicService
+
+
+class DeviceService:
+    """Registry of users' push notification devices."""
+
+    @staticmethod
+    def register(user_id, token, platform=None):
+        """
+        Record that `token` belongs to a user's device. A token already
+        known, possibly under another account signed in earlier on the same
+        device, is moved to this user. The device follows the topics of the
+        user's classes; subscribing again on every registration also repairs
+        a subscription that failed earlier.
+        """
+        now = datetime.utcnow()
+        device = UserDevice.query.filter_by(token=token).first()
+        if device is None:
+            device = UserDevice(token=token, created_at=now)
+            db.session.add(device)
+        TopicService.queue(TopicService.device_changes(
+            db.session.connection(), user_id, token, previous_user_id=device.user_id
+        ))
+        device.user_id = user_id
+        device.platform = platform or device.platform
+        device.last_seen_at = now
+        return device
+
+    @staticmethod
+    def unregister(user_id, token):
+        """
+        Forget a user's device, e.g. on sign-out, and take it out of the
+        class topics. Returns True if it was registered.
+        """
+        if not UserDevice.query.filter_by(user_id=user_id, token=token).delete(synchronize_session=False):
+            return False
+        TopicService.queue(TopicService.device_changes(db.session.connection(), user_id, token, subscribe=False))
+        return True
+
+    @staticmethod
+    def tokens_by_user(user_ids):
+        """Return {user_id: [token, ...]} for users with devices, most recently seen first."""
+        tokens = {}
+        if not user_ids:
+            return tokens
+        rows = db.session.query(UserDevice.user_id, UserDevice.token).filter(
+            UserDevice.user_id.in_(list(user_ids))
+        ).order_by(UserDevice.user_id, UserDevice.last_seen_at.desc())
+        for user_id, token in rows:
+            tokens.setdefault(user_id, []).append(token)
+        return tokens
+
+    @staticmethod
+    def user_ids_with_devices(user_ids):
+        if not user_ids:
+            return set()
+        return {user_id for (user_id,) in db.session.query(UserDevice.user_id).filter(
+            UserDevice.user_id.in_(list(user_ids))
+        ).distinct()}
+
+    @staticmethod
+    def prune(tokens):
+        """Delete the devices of dead tokens in one statement. The caller commits."""
+        tokens = list(set(tokens))
+        if not tokens:
+            return 0
+        pruned = UserDevice.query.filter(UserDevice.token.in_(tokens)).delete(synchronize_session=False)
+        print(f"Removed {pruned} unregistered device(s)")
+        return pruned
+
+    @staticmethod
+    def send_multicast(tokens, title, body, data=None):
+        """
+        Send a notification to `tokens` (see FirebaseService.send_multicast_notification)
+        and remove the devices FCM reports as gone. The caller commits.
+        """
+        tokens = list(tokens)
+        response = FirebaseService.send_multicast_notification(tokens, title, body, data)
+        DeviceService.prune(FirebaseService.dead_tokens(tokens, response))
+        return response
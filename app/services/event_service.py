@@ -0,0 +1,98 @@
+import json
+import queue
+import threading
+import time
+
+# Sentinel telling a stream to close, so its client reconnects and resyncs
+_CLOSE = object()
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe of per-parent events for the SSE streams.
+
+    Each open stream holds a bounded queue. A stream that falls too far
+    behind is closed rather than allowed to grow without limit; its client
+    reconnects and starts again from a fresh snapshot. Events only reach
+    streams held by the same process, so deployments with several workers
+    should route a parent's stream and the attendance writes through one
+    of them (or add a shared broker backend here).
+    """
+
+    def __init__(self):
+        self.queue_size = 100
+        self.heartbeat_seconds = 15
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.queue_size = app.config.get('EVENT_STREAM_QUEUE_SIZE', 100)
+        self.heartbeat_seconds = app.config.get('EVENT_STREAM_HEARTBEAT_SECONDS', 15)
+
+    def subscribe(self, parent_id):
+        subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(parent_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, parent_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(parent_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[parent_id]
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def publish(self, parent_id, event, data):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(parent_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait((event, data))
+            except queue.Full:
+                # Too far behind: drop its backlog and close the stream
+                with subscription.mutex:
+                    subscription.queue.clear()
+                try:
+                    subscription.put_nowait(_CLOSE)
+                except queue.Full:
+                    pass
+
+    def stream(self, parent_id, subscription, initial_events=(), until=None):
+        """
+        Generate the Server-Sent Events text of a subscription: the
+        `initial_events`, then published events as they arrive, with a
+        comment line every heartbeat so idle connections stay open and
+        dead ones are noticed. Ends at the `until` timestamp, if given.
+        """
+        try:
+            yield 'retry: 5000\n\n'
+            for event, data in initial_events:
+                yield _format(event, data)
+            while True:
+                timeout = self.heartbeat_seconds
+                if until is not None:
+                    remaining = until - time.time()
+                    if remaining <= 0:
+                        return
+                    timeout = min(timeout, remaining)
+                try:
+                    item = subscription.get(timeout=timeout)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if item is _CLOSE:
+                    return
+                yield _format(*item)
+        finally:
+            self.unsubscribe(parent_id, subscription)
+
+
+def _format(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(",", ":"))}\n\n'
+
+
+event_broker = EventBroker()
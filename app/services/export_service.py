@@ -0,0 +1,201 @@
+import csv
+import io
+import zipfile
+from datetime import timedelta
+from itertools import groupby
+from xml.sax.saxutils import escape, quoteattr
+from sqlalchemy import select, and_, or_
+from app.extensions import db
+from app.models import Student, Attendance
+from app.services.attendance_service import AttendanceService
+
+# Rows fetched from the database per round trip while streaming
+EXPORT_BATCH_SIZE = 1000
+
+STATUS_CODES = {'present': 'P', 'absent': 'A'}
+
+
+def date_range(start_date, end_date):
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+def class_register(class_id, start_date, end_date):
+    """
+    Yield (student_name, statuses) for every student of a class, where
+    `statuses` maps date to 'present' or 'absent'.
+
+    Includes the current roster and anyone with attendance in the class
+    during the range. Rows are streamed with yield_per, so only one
+    student's days are held in memory at a time, plus the statuses of the
+    range's compacted class-days (a bit per student per day).
+    """
+    compacted = {}
+    for record in AttendanceService.compact_rows(class_id=class_id, start_date=start_date, end_date=end_date):
+        compacted.setdefault(record['student_id'], {})[record['date']] = record['status']
+
+    in_range = and_(
+        Attendance.class_id == class_id,
+        Attendance.date.between(start_date, end_date)
+    )
+    stmt = select(Student.id, Student.full_name, Attendance.date, Attendance.status).outerjoin(
+        Attendance, and_(Attendance.student_id == Student.id, in_range)
+    ).where(or_(
+        Student.class_id == class_id,
+        Student.id.in_(select(Attendance.student_id).where(in_range)),
+        Student.id.in_(list(compacted))
+    )).order_by(Student.full_name, Student.id, Attendance.date)
+
+    rows = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for (student_id, name), student_rows in groupby(rows, key=lambda row: (row.id, row.full_name)):
+        statuses = {row.date: row.status for row in student_rows if row.date is not None}
+        statuses.update(compacted.get(student_id, {}))
+        yield name, statuses
+
+
+def _matrix_rows(days, register):
+    """Header and one row per student: name, a code per day, totals."""
+    yield ['Student'] + [day.isoformat() for day in days] + ['Present', 'Absent']
+    for name, statuses in register:
+        present = sum(1 for status in statuses.values() if status == 'present')
+        absent = sum(1 for status in statuses.values() if status == 'absent')
+        yield [name] + [STATUS_CODES.get(statuses.get(day), '') for day in days] + [present, absent]
+
+
+def stream_csv(registers, days):
+    """
+    Generate a CSV register, one block per class.
+
+    `registers` is an iterable of (class_name, register) pairs.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the Arabic names as UTF-8
+    yield '\ufeff'
+    for index, (class_name, register) in enumerate(registers):
+        if index:
+            writer.writerow([])
+        writer.writerow([class_name])
+        for row in _matrix_rows(days, register):
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink for ZipFile that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}</Types>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}</Relationships>'
+)
+_SHEET_REL = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def _sheet_names(class_names):
+    """Excel sheet names: at most 31 characters, no []:*?/\\ and unique."""
+    names = []
+    for name in class_names:
+        base = ''.join('_' if ch in '[]:*?/\\' else ch for ch in name)[:31] or 'Sheet'
+        candidate, suffix = base, 2
+        while candidate.lower() in (n.lower() for n in names):
+            candidate = f'{base[:31 - len(str(suffix)) - 1]}-{suffix}'
+            suffix += 1
+        names.append(candidate)
+    return names
+
+
+def _xlsx_row(number, values):
+    cells = []
+    for value in values:
+        if isinstance(value, int):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def stream_xlsx(registers, days, class_names):
+    """
+    Generate an XLSX workbook with one sheet per class.
+
+    Worksheets are deflated into the zip as rows are produced, so memory
+    stays bounded by one row. `class_names` lists the sheets in the order
+    `registers` yields them.
+    """
+    sink = _ChunkWriter()
+    sheet_names = _sheet_names(class_names)
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for n, (_, register) in enumerate(registers, start=1):
+            with archive.open(f'xl/worksheets/sheet{n}.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(_SHEET_START.encode('utf-8'))
+                for number, row in enumerate(_matrix_rows(days, register), start=1):
+                    sheet.write(_xlsx_row(number, row).encode('utf-8'))
+                    # The compressor emits output in blocks; most rows add nothing yet
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+                sheet.write(_SHEET_END.encode('utf-8'))
+
+        numbers = range(1, len(sheet_names) + 1)
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES.format(
+            sheets=''.join(_SHEET_CONTENT_TYPE.format(n=n) for n in numbers)))
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(sheets=''.join(
+            f'<sheet name={quoteattr(name)} sheetId="{n}" r:id="rId{n}"/>'
+            for n, name in zip(numbers, sheet_names))))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.format(
+            sheets=''.join(_SHEET_REL.format(n=n) for n in numbers)))
+    yield sink.drain()
@@ -1,11 +1,20 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 import firebase_admin
 from firebase_admin import credentials, messaging
+from flask import current_app, has_app_context
+
+# FCM accepts at most this many tokens in one multicast message
+MULTICAST_LIMIT = 500
 
 
 class FirebaseService:
     _initialized = False
 
+    # Callable sending one MulticastMessage and returning a BatchResponse;
+    # benchmarks swap in a fake FCM here
+    multicast_transport = staticmethod(messaging.send_each_for_multicast)
+
     @classmethod
     def initialize(cls):
         """Initialize Firebase Admin SDK."""
@@ -79,52 +88,64 @@ class FirebaseService:
             return None
 
     @staticmethod
-    def send_multicast_notification(tokens, title, body, data=None):
+    def send_multicast_notification(tokens, title, body, data=None, workers=None):
         """
         Send a notification to multiple devices.
 
+        The tokens are split into chunks of MULTICAST_LIMIT, the most FCM
+        takes in one message, and the chunks are sent concurrently by up to
+        `workers` threads (FCM_MULTICAST_WORKERS by default).
+
         Args:
             tokens (list): List of FCM device tokens
             title (str): Notification title
             body (str): Notification body
             data (dict): Additional data to send with notification
+            workers (int): Chunks sent at the same time
 
         Returns:
-            BatchResponse: Response containing success and failure info
+            BatchResponse: One response per token, in the order of `tokens`.
+            A chunk that could not be sent at all fails each of its tokens
+            with the chunk's error.
         """
-        try:
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body,
-                ),
-                data=data or {},
-                tokens=tokens,
-                android=messaging.AndroidConfig(
-                    priority='high',
-                    notification=messaging.AndroidNotification(
-                        sound='default',
-                        channel_id='high_importance_channel',
-                    ),
-                ),
-                apns=messaging.APNSConfig(
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            sound='default',
-                            badge=1,
-                        ),
-                    ),
-                ),
-            )
+        tokens = list(tokens)
+        chunks = [tokens[i:i + MULTICAST_LIMIT] for i in range(0, len(tokens), MULTICAST_LIMIT)]
+        if not chunks:
+            return messaging.BatchResponse([])
+        if workers is None:
+            workers = current_app.config.get('FCM_MULTICAST_WORKERS', 4) if has_app_context() else 4
+
+        def send_chunk(chunk):
+            try:
+                return FirebaseService.multicast_transport(
+                    _multicast_message(chunk, title, body, data)
+                ).responses
+            except Exception as e:
+                return [messaging.SendResponse(None, e)] * len(chunk)
+
+        if len(chunks) == 1 or workers <= 1:
+            results = map(send_chunk, chunks)
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+                results = list(pool.map(send_chunk, chunks))
+        response = messaging.BatchResponse([result for chunk_results in results for result in chunk_results])
+
+        print(f"Successfully sent {response.success_count} notifications in {len(chunks)} chunk(s)")
+        if response.failure_count > 0:
+            print(f"Failed to send {response.failure_count} notifications")
+        return response
 
-            response = messaging.send_multicast(message)
-            print(f"Successfully sent {response.success_count} notifications")
-            if response.failure_count > 0:
-                print(f"Failed to send {response.failure_count} notifications")
-            return response
-        except Exception as e:
-            print(f"Error sending multicast notification: {e}")
-            return None
+    @staticmethod
+    def dead_tokens(tokens, response):
+        """
+        Tokens of a multicast `response` that FCM will never deliver to
+        again: the app was uninstalled or the token belongs to another
+        Firebase project. Other failures may be temporary and are not listed.
+        """
+        return [
+            token for token, result in zip(tokens, response.responses)
+            if isinstance(result.exception, (messaging.UnregisteredError, messaging.SenderIdMismatchError))
+        ]
 
     @staticmethod
     def send_to_topic(topic, title, body, data=None):
@@ -171,3 +192,29 @@ class FirebaseService:
         except Exception as e:
             print(f"Error sending topic notification: {e}")
             return None
+
+
+def _multicast_message(tokens, title, body, data=None):
+    return messaging.MulticastMessage(
+        notification=messaging.Notification(
+            title=title,
+            body=body,
+        ),
+        data=data or {},
+        tokens=tokens,
+        android=messaging.AndroidConfig(
+            priority='high',
+            notification=messaging.AndroidNotification(
+                sound='default',
+                channel_id='high_importance_channel',
+            ),
+        ),
+        apns=messaging.APNSConfig(
+            payload=messaging.APNSPayload(
+                aps=messaging.Aps(
+                    sound='default',
+                    badge=1,
+                ),
+            ),
+        ),
+    )
@@ -0,0 +1,370 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, insert, inspect, select, update, and_, or_
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import NotificationBatch, OutboxNotification
+from app.services.device_service import DeviceService
+from app.services.firebase_service import FirebaseService
+from app.utils.upsert import NATIVE_UPSERT_DIALECTS, dialect_insert
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+# A claimed row whose worker died becomes due again after this long
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def _backoff(attempts):
+    """Delay before the next try: 30s, 1m, 2m, 4m, ... capped at an hour."""
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+class NotificationService:
+    """
+    Persistent outbox for push notifications, delivered off the request
+    path, with idempotency keys, per-recipient rate limits and digests of
+    notifications queued close together.
+    """
+
+    @staticmethod
+    def create_batch(kind, description=None, created_by=None):
+        batch = NotificationBatch(kind=kind, description=description, created_by=created_by)
+        db.session.add(batch)
+        return batch
+
+    @staticmethod
+    def discard_batch(batch):
+        """Drop a batch nothing was queued in, so no empty batch gets listed. The caller commits."""
+        if inspect(batch).persistent:
+            db.session.delete(batch)
+        else:
+            db.session.expunge(batch)
+
+    @staticmethod
+    def enqueue(user_id, kind, title, body, data=None, batch=None, idempotency_key=None, topic=None):
+        """
+        Queue a notification for a user, or for an FCM `topic` when
+        user_id is None. It is written with the caller's transaction, so it
+        is only sent if that transaction commits.
+
+        A notification whose `idempotency_key` was already queued is not
+        queued again; None is returned instead. The key is claimed by the
+        INSERT itself, so concurrent callers cannot both queue it and the
+        loser's transaction is left intact. The notification falls due
+        at the end of the recipient's coalescing window, so whatever else
+        is queued for them meanwhile goes out in the same digest push.
+        """
+        notification = OutboxNotification(
+            user_id=user_id,
+            topic=topic,
+            idempotency_key=idempotency_key,
+            kind=kind,
+            title=title,
+            body=body,
+            next_attempt_at=NotificationService._window_end(user_id, topic)
+        )
+        notification.data = data
+        if not idempotency_key:
+            notification.batch = batch
+            db.session.add(notification)
+            return notification
+
+        if batch is not None and batch.id is None:
+            db.session.flush()
+        values = {
+            column.key: getattr(notification, column.key)
+            for column in OutboxNotification.__table__.columns if getattr(notification, column.key) is not None
+        }
+        values['batch_id'] = batch.id if batch is not None else None
+        notification_id = _insert_once(values)
+        return db.session.get(OutboxNotification, notification_id) if notification_id else None
+
+    @staticmethod
+    def _window_end(user_id, topic):
+        """When a notification queued now for this recipient falls due."""
+        now = datetime.utcnow()
+        seconds = current_app.config.get('NOTIFICATION_COALESCE_SECONDS', 60)
+        if not seconds:
+            return now
+        recipient = (OutboxNotification.user_id == user_id if user_id is not None
+                     else OutboxNotification.topic == topic)
+        # Join the window a queued, not yet tried notification already opened
+        open_window = db.session.query(func.min(OutboxNotification.next_attempt_at)).filter(
+            recipient,
+            OutboxNotification.status == 'pending',
+            OutboxNotification.attempts == 0,
+            OutboxNotification.next_attempt_at > now
+        ).scalar()
+        return open_window or now + timedelta(seconds=seconds)
+
+    @staticmethod
+    def enqueue_absences(students, attendance_date, batch=None):
+        """
+        Queue an absence notice to the parent of each of `students` who has
+        a device registered, once per student and day. Returns the number
+        queued.
+        """
+        reachable = DeviceService.user_ids_with_devices({student.parent_id for student in students})
+        queued = 0
+        for student in students:
+            parent = student.parent
+            if parent and parent.id in reachable:
+                notification = NotificationService.enqueue(
+                    parent.id, 'attendance',
+                    title='تنبيه غياب',
+                    body=f'{student.full_name} غائب اليوم - {attendance_date.strftime("%Y-%m-%d")}',
+                    data={
+                        'type': 'attendance',
+                        'student_id': student.id,
+                        'status': 'absent',
+                        'date': attendance_date.isoformat()
+                    },
+                    batch=batch,
+                    idempotency_key=f'absence:{student.id}:{attendance_date.isoformat()}'
+                )
+                queued += notification is not None
+        return queued
+
+    @staticmethod
+    def claim_due(limit):
+        """
+        Mark up to `limit` due notifications as being sent by this worker
+        and return them. Safe to call from several workers at once.
+        """
+        now = datetime.utcnow()
+        due = or_(
+            and_(OutboxNotification.status == 'pending', OutboxNotification.next_attempt_at <= now),
+            and_(OutboxNotification.status == 'sending', OutboxNotification.locked_until < now)
+        )
+        token = uuid.uuid4().hex
+        candidates = select(OutboxNotification.id).where(due).order_by(OutboxNotification.next_attempt_at).limit(limit)
+        db.session.execute(
+            update(OutboxNotification)
+            .where(OutboxNotification.id.in_(candidates.scalar_subquery()), due)
+            .values(status='sending', claim_token=token, locked_until=now + CLAIM_LEASE)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return OutboxNotification.query.filter_by(
+            claim_token=token, status='sending'
+        ).all()
+
+    @staticmethod
+    def dispatch_due(batch_size=50, workers=None):
+        """
+        Send one batch of due notifications through a pool of threads.
+
+        Notifications are grouped by recipient: a single one is sent as is,
+        several become one digest push. A user's push goes to every device
+        and counts as sent if any device got it. Recipients that already got
+        NOTIFICATION_RATE_LIMIT pushes within the rate window keep their
+        notifications queued until a slot frees up. Failed sends are retried
+        with exponential backoff up to MAX_ATTEMPTS. Devices FCM reports as
+        unregistered are removed in one statement at the end of the batch.
+        Returns the number of notifications processed.
+        """
+        notifications = NotificationService.claim_due(batch_size)
+        if not notifications:
+            return 0
+
+        workers = workers or current_app.config.get('NOTIFICATION_WORKERS', 4)
+        groups = {}
+        for notification in notifications:
+            groups.setdefault(_recipient(notification), []).append(notification)
+        for recipient, retry_at in NotificationService._rate_limited(groups).items():
+            for notification in groups.pop(recipient):
+                NotificationService._defer(notification, retry_at)
+
+        tokens = DeviceService.tokens_by_user({key for kind, key in groups if kind == 'user'})
+        jobs = []
+        for (kind, key), group in groups.items():
+            user_tokens = tokens.get(key, []) if kind == 'user' else None
+            jobs.append((group, kind, key, user_tokens, *_digest(group)))
+
+        # Only the FCM calls run in the pool; results are recorded here
+        dead_tokens = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            responses = pool.map(lambda job: _send(*job[1:]), jobs)
+            for (group, kind, _, user_tokens, *_), response in zip(jobs, responses):
+                if kind == 'topic':
+                    sent, error, retry = response, 'FCM topic send failed', True
+                elif not user_tokens:
+                    sent, error, retry = None, 'No FCM token', False
+                else:
+                    dead = FirebaseService.dead_tokens(user_tokens, response)
+                    dead_tokens += dead
+                    sent = next((result.message_id for result in response.responses if result.success), None)
+                    error = None if sent else next(str(result.exception) for result in response.responses)
+                    # Nothing left to retry once every device is gone
+                    retry = len(dead) < len(user_tokens)
+                for notification in group:
+                    NotificationService._record(notification, sent, error, retry=retry)
+
+        DeviceService.prune(dead_tokens)
+        db.session.commit()
+        return len(notifications)
+
+    @staticmethod
+    def _rate_limited(groups):
+        """
+        Return {recipient: when its next push is allowed} for the recipients
+        of `groups` that reached NOTIFICATION_RATE_LIMIT pushes within the
+        last NOTIFICATION_RATE_WINDOW_SECONDS. A digest counts as one push.
+        """
+        limit = current_app.config.get('NOTIFICATION_RATE_LIMIT', 6)
+        if not limit:
+            return {}
+        window = timedelta(seconds=current_app.config.get('NOTIFICATION_RATE_WINDOW_SECONDS', 3600))
+        since = datetime.utcnow() - window
+        limited = {}
+        for kind, column in (('user', OutboxNotification.user_id), ('topic', OutboxNotification.topic)):
+            keys = {key for recipient_kind, key in groups if recipient_kind == kind}
+            if not keys:
+                continue
+            rows = db.session.query(
+                column, func.count(func.distinct(OutboxNotification.message_id)), func.min(OutboxNotification.sent_at)
+            ).filter(column.in_(keys), OutboxNotification.sent_at >= since).group_by(column)
+            for key, pushes, first_sent_at in rows:
+                if pushes >= limit:
+                    limited[(kind, key)] = first_sent_at + window
+        return limited
+
+    @staticmethod
+    def _defer(notification, retry_at):
+        """Put a claimed notification back in the queue without counting an attempt."""
+        notification.status = 'pending'
+        notification.next_attempt_at = retry_at
+        notification.claim_token = None
+        notification.locked_until = None
+
+    @staticmethod
+    def _record(notification, message_id, error=None, retry=True):
+        now = datetime.utcnow()
+        notification.attempts += 1
+        notification.claim_token = None
+        notification.locked_until = None
+        if message_id:
+            notification.status = 'sent'
+            notification.message_id = message_id
+            notification.sent_at = now
+            notification.last_error = None
+        elif retry and notification.attempts < MAX_ATTEMPTS:
+            notification.status = 'pending'
+            notification.next_attempt_at = now + _backoff(notification.attempts)
+            notification.last_error = error
+        else:
+            notification.status = 'failed'
+            notification.last_error = error
+
+    @staticmethod
+    def status_counts(batch_ids):
+        """Return {batch_id: {status: count}} for the given batches."""
+        counts = {batch_id: {} for batch_id in batch_ids}
+        if not counts:
+            return counts
+        rows = db.session.query(
+            OutboxNotification.batch_id, OutboxNotification.status, func.count(OutboxNotification.id)
+        ).filter(OutboxNotification.batch_id.in_(counts.keys())).group_by(
+            OutboxNotification.batch_id, OutboxNotification.status
+        )
+        for batch_id, status, count in rows:
+            counts[batch_id][status] = count
+        return counts
+
+
+def _insert_once(values):
+    """Insert an outbox row unless its idempotency key is taken. Returns the new id or None."""
+    table = OutboxNotification.__table__
+    if db.engine.dialect.name in NATIVE_UPSERT_DIALECTS:
+        stmt = dialect_insert(db.engine.dialect.name)(table).values(values)
+        stmt = stmt.on_conflict_do_nothing(index_elements=['idempotency_key']).returning(table.c.id)
+        return db.session.execute(stmt).scalar()
+    try:
+        with db.session.begin_nested():
+            return db.session.execute(insert(table).values(values)).inserted_primary_key[0]
+    except IntegrityError:
+        return None
+
+
+def _recipient(notification):
+    if notification.user_id is not None:
+        return ('user', notification.user_id)
+    return ('topic', notification.topic)
+
+
+# Lines of a digest body; the rest are summarized as a count
+DIGEST_LINES = 5
+
+
+def _digest(notifications):
+    """Title, body and data of the push that delivers `notifications`."""
+    if len(notifications) == 1:
+        notification = notifications[0]
+        data = {key: str(value) for key, value in notification.data.items()}
+        return notification.title, notification.body, data
+    lines = [notification.body for notification in notifications]
+    if len(lines) > DIGEST_LINES:
+        lines = lines[:DIGEST_LINES - 1] + [f'و{len(lines) - DIGEST_LINES + 1} إشعارات أخرى']
+    return f'لديك {len(notifications)} إشعارات جديدة', '\n'.join(lines), {
+        'type': 'digest',
+        'count': str(len(notifications)),
+        'kinds': ','.join(sorted({notification.kind for notification in notifications})),
+    }
+
+
+def _send(kind, key, tokens, title, body, data):
+    if kind == 'topic':
+        return FirebaseService.send_to_topic(key, title, body, data)
+    if not tokens:
+        return None
+    return FirebaseService.send_multicast_notification(tokens, title, body, data, workers=1)
+
+
+class BackgroundDispatcher:
+    """
+    Thread that drains the outbox inside the web process.
+
+    It starts on the first wake() after a request queues notifications and
+    then polls every NOTIFICATION_POLL_SECONDS so retries go out when their
+    backoff expires. Deployments with a separate `flask notifications worker`
+    process can disable it with NOTIFICATION_BACKGROUND_DISPATCH = False.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def wake(self):
+        if not self.app or not self.app.config.get('NOTIFICATION_BACKGROUND_DISPATCH', True):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        poll_seconds = self.app.config.get('NOTIFICATION_POLL_SECONDS', 30)
+        while True:
+            self._wake.wait(timeout=poll_seconds)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    while NotificationService.dispatch_due():
+                        pass
+                except Exception as e:
+                    print(f"Error dispatching notifications: {e}")
+                finally:
+                    db.session.remove()
+
+
+dispatcher = BackgroundDispatcher()
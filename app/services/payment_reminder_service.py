@@ -0,0 +1,121 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import select, update, or_
+from app.extensions import db
+from app.models import Payment, Student, UserDevice
+from app.services.notification_service import NotificationService
+
+REMINDER_TITLE = "تذكير بالدفع - Payment Reminder"
+
+# Payment ids per UPDATE when marking reminded payments
+_MARK_CHUNK = 500
+
+
+class PaymentReminderService:
+    """
+    Reminders to parents about unpaid payments that are due soon or
+    overdue: one outbox notification per parent covering all of their
+    children's payments, so the dispatcher sends each parent one multicast
+    to all of their devices.
+
+    Each payment records when it was last reminded. A sweep only picks up
+    payments not reminded within PAYMENT_REMINDER_INTERVAL_DAYS, so it can
+    be run as often as wanted and a rerun finds nothing to do.
+    """
+
+    @staticmethod
+    def due_payments(today=None, days_ahead=None, interval_days=None, payment_ids=None):
+        """
+        Find the unpaid payments to remind parents with a registered device
+        about, with one query over the unpaid-by-due-date index joined to
+        the students. Returns rows of (payment_id, amount, due_date,
+        student_name, parent_id) ordered by parent and due date.
+
+        By default these are payments due within `days_ahead` days or
+        overdue and not reminded in the last `interval_days`; given
+        `payment_ids`, exactly those payments that are still unpaid.
+        """
+        has_device = select(UserDevice.id).where(UserDevice.user_id == Student.parent_id).exists()
+        query = db.session.query(
+            Payment.id, Payment.amount, Payment.due_date, Student.full_name, Student.parent_id
+        ).join(Student, Student.id == Payment.student_id).filter(
+            Payment.is_paid.is_(False),
+            has_device
+        )
+
+        if payment_ids is not None:
+            query = query.filter(Payment.id.in_(payment_ids))
+        else:
+            today = today or date.today()
+            if days_ahead is None:
+                days_ahead = current_app.config.get('PAYMENT_REMINDER_DAYS_AHEAD', 3)
+            if interval_days is None:
+                interval_days = current_app.config.get('PAYMENT_REMINDER_INTERVAL_DAYS', 3)
+            reminded_before = datetime.utcnow() - timedelta(days=interval_days)
+            query = query.filter(
+                Payment.due_date <= today + timedelta(days=days_ahead),
+                or_(Payment.last_reminded_at.is_(None), Payment.last_reminded_at < reminded_before)
+            )
+
+        return query.order_by(Student.parent_id, Payment.due_date, Payment.id).all()
+
+    @staticmethod
+    def enqueue(rows, today=None):
+        """
+        Queue one reminder per parent for rows from due_payments() and mark
+        their payments as reminded, in the caller's transaction. A parent
+        already reminded today is skipped; their payments stay due for the
+        next sweep. Returns (parents, payments) queued.
+        """
+        today = today or date.today()
+        by_parent = {}
+        for row in rows:
+            by_parent.setdefault(row.parent_id, []).append(row)
+
+        parents, reminded = 0, []
+        for parent_id, payments in by_parent.items():
+            notification = NotificationService.enqueue(
+                parent_id, 'payment_reminder',
+                title=REMINDER_TITLE,
+                body=_body(payments, today),
+                data={
+                    'type': 'payment_reminder',
+                    'payment_ids': ','.join(str(row.id) for row in payments),
+                    'count': str(len(payments)),
+                    'total': str(sum((Decimal(row.amount) for row in payments), Decimal('0'))),
+                },
+                idempotency_key=f'payment_reminders:{parent_id}:{today.isoformat()}'
+            )
+            if notification is not None:
+                parents += 1
+                reminded += [row.id for row in payments]
+
+        now = datetime.utcnow()
+        for i in range(0, len(reminded), _MARK_CHUNK):
+            db.session.execute(
+                update(Payment)
+                .where(Payment.id.in_(reminded[i:i + _MARK_CHUNK]))
+                .values(last_reminded_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        return parents, len(reminded)
+
+    @staticmethod
+    def sweep(today=None, days_ahead=None, interval_days=None):
+        """Queue and commit the reminders that are due. Returns (parents, payments) queued."""
+        rows = PaymentReminderService.due_payments(today, days_ahead, interval_days)
+        queued = PaymentReminderService.enqueue(rows, today)
+        db.session.commit()
+        return queued
+
+
+def _body(payments, today):
+    if len(payments) == 1:
+        row = payments[0]
+        return f"مستحق دفع {row.amount} ريال للطالب {row.full_name}"
+    lines = []
+    for row in payments:
+        when = 'متأخر منذ' if row.due_date < today else 'مستحق في'
+        lines.append(f"{row.full_name}: {row.amount} ريال - {when} {row.due_date.isoformat()}")
+    return '\n'.join(lines)
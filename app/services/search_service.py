@@ -0,0 +1,221 @@
+import re
+from sqlalchemy import event, inspect, select, text, table, column, false
+from sqlalchemy.exc import OperationalError
+from app.extensions import db
+from app.models import User, Student, SearchEntry
+
+# Harakat, Quranic annotation marks and tatweel carry no meaning for name lookup
+_ARABIC_MARKS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+# Fold letter variants people type interchangeably, and Arabic-Indic digits
+_ARABIC_FOLDING = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+})
+
+# SQLite keeps an FTS5 index over search_entries in sync through triggers
+_FTS_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        content, content='search_entries', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS search_entries_ai AFTER INSERT ON search_entries BEGIN
+        INSERT INTO search_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_entries_ad AFTER DELETE ON search_entries BEGIN
+        INSERT INTO search_fts(search_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_entries_au AFTER UPDATE ON search_entries BEGIN
+        INSERT INTO search_fts(search_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO search_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+# The FTS5 table and its hidden column named after it, for MATCH in Core selects
+_FTS_TABLE = table('search_fts', column('rowid'), column('search_fts'))
+
+
+def normalize(value):
+    """Normalize text for matching: lowercase, strip Arabic marks, fold letter variants."""
+    if not value:
+        return ''
+    value = _ARABIC_MARKS.sub('', value.lower()).translate(_ARABIC_FOLDING)
+    return ' '.join(value.split())
+
+
+def _search_terms(query):
+    return re.findall(r'\w+', normalize(query))
+
+
+class SearchService:
+    """
+    Name/email/phone search over students and parents.
+
+    Nothing runs at startup: the `20261018_search_entries` migration
+    creates the SQLite FTS5 index and backfills the entries, and
+    `flask search reindex` rebuilds both. Searches use the FTS5 index once
+    it exists and fall back to LIKE otherwise.
+    """
+    _use_fts = False
+
+    @staticmethod
+    def create_fts(connection):
+        """
+        Create the FTS5 index over search_entries and its sync triggers on
+        SQLite, filling it from any existing entries. Returns False if the
+        database cannot have one.
+        """
+        if connection.dialect.name != 'sqlite':
+            return False
+        try:
+            with connection.begin_nested():
+                had_fts = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'search_fts'"
+                )).first() is not None
+                for statement in _FTS_SETUP:
+                    connection.execute(text(statement))
+                if not had_fts:
+                    connection.execute(text("INSERT INTO search_fts(search_fts) VALUES ('rebuild')"))
+        except OperationalError as e:
+            print(f"Warning: SQLite FTS5 unavailable, falling back to LIKE search: {e}")
+            return False
+        return True
+
+    @staticmethod
+    def reindex(connection):
+        """
+        Rebuild every search entry from the students and users tables.
+        Reads only the indexed columns, so it also runs from migrations
+        against older schemas. The caller commits.
+        """
+        students, users, entries = Student.__table__, User.__table__, SearchEntry.__table__
+        connection.execute(entries.delete())
+        rows = [
+            {'kind': 'student', 'ref_id': student_id, 'content': normalize(full_name)}
+            for student_id, full_name in connection.execute(select(students.c.id, students.c.full_name))
+        ] + [
+            {'kind': 'parent', 'ref_id': user_id, 'content': _contact_content(*contact)}
+            for user_id, *contact in connection.execute(
+                select(users.c.id, users.c.full_name, users.c.email, users.c.phone).where(users.c.role == 'parent')
+            )
+        ]
+        if rows:
+            connection.execute(entries.insert(), rows)
+        return len(rows)
+
+    @classmethod
+    def _fts_ready(cls):
+        # Checked until the index shows up, e.g. after `flask search reindex`
+        if not cls._use_fts and db.engine.dialect.name == 'sqlite':
+            cls._use_fts = db.session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'search_fts'"
+            )).first() is not None
+        return cls._use_fts
+
+    @classmethod
+    def search(cls, query, kind, limit=10):
+        """
+        Return ids of students or parents (`kind`) whose indexed text has a
+        word starting with every term of `query`, best matches first.
+        """
+        terms = _search_terms(query)
+        if not terms:
+            return []
+
+        if cls._fts_ready():
+            match = ' '.join(f'"{term}"*' for term in terms)
+            rows = db.session.execute(text(
+                "SELECT e.ref_id FROM search_fts "
+                "JOIN search_entries e ON e.id = search_fts.rowid "
+                "WHERE search_fts MATCH :match AND e.kind = :kind "
+                "ORDER BY search_fts.rank LIMIT :limit"
+            ), {'match': match, 'kind': kind, 'limit': limit})
+            return [row[0] for row in rows]
+
+        return list(db.session.scalars(cls.matching(query, kind).limit(limit)))
+
+    @classmethod
+    def matching(cls, query, kind):
+        """
+        Select of every id search() can find for `query`, unranked and
+        unlimited, to filter a list query with so it pages through all
+        matches.
+        """
+        terms = _search_terms(query)
+        q = select(SearchEntry.ref_id).where(SearchEntry.kind == kind)
+        if not terms:
+            return q.where(false())
+
+        if cls._fts_ready():
+            match = ' '.join(f'"{term}"*' for term in terms)
+            return q.where(SearchEntry.id.in_(
+                select(_FTS_TABLE.c.rowid).where(_FTS_TABLE.c.search_fts.match(match))
+            ))
+
+        for term in terms:
+            # Terms are word characters only; '_' is the one LIKE wildcard among them
+            q = q.where(SearchEntry.content.like(f"%{term.replace('_', '/_')}%", escape='/'))
+        return q
+
+
+def _student_content(student):
+    return normalize(student.full_name)
+
+
+def _user_content(user):
+    return _contact_content(user.full_name, user.email, user.phone)
+
+
+def _contact_content(full_name, email, phone):
+    return normalize(' '.join(filter(None, [full_name, email, phone])))
+
+
+def _write_entry(connection, kind, ref_id, content):
+    table = SearchEntry.__table__
+    connection.execute(table.delete().where(table.c.kind == kind, table.c.ref_id == ref_id))
+    if content is not None:
+        connection.execute(table.insert().values(kind=kind, ref_id=ref_id, content=content))
+
+
+def _changed(target, *attrs):
+    state = inspect(target)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+# Keep the index in step with every ORM write to students and users
+
+@event.listens_for(Student, 'after_insert')
+def _index_new_student(mapper, connection, target):
+    _write_entry(connection, 'student', target.id, _student_content(target))
+
+
+@event.listens_for(Student, 'after_update')
+def _index_updated_student(mapper, connection, target):
+    if _changed(target, 'full_name'):
+        _write_entry(connection, 'student', target.id, _student_content(target))
+
+
+@event.listens_for(Student, 'after_delete')
+def _unindex_student(mapper, connection, target):
+    _write_entry(connection, 'student', target.id, None)
+
+
+@event.listens_for(User, 'after_insert')
+def _index_new_user(mapper, connection, target):
+    if target.role == 'parent':
+        _write_entry(connection, 'parent', target.id, _user_content(target))
+
+
+@event.listens_for(User, 'after_update')
+def _index_updated_user(mapper, connection, target):
+    if _changed(target, 'full_name', 'email', 'phone', 'role'):
+        content = _user_content(target) if target.role == 'parent' else None
+        _write_entry(connection, 'parent', target.id, content)
+
+
+@event.listens_for(User, 'after_delete')
+def _unindex_user(mapper, connection, target):
+    _write_entry(connection, 'parent', target.id, None)
@@ -0,0 +1,182 @@
+import csv
+import io
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, select, update, literal
+from app.extensions import db
+from app.models import User, UserDevice, TokenAudit, TokenAuditResult
+from app.services.device_service import DeviceService
+from app.services.firebase_service import FirebaseService, MULTICAST_LIMIT
+
+AUDIT_TITLE = "إشعار تجريبي - Test Notification"
+AUDIT_BODY = "هذا إشعار تجريبي من أكاديمية كيا للتحقق من عمل النظام"
+
+# An audit whose worker has not reported for this long is taken as dead
+AUDIT_STALE_AFTER = timedelta(minutes=10)
+
+REPORT_COLUMNS = ['user_id', 'email', 'full_name', 'role', 'device_id', 'status', 'message_id', 'error']
+
+
+class TokenAuditService:
+    """
+    Background check of every registered FCM token.
+
+    Sends a test push to each device in rounds of chunked multicasts and
+    records one result row per device, plus one per user without a device,
+    so the check runs outside any request and its report can be fetched
+    once it is done.
+
+    Requests only queue a pending audit; `flask notifications worker` or a
+    scheduled `flask notifications audit-tokens` runs it. Web servers that
+    allow threads can run it in-process with TOKEN_AUDIT_BACKGROUND_THREAD.
+    """
+
+    @staticmethod
+    def active():
+        """The audit still pending or running, if any."""
+        return TokenAudit.query.filter(
+            TokenAudit.status.in_(('pending', 'running')),
+            TokenAudit.updated_at >= datetime.utcnow() - AUDIT_STALE_AFTER
+        ).order_by(TokenAudit.id.desc()).first()
+
+    @staticmethod
+    def start(created_by=None):
+        """
+        Queue a pending audit for a worker, or run it on a background thread
+        if TOKEN_AUDIT_BACKGROUND_THREAD is set. Returns the audit.
+        """
+        audit = TokenAudit(status='pending', created_by=created_by)
+        db.session.add(audit)
+        db.session.commit()
+        if current_app.config.get('TOKEN_AUDIT_BACKGROUND_THREAD', False):
+            threading.Thread(
+                target=_run_in_app, args=(current_app._get_current_object(), audit.id),
+                name=f'token-audit-{audit.id}', daemon=True
+            ).start()
+        return audit
+
+    @staticmethod
+    def run_pending():
+        """
+        Run the queued audits, oldest first. Each is claimed with a
+        conditional update, so concurrent workers never run the same audit.
+        Audits left pending past AUDIT_STALE_AFTER are failed instead: a
+        newer one may have been queued since. Returns the audits run.
+        """
+        now = datetime.utcnow()
+        db.session.execute(
+            update(TokenAudit)
+            .where(TokenAudit.status == 'pending', TokenAudit.updated_at < now - AUDIT_STALE_AFTER)
+            .values(status='failed', error='Not picked up by a worker in time', finished_at=now, updated_at=now)
+        )
+        db.session.commit()
+
+        audits = []
+        pending_ids = db.session.scalars(
+            select(TokenAudit.id).where(TokenAudit.status == 'pending').order_by(TokenAudit.id)
+        ).all()
+        for audit_id in pending_ids:
+            claimed = db.session.execute(
+                update(TokenAudit)
+                .where(TokenAudit.id == audit_id, TokenAudit.status == 'pending')
+                .values(status='running', updated_at=datetime.utcnow())
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                audits.append(TokenAuditService.run(audit_id))
+        return audits
+
+    @staticmethod
+    def run(audit_id, workers=None):
+        """
+        Carry out an audit. Each round sends to as many devices as `workers`
+        threads can send in parallel chunks, then stores the results,
+        removes unregistered devices and commits the progress.
+        """
+        audit = TokenAudit.query.get(audit_id)
+        workers = workers or current_app.config.get('FCM_MULTICAST_WORKERS', 4)
+        round_size = MULTICAST_LIMIT * workers
+        try:
+            audit.status = 'running'
+            audit.started_at = datetime.utcnow()
+            audit.total_devices = UserDevice.query.count()
+            # Users without a device go into the report as they are
+            audit.users_without_devices = db.session.execute(
+                insert(TokenAuditResult).from_select(
+                    ['audit_id', 'user_id', 'status'],
+                    select(literal(audit.id), User.id, literal('no_device')).where(~User.devices.any())
+                )
+            ).rowcount
+            db.session.commit()
+
+            last_id = 0
+            while True:
+                devices = db.session.query(UserDevice.id, UserDevice.user_id, UserDevice.token).filter(
+                    UserDevice.id > last_id
+                ).order_by(UserDevice.id).limit(round_size).all()
+                if not devices:
+                    break
+                last_id = devices[-1].id
+
+                tokens = [device.token for device in devices]
+                response = FirebaseService.send_multicast_notification(
+                    tokens, AUDIT_TITLE, AUDIT_BODY, data={'type': 'admin_test'}, workers=workers
+                )
+                db.session.execute(insert(TokenAuditResult), [{
+                    'audit_id': audit.id,
+                    'user_id': device.user_id,
+                    'device_id': device.id,
+                    'status': 'success' if result.success else 'error',
+                    'message_id': result.message_id,
+                    'error': None if result.success else str(result.exception)
+                } for device, result in zip(devices, response.responses)])
+
+                audit.pruned += DeviceService.prune(FirebaseService.dead_tokens(tokens, response))
+                audit.processed += len(devices)
+                audit.sent += response.success_count
+                audit.failed += response.failure_count
+                db.session.commit()
+
+            audit.status = 'completed'
+            audit.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            audit.status = 'failed'
+            audit.error = str(e)
+            audit.finished_at = datetime.utcnow()
+            db.session.commit()
+            print(f"Error running token audit {audit_id}: {e}")
+        return audit
+
+    @staticmethod
+    def stream_report(audit_id):
+        """Generate the CSV report of an audit, one row per device or device-less user."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM so Excel opens the Arabic names as UTF-8
+        yield '\ufeff'
+        writer.writerow(REPORT_COLUMNS)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        rows = db.session.query(
+            TokenAuditResult.user_id, User.email, User.full_name, User.role, TokenAuditResult.device_id,
+            TokenAuditResult.status, TokenAuditResult.message_id, TokenAuditResult.error
+        ).join(User, User.id == TokenAuditResult.user_id).filter(
+            TokenAuditResult.audit_id == audit_id
+        ).order_by(TokenAuditResult.user_id, TokenAuditResult.id).yield_per(1000)
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+
+def _run_in_app(app, audit_id):
+    with app.app_context():
+        try:
+            TokenAuditService.run(audit_id)
+        finally:
+            db.session.remove()
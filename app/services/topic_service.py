@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from firebase_admin import messaging
+from sqlalchemy import event, inspect, select, tuple_
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import Student, UserDevice
+
+# Session.info key of topic (un)subscriptions waiting for the commit
+_CHANGES_KEY = 'topic_changes'
+
+# Tokens FCM accepts in one topic management call
+TOPIC_BATCH_LIMIT = 1000
+
+# Topic management calls run off the request path, one at a time
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fcm-topics')
+
+
+def class_topic(class_id):
+    return f'class-{class_id}'
+
+
+class TopicService:
+    """
+    Per-class FCM topics: the devices of every parent with a child in a
+    class are subscribed to the class's topic, so a class-wide notification
+    is one send however large the class is.
+
+    Subscriptions follow the data: creating, moving or deleting a student
+    and registering or removing a device queue the (un)subscriptions that
+    result, and they are sent in batches once the transaction commits.
+    """
+
+    @staticmethod
+    def queue(changes, session=None):
+        """
+        Queue {(topic, token): subscribe} changes to be sent once the
+        current transaction commits. A later change of the same device and
+        topic in the transaction replaces an earlier one.
+        """
+        if changes:
+            (session or db.session).info.setdefault(_CHANGES_KEY, {}).update(changes)
+
+    @staticmethod
+    def device_changes(connection, user_id, token, subscribe=True, previous_user_id=None):
+        """
+        Topic changes of a device added to `user_id` (or removed from it,
+        with subscribe=False). A device taken over from `previous_user_id`
+        leaves that user's classes.
+        """
+        changes = {}
+        if previous_user_id is not None and previous_user_id != user_id:
+            for class_id in _class_ids(connection, previous_user_id):
+                changes[(class_topic(class_id), token)] = False
+        for class_id in _class_ids(connection, user_id):
+            changes[(class_topic(class_id), token)] = subscribe
+        return changes
+
+    @staticmethod
+    def membership_changes(connection, pairs):
+        """
+        Topic changes of (parent_id, class_id) pairs whose students
+        changed: the parent's devices follow the class topic while the
+        parent has a child in the class.
+        """
+        pairs = {(parent_id, class_id) for parent_id, class_id in pairs
+                 if parent_id is not None and class_id is not None}
+        if not pairs:
+            return {}
+        tokens = {}
+        for user_id, token in connection.execute(
+            select(UserDevice.user_id, UserDevice.token).where(
+                UserDevice.user_id.in_({parent_id for parent_id, _ in pairs})
+            )
+        ):
+            tokens.setdefault(user_id, []).append(token)
+        if not tokens:
+            return {}
+
+        pairs = {pair for pair in pairs if pair[0] in tokens}
+        members = set(connection.execute(
+            select(Student.parent_id, Student.class_id)
+            .where(tuple_(Student.parent_id, Student.class_id).in_(list(pairs)))
+            .distinct()
+        ).all())
+        return {
+            (class_topic(class_id), token): (parent_id, class_id) in members
+            for parent_id, class_id in pairs for token in tokens[parent_id]
+        }
+
+    @staticmethod
+    def subscriptions():
+        """Map topic -> tokens of every device that should follow it, from the current data."""
+        topics = {}
+        rows = db.session.query(Student.class_id, UserDevice.token).join(
+            UserDevice, UserDevice.user_id == Student.parent_id
+        ).filter(Student.class_id.isnot(None)).distinct()
+        for class_id, token in rows:
+            topics.setdefault(class_topic(class_id), []).append(token)
+        return topics
+
+    @staticmethod
+    def apply(changes):
+        """
+        Send (un)subscriptions given as {(topic, token): subscribe}, grouped
+        by topic in calls of up to TOPIC_BATCH_LIMIT tokens. Returns the
+        number of tokens FCM rejected.
+        """
+        grouped = {}
+        for (topic, token), subscribe in changes.items():
+            grouped.setdefault((topic, subscribe), []).append(token)
+
+        failures = 0
+        for (topic, subscribe), tokens in grouped.items():
+            manage = messaging.subscribe_to_topic if subscribe else messaging.unsubscribe_from_topic
+            for i in range(0, len(tokens), TOPIC_BATCH_LIMIT):
+                chunk = tokens[i:i + TOPIC_BATCH_LIMIT]
+                try:
+                    failures += manage(chunk, topic).failure_count
+                except Exception as e:
+                    print(f"Error updating topic {topic}: {e}")
+                    failures += len(chunk)
+        return failures
+
+
+def _class_ids(connection, user_id):
+    return [class_id for (class_id,) in connection.execute(
+        select(Student.class_id).where(Student.parent_id == user_id, Student.class_id.isnot(None)).distinct()
+    )]
+
+
+# Students created, deleted, moved between classes or given to another
+# parent change which class topics that parent's devices follow. The
+# desired state is read at the end of each flush and sent after commit.
+
+def _changed_pairs(session, student):
+    state = inspect(student)
+    if student in session.dirty and not any(
+        state.attrs[attr].history.has_changes() for attr in ('parent_id', 'class_id')
+    ):
+        return set()
+    parent_ids, class_ids = (
+        set(history.added) | set(history.deleted) | set(history.unchanged)
+        for history in (state.attrs['parent_id'].history, state.attrs['class_id'].history)
+    )
+    return {(parent_id, class_id) for parent_id in parent_ids for class_id in class_ids}
+
+
+@event.listens_for(Session, 'after_flush')
+def _queue_topic_changes(session, flush_context):
+    pairs = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Student):
+            pairs |= _changed_pairs(session, obj)
+    if pairs:
+        TopicService.queue(TopicService.membership_changes(session.connection(), pairs), session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_topic_changes(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes:
+        _executor.submit(TopicService.apply, changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_topic_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
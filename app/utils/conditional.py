@@ -0,0 +1,69 @@
+import hashlib
+from functools import wraps
+from flask import jsonify, request, make_response
+from sqlalchemy import select, func
+from app.extensions import db
+
+
+def conditional_json(payload):
+    """
+    Return a JSON response carrying a strong ETag for its body.
+
+    If the request's If-None-Match matches, a bodiless 304 is returned
+    instead so unchanged payloads are not re-downloaded.
+    """
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def table_version(model, *criteria):
+    """
+    Scalar subqueries giving (row count, latest updated_at) for the rows of
+    `model` matching `criteria`. Inserts and updates move the timestamp,
+    deletes move the count.
+    """
+    return (
+        select(func.count()).select_from(model).where(*criteria).scalar_subquery(),
+        select(func.max(model.updated_at)).where(*criteria).scalar_subquery(),
+    )
+
+
+def fetch_version(*parts):
+    """Evaluate version subqueries in a single SELECT and return them as a tuple."""
+    return tuple(db.session.execute(select(*parts)).one())
+
+
+def etag_from_version(version_func):
+    """
+    Decorator to answer conditional GETs from a cheap version key.
+
+    `version_func` receives the view's arguments and returns a tuple that
+    changes whenever the response would (see table_version), or None when
+    the request should go straight to the view, e.g. because the caller
+    doesn't own the resource. A matching If-None-Match gets a 304 without
+    running the view's queries or serialization.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            version = version_func(*args, **kwargs)
+            if version is None:
+                return f(*args, **kwargs)
+
+            key = repr((request.endpoint, version)).encode('utf-8')
+            etag = hashlib.sha1(key).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
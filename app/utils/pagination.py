@@ -0,0 +1,80 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import tuple_
+
+
+def encode_cursor(*values):
+    """Encode values into an opaque, URL-safe cursor string."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor back into a list of values.
+
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _cursor_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _column_value(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def keyset_paginate(query, columns, cursor=None, descending=False, per_page=50):
+    """
+    Fetch one page of `query` ordered by `columns` using keyset pagination.
+
+    `columns` must end with a unique column (normally the primary key) so
+    the ordering is total. Instead of OFFSET, the next page starts strictly
+    after the last row of the previous one, so the cost of a page does not
+    depend on how deep it is, given an index on the same columns.
+
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    Raises ValueError if `cursor` is malformed.
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise ValueError('Invalid cursor')
+        try:
+            values = [_column_value(c, v) for c, v in zip(columns, values)]
+        except (TypeError, ValueError, InvalidOperation) as e:
+            raise ValueError('Invalid cursor') from e
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    items = query.order_by(*order).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(*[_cursor_value(getattr(last, c.key)) for c in columns])
+    return items, next_cursor
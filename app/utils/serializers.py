@@ -0,0 +1,77 @@
+"""
+Bulk serializers for API list endpoints.
+
+Each helper takes a whole result set and precomputes related names and
+counts with one IN / GROUP BY query per relation, instead of letting every
+row's to_dict() lazy-load its relationships (1 + N queries).
+"""
+from sqlalchemy import func
+from app.extensions import db
+from app.models import User, Classe, Student, Subject, Material
+
+
+def names_by_id(column, ids):
+    """Map primary key -> value of `column` for the given ids in one query."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    model = column.class_
+    rows = db.session.query(model.id, column).filter(model.id.in_(ids)).all()
+    return dict(rows)
+
+
+def counts_by(column, ids):
+    """Map foreign key -> number of rows referencing it, in one GROUP BY."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    rows = db.session.query(column, func.count()).filter(column.in_(ids)).group_by(column).all()
+    return dict(rows)
+
+
+def serialize_classes(classes):
+    class_ids = [c.id for c in classes]
+    student_counts = counts_by(Student.class_id, class_ids)
+    subject_counts = counts_by(Subject.class_id, class_ids)
+    return [
+        c.to_dict(student_count=student_counts.get(c.id, 0),
+                  subject_count=subject_counts.get(c.id, 0))
+        for c in classes
+    ]
+
+
+def serialize_students(students):
+    class_names = names_by_id(Classe.name, (s.class_id for s in students))
+    return [s.to_dict(class_name=class_names.get(s.class_id)) for s in students]
+
+
+def serialize_subjects(subjects):
+    class_names = names_by_id(Classe.name, (s.class_id for s in subjects))
+    material_counts = counts_by(Material.subject_id, (s.id for s in subjects))
+    return [
+        s.to_dict(class_name=class_names.get(s.class_id),
+                  material_count=material_counts.get(s.id, 0))
+        for s in subjects
+    ]
+
+
+def serialize_materials(materials):
+    subject_names = names_by_id(Subject.name, (m.subject_id for m in materials))
+    return [m.to_dict(subject_name=subject_names.get(m.subject_id)) for m in materials]
+
+
+def serialize_payments(payments):
+    student_names = names_by_id(Student.full_name, (p.student_id for p in payments))
+    return [p.to_dict(student_name=student_names.get(p.student_id)) for p in payments]
+
+
+def serialize_attendance(records):
+    student_names = names_by_id(Student.full_name, (r.student_id for r in records))
+    class_names = names_by_id(Classe.name, (r.class_id for r in records))
+    admin_names = names_by_id(User.full_name, (r.marked_by for r in records))
+    return [
+        r.to_dict(student_name=student_names.get(r.student_id),
+                  class_name=class_names.get(r.class_id),
+                  marked_by_name=admin_names.get(r.marked_by))
+        for r in records
+    ]
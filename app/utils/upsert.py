@@ -0,0 +1,14 @@
+# Dialects with INSERT ... ON CONFLICT DO UPDATE / DO NOTHING
+NATIVE_UPSERT_DIALECTS = ('sqlite', 'postgresql')
+
+
+def dialect_insert(dialect_name):
+    """
+    The `insert` construct of a dialect in NATIVE_UPSERT_DIALECTS, which
+    adds on_conflict_do_update() and on_conflict_do_nothing().
+    """
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
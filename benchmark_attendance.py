@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark attendance marking strategies for one class/day.
+
+Compares the old per-student SELECT + INSERT/UPDATE loop with the two
+bulk paths of AttendanceService (one SELECT then batched writes, and
+native INSERT ... ON CONFLICT) at several roster sizes. Each size is
+timed for a first marking (all inserts) and a re-marking (all updates).
+
+Runs against a throwaway SQLite database:
+
+    python benchmark_attendance.py [--sizes 40 200 1000] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.config import Config
+from app.models import User, Student, Classe, Attendance
+from app.services.attendance_service import AttendanceService
+
+
+def mark_per_row(class_id, attendance_date, statuses, marked_by):
+    """The original loop: one SELECT per student, then an insert or update."""
+    for student_id, status in statuses.items():
+        existing = Attendance.query.filter_by(student_id=student_id, date=attendance_date).first()
+        if existing:
+            existing.status = status
+            existing.marked_by = marked_by
+            existing.class_id = class_id
+        else:
+            db.session.add(Attendance(
+                student_id=student_id,
+                class_id=class_id,
+                date=attendance_date,
+                status=status,
+                marked_by=marked_by
+            ))
+
+
+STRATEGIES = {
+    'per-row': mark_per_row,
+    'loaded': lambda *args: AttendanceService.mark_class(*args, method='loaded'),
+    'native': lambda *args: AttendanceService.mark_class(*args, method='native'),
+}
+
+
+def seed_class(size, parent_id):
+    classe = Classe(name=f'Benchmark {size}')
+    db.session.add(classe)
+    db.session.flush()
+    db.session.execute(Student.__table__.insert(), [
+        {'full_name': f'Student {i}', 'parent_id': parent_id, 'class_id': classe.id}
+        for i in range(size)
+    ])
+    db.session.commit()
+    return classe.id, [s.id for s in Student.query.filter_by(class_id=classe.id)]
+
+
+def time_marking(strategy, class_id, attendance_date, statuses, admin_id):
+    statements = []
+
+    def count(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+    strategy(class_id, attendance_date, statuses, admin_id)
+    db.session.commit()
+    elapsed = time.perf_counter() - start
+    event.remove(db.engine, 'before_cursor_execute', count)
+    db.session.expunge_all()
+    return elapsed, len(statements)
+
+
+def run(sizes, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchmarkConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"
+
+        app = create_app(BenchmarkConfig)
+        with app.app_context():
+            admin = User(email='admin@benchmark', full_name='Admin', role='admin')
+            parent = User(email='parent@benchmark', full_name='Parent', role='parent')
+            admin.set_password('x')
+            parent.set_password('x')
+            db.session.add_all([admin, parent])
+            db.session.commit()
+            admin_id, parent_id = admin.id, parent.id
+
+            print(f"{'students':>8}  {'strategy':<8}  {'insert ms':>10}  {'update ms':>10}  {'statements':>10}")
+            day = date(2026, 1, 1)
+            for size in sizes:
+                class_id, student_ids = seed_class(size, parent_id)
+                for name, strategy in STRATEGIES.items():
+                    insert_times, update_times = [], []
+                    for _ in range(repeat):
+                        day += timedelta(days=1)
+                        absent = {sid: 'absent' for sid in student_ids}
+                        present = {sid: 'present' for sid in student_ids}
+                        elapsed, statements = time_marking(strategy, class_id, day, absent, admin_id)
+                        insert_times.append(elapsed)
+                        elapsed, _ = time_marking(strategy, class_id, day, present, admin_id)
+                        update_times.append(elapsed)
+                    print(f"{size:>8}  {name:<8}  {min(insert_times) * 1000:>10.1f}  "
+                          f"{min(update_times) * 1000:>10.1f}  {statements:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[40, 200, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
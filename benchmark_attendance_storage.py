@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark compact class-day storage against one attendance row per student.
+
+Marks a school's attendance for a number of days, then measures the space
+taken by the `attendance` table and its indexes and the time of typical
+range reads: a student's history, a class register and the parent API
+history page. Everything but today is then compacted
+(AttendanceService.compact) and the same figures are taken again.
+
+Runs against a throwaway SQLite database:
+
+    python benchmark_attendance_storage.py [--classes 20] [--class-size 25] [--days 180]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import User, Student, Classe, Attendance
+from app.services.attendance_service import AttendanceService
+from app.services.export_service import class_register
+
+RAW_TABLES = ('attendance',)
+COMPACT_TABLES = ('attendance_compact_days', 'attendance_compact_spans')
+
+
+def seed(classes, class_size, days):
+    random.seed(7)
+    admin = User(email='admin@example.com', full_name='Admin', role='admin')
+    parent = User(email='parent@example.com', full_name='Parent', role='parent')
+    admin.set_password('x')
+    parent.set_password('x')
+    db.session.add_all([admin, parent])
+    db.session.commit()
+
+    roster = {}
+    for c in range(classes):
+        classe = Classe(name=f'Class {c}')
+        db.session.add(classe)
+        db.session.flush()
+        db.session.execute(Student.__table__.insert(), [
+            {'full_name': f'Student {c}-{i}', 'parent_id': parent.id, 'class_id': classe.id}
+            for i in range(class_size)
+        ])
+        roster[classe.id] = [s.id for s in Student.query.filter_by(class_id=classe.id)]
+    db.session.commit()
+
+    today = date.today()
+    for day in range(days - 1, -1, -1):
+        attendance_date = today - timedelta(days=day)
+        for class_id, student_ids in roster.items():
+            # Most days nearly everyone is present
+            AttendanceService.mark_class(class_id, attendance_date, {
+                student_id: 'absent' if random.random() < 0.05 else 'present' for student_id in student_ids
+            }, admin.id)
+        db.session.commit()
+    return parent.id
+
+
+def storage_bytes(tables):
+    """Bytes of table and index pages for `tables` (SQLite dbstat)."""
+    db.session.commit()
+    db.session.execute(text('VACUUM'))
+    return db.session.execute(text(
+        'SELECT SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name '
+        f"WHERE m.tbl_name IN ({', '.join(repr(t) for t in tables)})"
+    )).scalar() or 0
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def student_history(student_id):
+    records = Attendance.query.filter(Attendance.student_id == student_id).all()
+    records += AttendanceService.compact_records(student_ids=[student_id])
+    return records
+
+
+def measure(app, parent_id, days, repeat):
+    student = Student.query.filter_by(parent_id=parent_id).first()
+    class_id = student.class_id
+    today = date.today()
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(parent_id))}'}
+
+    def history_pages():
+        cursor = None
+        while True:
+            url = f'/api/students/{student.id}/attendance?limit=30' + (f'&cursor={cursor}' if cursor else '')
+            cursor = client.get(url, headers=headers).get_json()['next_cursor']
+            if not cursor:
+                break
+
+    return {
+        'student history (all days)': best_of(repeat, lambda: student_history(student.id)),
+        'class register (90 days)': best_of(
+            repeat, lambda: list(class_register(class_id, today - timedelta(days=89), today))),
+        f'class register ({days} days)': best_of(
+            repeat, lambda: list(class_register(class_id, today - timedelta(days=days - 1), today))),
+        'API history, every page': best_of(repeat, history_pages),
+    }
+
+
+def run(classes, class_size, days, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchmarkConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"
+
+        app = create_app(BenchmarkConfig)
+        with app.app_context():
+            parent_id = seed(classes, class_size, days)
+            records = Attendance.query.count()
+            print(f'{classes} classes x {class_size} students x {days} days = {records} records\n')
+
+            raw_bytes = storage_bytes(RAW_TABLES + COMPACT_TABLES)
+            raw_times = measure(app, parent_id, days, repeat)
+
+            start = time.perf_counter()
+            compacted = 0
+            while True:
+                packed = AttendanceService.compact(date.today())
+                db.session.commit()
+                if not packed:
+                    break
+                compacted += packed
+            compact_seconds = time.perf_counter() - start
+
+            compact_bytes = storage_bytes(RAW_TABLES + COMPACT_TABLES)
+            compact_times = measure(app, parent_id, days, repeat)
+
+            print(f"{'':<30}  {'rows':>12}  {'compact':>12}")
+            print(f"{'storage KiB':<30}  {raw_bytes / 1024:>12.0f}  {compact_bytes / 1024:>12.0f}")
+            print(f"{'bytes per record':<30}  {raw_bytes / records:>12.1f}  {compact_bytes / records:>12.1f}")
+            for name in raw_times:
+                print(f"{name + ' ms':<30}  {raw_times[name]:>12.1f}  {compact_times[name]:>12.1f}")
+            print(f'\nCompacted {compacted} class-days in {compact_seconds:.1f}s '
+                  f'({compacted / compact_seconds:.0f} class-days/s).')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--classes', type=int, default=20)
+    parser.add_argument('--class-size', type=int, default=25)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.classes, args.class_size, args.days, args.repeat)
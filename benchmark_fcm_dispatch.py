@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark multicast push delivery against a local fake FCM transport.
+
+The fake stands in for `messaging.send_each_for_multicast`: each call
+takes a fixed round-trip latency plus a small cost per token and fails a
+share of the tokens as unregistered. Compared are one send per token (how
+the FCM token check used to work), a single unchunked multicast, and the
+chunked dispatcher of FirebaseService.send_multicast_notification with
+growing thread pools.
+The per-token results are checked to line up with the input tokens.
+
+    python benchmark_fcm_dispatch.py [--tokens 5000] [--latency-ms 80] [--workers 1 4 8]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from firebase_admin import messaging
+from app.services.firebase_service import FirebaseService, MULTICAST_LIMIT
+
+
+class FakeFCM:
+    """Answers MulticastMessages like FCM would, after a simulated delay."""
+
+    def __init__(self, latency, per_token, invalid_every):
+        self.latency = latency
+        self.per_token = per_token
+        self.invalid_every = invalid_every
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def is_invalid(self, token):
+        return int(token.rsplit('-', 1)[1]) % self.invalid_every == 0
+
+    def __call__(self, message):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency + self.per_token * len(message.tokens))
+        return messaging.BatchResponse([
+            messaging.SendResponse(None, messaging.UnregisteredError('Requested entity was not found.'))
+            if self.is_invalid(token) else
+            messaging.SendResponse({'name': f'projects/fake/messages/{token}'}, None)
+            for token in message.tokens
+        ])
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return result, time.perf_counter() - start
+
+
+def check(fake, tokens, response):
+    """True if every token got its own result, in order."""
+    if len(response.responses) != len(tokens):
+        return False
+    return all(
+        result.success != fake.is_invalid(token) and (not result.success or result.message_id.endswith(token))
+        for token, result in zip(tokens, response.responses)
+    )
+
+
+def run(n_tokens, latency, per_token, invalid_every, workers_list, serial_sample):
+    fake = FakeFCM(latency, per_token, invalid_every)
+    FirebaseService.multicast_transport = fake
+    tokens = [f'token-{i}' for i in range(1, n_tokens + 1)]
+    title, body, data = 'Benchmark', 'Fake FCM delivery', {'type': 'benchmark'}
+
+    print(f'{n_tokens} tokens, {latency * 1000:.0f} ms per FCM call + {per_token * 1000:.2f} ms per token, '
+          f'1 in {invalid_every} unregistered, chunks of {MULTICAST_LIMIT}\n')
+    print(f"{'mode':<34}  {'calls':>6}  {'seconds':>8}  {'tokens/s':>9}  results")
+
+    # One request per token; timed on a sample, the full run would take minutes
+    sample = tokens[:serial_sample]
+    fake.calls = 0
+    responses, seconds = timed(lambda: [
+        FirebaseService.send_multicast_notification([token], title, body, data, workers=1) for token in sample
+    ])
+    ok = all(check(fake, [token], response) for token, response in zip(sample, responses))
+    print(f"{f'one send per token ({serial_sample} sampled)':<34}  {fake.calls:>6}  {seconds:>8.2f}  "
+          f"{len(sample) / seconds:>9.0f}  {'ok' if ok else 'MISMATCH'}")
+
+    # Everything in one message, as before the dispatcher; the SDK refuses
+    # more than MULTICAST_LIMIT tokens
+    try:
+        fake(messaging.MulticastMessage(tokens=tokens, data=data))
+        print(f"{'single multicast':<34}  {1:>6}  accepted")
+    except ValueError as e:
+        print(f"{'single multicast':<34}  {1:>6}  rejected: {e}")
+
+    for workers in workers_list:
+        fake.calls = 0
+        response, seconds = timed(
+            lambda: FirebaseService.send_multicast_notification(tokens, title, body, data, workers=workers)
+        )
+        ok = check(fake, tokens, response)
+        print(f"{f'chunked, {workers} worker(s)':<34}  {fake.calls:>6}  {seconds:>8.2f}  "
+              f"{n_tokens / seconds:>9.0f}  {'ok' if ok else 'MISMATCH'} "
+              f"({response.success_count} sent, {response.failure_count} failed)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--tokens', type=int, default=5000)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--per-token-ms', type=float, default=0.2)
+    parser.add_argument('--invalid-every', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--serial-sample', type=int, default=100)
+    args = parser.parse_args()
+    run(args.tokens, args.latency_ms / 1000, args.per_token_ms / 1000, args.invalid_every,
+        args.workers, args.serial_sample)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Check that attendance record ids stay unique through compaction.
+
+Compacted class-days keep their record ids and write them back when they
+are expanded or re-marked, so a freed id must never be handed out to a
+new record meanwhile. On a throwaway SQLite database this marks a day
+long ago, compacts it, marks today, then expands everything and re-marks
+a compacted day. Exits with status 1 if an id was reused or an insert
+failed.
+
+    python check_attendance_ids.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.config import Config
+from app.models import User, Classe, Student, Attendance
+from app.services.attendance_service import AttendanceService
+
+
+def record_ids(class_id, day):
+    return {record.id for record in Attendance.query.filter_by(class_id=class_id, date=day)}
+
+
+def run():
+    failures = []
+    admin = User(email='ids-admin@example.com', full_name='Admin', role='admin')
+    admin.set_password('x')
+    parent = User(email='ids-parent@example.com', full_name='Parent', role='parent')
+    parent.set_password('x')
+    classe = Classe(name='Class')
+    db.session.add_all([admin, parent, classe])
+    db.session.flush()
+    students = [Student(full_name=f'Student {i}', parent_id=parent.id, class_id=classe.id) for i in range(3)]
+    db.session.add_all(students)
+    db.session.commit()
+
+    today = date.today()
+    old_day = today - timedelta(days=400)
+    older_day = today - timedelta(days=401)
+    statuses = {student.id: 'present' for student in students}
+
+    # The newest records get archived, freeing the highest ids
+    AttendanceService.mark_class(classe.id, older_day, statuses, admin.id)
+    AttendanceService.mark_class(classe.id, old_day, statuses, admin.id)
+    db.session.commit()
+    archived = {day: record_ids(classe.id, day) for day in (older_day, old_day)}
+    while AttendanceService.compact(today):
+        db.session.commit()
+
+    AttendanceService.mark_class(classe.id, today, statuses, admin.id)
+    db.session.commit()
+    reused = record_ids(classe.id, today) & set().union(*archived.values())
+    if reused:
+        failures.append(f'new records reuse archived ids {sorted(reused)}')
+
+    try:
+        # Re-marking a compacted day restores its records first
+        AttendanceService.mark_class(classe.id, old_day, {students[0].id: 'absent'}, admin.id)
+        db.session.commit()
+        while AttendanceService.expand():
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        failures.append(f'restoring compacted records failed: {e}')
+    else:
+        if any(record_ids(classe.id, day) != ids for day, ids in archived.items()):
+            failures.append('restored records did not keep their ids')
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        class CheckConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'ids.db')}"
+            NOTIFICATION_BACKGROUND_DISPATCH = False
+
+        app = create_app(CheckConfig)
+        with app.app_context():
+            failures = run()
+
+    for failure in failures:
+        print(f'ERROR: {failure}')
+    if failures:
+        sys.exit(1)
+    print('Attendance ids stay unique through compaction.')
+
+
+if __name__ == '__main__':
+    main()
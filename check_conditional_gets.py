@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Check that conditional GETs skip the heavy queries.
+
+Requests every endpoint answered through etag_from_version twice as a
+parent on a throwaway SQLite database: once for the full response and
+ETag, then with If-None-Match. The second request must be a 304 that ran
+a single SQL statement, the version query, while the full response ran
+more. An edit to the data behind the response must then change the ETag.
+Exits with status 1, listing the failures, otherwise.
+
+    python check_conditional_gets.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import User, Classe, Student, Subject, Material, Payment
+from app.services.cache_service import response_cache
+
+
+def seed():
+    parent = User(email='etag-parent@example.com', full_name='Parent', role='parent')
+    parent.set_password('x')
+    classe = Classe(name='Class')
+    db.session.add_all([parent, classe])
+    db.session.flush()
+    student = Student(full_name='Student', parent_id=parent.id, class_id=classe.id)
+    subject = Subject(name='Subject', class_id=classe.id)
+    db.session.add_all([student, subject])
+    db.session.flush()
+    db.session.add_all([
+        Material(title=f'Material {i}', type='file', subject_id=subject.id, order_index=i) for i in range(3)
+    ] + [
+        Payment(student_id=student.id, amount=100, due_date=date.today() + timedelta(days=30 * i), is_paid=i == 0)
+        for i in range(3)
+    ])
+    db.session.commit()
+    return parent, student, subject
+
+
+def counted_get(client, path, headers):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Shared listings may be cached; the full response must hit the database
+    response_cache.clear()
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get(path, headers=headers)
+        response.get_data()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    return response, statements
+
+
+def run(app):
+    parent, student, subject = seed()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(parent.id))}'}
+    paths = [
+        '/api/students',
+        f'/api/students/{student.id}',
+        f'/api/students/{student.id}/subjects',
+        f'/api/subjects/{subject.id}',
+        f'/api/subjects/{subject.id}/materials',
+        f'/api/students/{student.id}/payments',
+        '/api/payments/summary',
+    ]
+
+    client = app.test_client()
+    failures, etags = [], {}
+    print(f"{'endpoint':<40}  {'full':>4}  {'304':>4}")
+    for path in paths:
+        full, full_statements = counted_get(client, path, headers)
+        etag = full.headers.get('ETag')
+        if full.status_code != 200 or not etag:
+            failures.append(f'{path} returned {full.status_code} without an ETag' if not etag
+                            else f'{path} returned {full.status_code}')
+            continue
+        etags[path] = etag
+
+        cached, cached_statements = counted_get(client, path, {**headers, 'If-None-Match': etag})
+        print(f'{path:<40}  {len(full_statements):>4}  {len(cached_statements):>4}')
+        if cached.status_code != 304:
+            failures.append(f'{path} with a matching ETag returned {cached.status_code}')
+        elif len(cached_statements) != 1:
+            failures.append(f'{path} 304 ran {len(cached_statements)} statements, expected only the version query')
+        elif len(full_statements) <= 1:
+            failures.append(f'{path} full response ran {len(full_statements)} statements; nothing was skipped')
+
+    # Edits reach every endpoint through its version
+    Student.query.get(student.id).full_name = 'Renamed'
+    Subject.query.get(subject.id).name = 'Renamed'
+    Payment.query.filter_by(student_id=student.id).first().amount = 150
+    db.session.commit()
+    for path, etag in etags.items():
+        response, _ = counted_get(client, path, {**headers, 'If-None-Match': etag})
+        if response.status_code != 200:
+            failures.append(f'{path} returned {response.status_code} after an edit, expected 200')
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        class CheckConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'etags.db')}"
+            NOTIFICATION_BACKGROUND_DISPATCH = False
+
+        app = create_app(CheckConfig)
+        with app.app_context():
+            failures = run(app)
+
+    for failure in failures:
+        print(f'ERROR: {failure}')
+    if failures:
+        sys.exit(1)
+    print('Conditional GETs answer 304 from the version query alone.')
+
+
+if __name__ == '__main__':
+    main()
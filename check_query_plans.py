@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Check that no API or admin query falls back to a full table scan.
+
+Builds a large synthetic SQLite database, requests every read endpoint
+as a parent and as an admin, and runs EXPLAIN QUERY PLAN on each SELECT
+the app issued. Exits with status 1, listing the offending queries, if a
+plan scans one of the large tables without an index.
+
+    python check_query_plans.py [--students 3000] [--days 60] [--verbose]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, text
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import User, Classe, Student, Subject, Material, Payment
+from app.services.attendance_service import AttendanceService
+from app.services.cache_service import response_cache
+from app.services.search_service import SearchService
+from app.utils.pagination import encode_cursor
+
+# Tables that grow with the school; scanning any of them is a regression
+LARGE_TABLES = {
+    'users', 'students', 'subjects', 'materials', 'payments', 'attendance',
+    'attendance_class_daily', 'attendance_student_monthly', 'tombstones',
+    'search_entries', 'notification_outbox', 'attendance_compact_days',
+    'attendance_compact_spans',
+}
+
+# "SCAN students" is a full scan; "SCAN students USING INDEX ..." walks an index
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?! USING)')
+
+
+def seed(n_students, n_days):
+    random.seed(42)
+    now = datetime.utcnow()
+    admin = User(email='plans-admin@example.com', full_name='Admin', role='admin')
+    admin.set_password('x')
+    db.session.add(admin)
+    db.session.commit()
+
+    n_classes = max(n_students // 25, 1)
+    db.session.execute(Classe.__table__.insert(), [
+        {'name': f'Class {i}', 'created_at': now, 'updated_at': now} for i in range(n_classes)
+    ])
+    db.session.execute(User.__table__.insert(), [
+        {'email': f'plans-parent{i}@example.com', 'full_name': f'Parent {i}', 'role': 'parent', 'password_hash': 'x',
+         'phone': f'05{i:08d}', 'is_active': True, 'created_at': now}
+        for i in range(n_students // 2)
+    ])
+    class_ids = [i for (i,) in db.session.query(Classe.id)]
+    parent_ids = [i for (i,) in db.session.query(User.id).filter(User.role == 'parent')]
+    db.session.execute(Student.__table__.insert(), [
+        {'full_name': f'Student {i}', 'parent_id': parent_ids[i % len(parent_ids)],
+         'class_id': class_ids[i % len(class_ids)], 'created_at': now, 'updated_at': now}
+        for i in range(n_students)
+    ])
+    db.session.execute(Subject.__table__.insert(), [
+        {'name': f'Subject {i}', 'class_id': class_id, 'created_at': now, 'updated_at': now}
+        for class_id in class_ids for i in range(6)
+    ])
+    subject_ids = [i for (i,) in db.session.query(Subject.id)]
+    db.session.execute(Material.__table__.insert(), [
+        {'title': f'Material {i}', 'type': 'file', 'subject_id': subject_id, 'order_index': i,
+         'created_at': now, 'updated_at': now}
+        for subject_id in subject_ids for i in range(5)
+    ])
+    student_ids = [i for (i,) in db.session.query(Student.id)]
+    db.session.execute(Payment.__table__.insert(), [
+        {'student_id': student_id, 'amount': 100, 'due_date': date(2026, month, 1),
+         'is_paid': month < 9, 'created_at': now, 'updated_at': now}
+        for student_id in student_ids for month in range(1, 13)
+    ])
+    db.session.commit()
+
+    today = date.today()
+    roster = {}
+    for student_id, class_id in db.session.query(Student.id, Student.class_id):
+        roster.setdefault(class_id, []).append(student_id)
+    for day in range(n_days):
+        attendance_date = today - timedelta(days=day)
+        for class_id, student_ids in roster.items():
+            AttendanceService.mark_class(class_id, attendance_date, {
+                student_id: 'present' if random.random() < 0.9 else 'absent' for student_id in student_ids
+            }, admin.id)
+    db.session.commit()
+    # Older half of the days lives in compact storage, so its reads are checked too
+    while AttendanceService.compact(today - timedelta(days=n_days // 2)):
+        db.session.commit()
+    # Rows above were inserted without the ORM; index them for the search pages
+    SearchService.create_fts(db.session.connection())
+    SearchService.reindex(db.session.connection())
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    return admin
+
+
+def request_paths(parent, student, subject, classe):
+    today = date.today()
+    since = encode_cursor((datetime.utcnow() - timedelta(days=1)).isoformat())
+    api = [
+        '/api/auth/me',
+        '/api/students',
+        f'/api/students/{student.id}',
+        f'/api/students/{student.id}/subjects',
+        f'/api/students/{student.id}/payments',
+        f'/api/students/{student.id}/attendance',
+        f'/api/students/{student.id}/attendance/monthly',
+        f'/api/students/{student.id}/attendance/today',
+        f'/api/subjects/{subject.id}',
+        f'/api/subjects/{subject.id}/materials',
+        '/api/payments/summary',
+        '/api/parents/me/home',
+        '/api/sync',
+        f'/api/sync?since={since}',
+    ]
+    admin_api = [
+        f'/api/admin/classes/{classe.id}/attendance',
+        f'/api/admin/classes/{classe.id}/attendance?date={today - timedelta(days=40)}',
+    ]
+    admin = [
+        '/admin/dashboard',
+        '/admin/users',
+        '/admin/users?sort=full_name',
+        f'/admin/users?q={parent.full_name}',
+        '/admin/students',
+        f'/admin/students?class_id={classe.id}',
+        '/admin/students?class_id=none',
+        '/admin/students?q=Student 12',
+        '/admin/subjects',
+        f'/admin/subjects?class_id={classe.id}',
+        '/admin/materials',
+        f'/admin/materials?subject_id={subject.id}',
+        '/admin/payments',
+        '/admin/payments?status=unpaid',
+        '/admin/payments?status=paid&sort=due_date',
+        f'/admin/payments?due_from={today.replace(month=1, day=1)}&due_to={today}',
+        '/admin/classes',
+        '/admin/attendance',
+        f'/admin/attendance/mark/{classe.id}',
+        f'/admin/attendance/view/{classe.id}',
+        f'/admin/attendance/export?class_id={classe.id}&format=csv',
+        '/admin/notifications',
+        '/admin/search?type=student&q=Student 4',
+        '/admin/search?type=parent&q=Parent 4',
+        f'/admin/students/{student.id}/edit',
+        f'/admin/payments/create',
+    ]
+    return api, admin_api, admin
+
+
+def capture_plans(app, admin):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    parent = User.query.filter_by(role='parent').first()
+    student = Student.query.filter_by(parent_id=parent.id).first()
+    subject = Subject.query.filter_by(class_id=student.class_id).first()
+    classe = Classe.query.get(student.class_id)
+    api_paths, admin_api_paths, admin_paths = request_paths(parent, student, subject, classe)
+
+    api_client = app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(parent.id))}'}
+    admin_headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+    admin_client = app.test_client()
+    admin_client.post('/admin/login', data={'email': admin.email, 'password': 'x'})
+
+    failures = []
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        runs = (
+            (api_client, api_paths, {'headers': headers}),
+            (api_client, admin_api_paths, {'headers': admin_headers}),
+            (admin_client, admin_paths, {}),
+        )
+        for client, paths, extra in runs:
+            for path in paths:
+                response_cache.clear()
+                response = client.get(path, **extra)
+                response.get_data()
+                if response.status_code != 200:
+                    failures.append(f'{path} returned {response.status_code}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    plans = []
+    with db.engine.connect() as connection:
+        for statement, parameters in statements:
+            rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            plans.append((statement, [row[-1] for row in rows]))
+    return plans, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--students', type=int, default=3000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--verbose', action='store_true', help='Print every plan.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class PlanConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'plans.db')}"
+            WTF_CSRF_ENABLED = False
+            NOTIFICATION_BACKGROUND_DISPATCH = False
+
+        app = create_app(PlanConfig)
+        with app.app_context():
+            admin = seed(args.students, args.days)
+            plans, failures = capture_plans(app, admin)
+
+    scans = []
+    seen = set()
+    for statement, details in plans:
+        if statement in seen:
+            continue
+        seen.add(statement)
+        if args.verbose:
+            print(statement)
+            print('\n'.join(f'    {detail}' for detail in details))
+        tables = {match.group(1) for match in map(FULL_SCAN.match, details) if match}
+        for table in sorted(tables & LARGE_TABLES):
+            scans.append((table, statement))
+
+    print(f'Checked {len(seen)} distinct queries.')
+    for failure in failures:
+        print(f'ERROR: {failure}')
+    for table, statement in scans:
+        print(f'FULL SCAN of {table}:\n    {" ".join(statement.split())}')
+    if scans or failures:
+        sys.exit(1)
+    print('No full table scans.')
+
+
+if __name__ == '__main__':
+    main()
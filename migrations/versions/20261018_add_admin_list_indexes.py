@@ -0,0 +1,37 @@
+"""Add indexes backing the admin list filters and sorts
+
+Revision ID: 20261018_list_indexes
+Revises: 20261018_amount_numeric
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_list_indexes'
+down_revision = '20261018_amount_numeric'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_payments_due_date', 'payments', ['due_date']),
+    ('ix_payments_is_paid_due_date', 'payments', ['is_paid', 'due_date']),
+    ('ix_students_full_name', 'students', ['full_name']),
+    ('ix_students_class_id_full_name', 'students', ['class_id', 'full_name']),
+    ('ix_materials_subject_id_order_index', 'materials', ['subject_id', 'order_index']),
+    ('ix_subjects_class_id_name', 'subjects', ['class_id', 'name']),
+    ('ix_users_role_created_at', 'users', ['role', 'created_at']),
+    ('ix_users_role_full_name', 'users', ['role', 'full_name']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,63 @@
+"""Add class-day and student-month attendance rollups
+
+Revision ID: 20261018_attendance_rollups
+Revises: 20261018_notification_outbox
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_attendance_rollups'
+down_revision = '20261018_notification_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attendance_class_daily',
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('present', sa.Integer(), nullable=False),
+    sa.Column('absent', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('class_id', 'date')
+    )
+    op.create_table('attendance_student_monthly',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('present', sa.Integer(), nullable=False),
+    sa.Column('absent', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('student_id', 'year', 'month')
+    )
+
+    # Backfill from existing attendance
+    attendance = sa.table('attendance',
+        sa.column('student_id', sa.Integer), sa.column('class_id', sa.Integer),
+        sa.column('date', sa.Date), sa.column('status', sa.String))
+    present = sa.func.sum(sa.case((attendance.c.status == 'present', 1), else_=0))
+    absent = sa.func.sum(sa.case((attendance.c.status == 'absent', 1), else_=0))
+    year = sa.extract('year', attendance.c.date)
+    month = sa.extract('month', attendance.c.date)
+
+    class_daily = sa.table('attendance_class_daily',
+        sa.column('class_id'), sa.column('date'), sa.column('present'), sa.column('absent'))
+    op.execute(class_daily.insert().from_select(
+        ['class_id', 'date', 'present', 'absent'],
+        sa.select(attendance.c.class_id, attendance.c.date, present, absent)
+        .group_by(attendance.c.class_id, attendance.c.date)
+    ))
+    student_monthly = sa.table('attendance_student_monthly',
+        sa.column('student_id'), sa.column('year'), sa.column('month'), sa.column('present'), sa.column('absent'))
+    op.execute(student_monthly.insert().from_select(
+        ['student_id', 'year', 'month', 'present', 'absent'],
+        sa.select(attendance.c.student_id, year, month, present, absent)
+        .group_by(attendance.c.student_id, year, month)
+    ))
+
+
+def downgrade():
+    op.drop_table('attendance_student_monthly')
+    op.drop_table('attendance_class_daily')
@@ -0,0 +1,34 @@
+"""Add attendance sheet versions for optimistic concurrency
+
+Revision ID: 20261018_attendance_sheets
+Revises: 20261018_compact_attendance
+Create Date: 2026-10-18 18:00:00.000000
+
+Class-days already marked have no sheet row and count as version 0; the
+first save through AttendanceService.save_sheet creates it.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_attendance_sheets'
+down_revision = '20261018_compact_attendance'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attendance_sheets',
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_by', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('class_id', 'date')
+    )
+
+
+def downgrade():
+    op.drop_table('attendance_sheets')
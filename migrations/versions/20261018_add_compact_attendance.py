@@ -0,0 +1,53 @@
+"""Add compact storage for old class-days of attendance
+
+Revision ID: 20261018_compact_attendance
+Revises: 20261018_query_indexes
+Create Date: 2026-10-18 17:00:00.000000
+
+The tables start empty; `flask attendance compact` moves old class-days
+into them and `flask attendance expand` moves them back.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_compact_attendance'
+down_revision = '20261018_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attendance_compact_days',
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('student_ids', sa.LargeBinary(), nullable=False),
+    sa.Column('record_ids', sa.LargeBinary(), nullable=False),
+    sa.Column('present', sa.LargeBinary(), nullable=False),
+    sa.Column('present_count', sa.Integer(), nullable=False),
+    sa.Column('absent_count', sa.Integer(), nullable=False),
+    sa.Column('marked_by', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('exceptions', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('class_id', 'date')
+    )
+    op.create_table('attendance_compact_spans',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('first_date', sa.Date(), nullable=False),
+    sa.Column('last_date', sa.Date(), nullable=False),
+    sa.PrimaryKeyConstraint('student_id', 'class_id')
+    )
+
+
+def downgrade():
+    compacted = op.get_bind().execute(sa.text('SELECT COUNT(*) FROM attendance_compact_days')).scalar()
+    if compacted:
+        raise RuntimeError(
+            f'{compacted} class-days are compacted; run `flask attendance expand` before downgrading.'
+        )
+    op.drop_table('attendance_compact_spans')
+    op.drop_table('attendance_compact_days')
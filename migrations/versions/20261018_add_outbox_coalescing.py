@@ -0,0 +1,41 @@
+"""Add topic rows, idempotency keys and recipient indexes to the notification outbox
+
+Revision ID: 20261018_outbox_coalescing
+Revises: 20261018_token_audits
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_outbox_coalescing'
+down_revision = '20261018_token_audits'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification_outbox', schema=None) as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.add_column(sa.Column('topic', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=120), nullable=True))
+        batch_op.create_unique_constraint('uq_notification_outbox_idempotency_key', ['idempotency_key'])
+        batch_op.create_index('ix_notification_outbox_user_id_status_next_attempt_at',
+                              ['user_id', 'status', 'next_attempt_at'], unique=False)
+        batch_op.create_index('ix_notification_outbox_user_id_sent_at', ['user_id', 'sent_at'], unique=False)
+        batch_op.create_index('ix_notification_outbox_topic_sent_at', ['topic', 'sent_at'], unique=False)
+
+
+def downgrade():
+    # Topic rows have no user to keep
+    op.execute('DELETE FROM notification_outbox WHERE user_id IS NULL')
+    with op.batch_alter_table('notification_outbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_outbox_topic_sent_at')
+        batch_op.drop_index('ix_notification_outbox_user_id_sent_at')
+        batch_op.drop_index('ix_notification_outbox_user_id_status_next_attempt_at')
+        batch_op.drop_constraint('uq_notification_outbox_idempotency_key', type_='unique')
+        batch_op.drop_column('idempotency_key')
+        batch_op.drop_column('topic')
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
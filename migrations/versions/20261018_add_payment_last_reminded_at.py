@@ -0,0 +1,26 @@
+"""Add last_reminded_at to payments for the reminder sweep
+
+Revision ID: 20261018_payment_reminders
+Revises: 20261018_outbox_coalescing
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_payment_reminders'
+down_revision = '20261018_outbox_coalescing'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_reminded_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_column('last_reminded_at')
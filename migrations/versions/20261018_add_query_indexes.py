@@ -0,0 +1,33 @@
+"""Add indexes for the parent API and attendance lookups
+
+Revision ID: 20261018_query_indexes
+Revises: 20261018_attendance_rollups
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_query_indexes'
+down_revision = '20261018_attendance_rollups'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_students_parent_id', 'students', ['parent_id']),
+    ('ix_students_created_at', 'students', ['created_at']),
+    ('ix_attendance_class_id_date', 'attendance', ['class_id', 'date']),
+    ('ix_payments_student_id_is_paid_due_date', 'payments', ['student_id', 'is_paid', 'due_date']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
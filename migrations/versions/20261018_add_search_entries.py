@@ -0,0 +1,74 @@
+"""Add search_entries table for student and parent lookup
+
+Revision ID: 20261018_search_entries
+Revises: 20261018_list_indexes
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.services.search_service import normalize
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_search_entries'
+down_revision = '20261018_list_indexes'
+branch_labels = None
+depends_on = None
+
+# SQLite keeps an FTS5 index over search_entries in sync through triggers
+FTS_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        content, content='search_entries', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS search_entries_ai AFTER INSERT ON search_entries BEGIN
+        INSERT INTO search_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_entries_ad AFTER DELETE ON search_entries BEGIN
+        INSERT INTO search_fts(search_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_entries_au AFTER UPDATE ON search_entries BEGIN
+        INSERT INTO search_fts(search_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO search_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+
+def upgrade():
+    op.create_table('search_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('ref_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'ref_id', name='unique_search_entry')
+    )
+
+    connection = op.get_bind()
+    if connection.dialect.name == 'sqlite':
+        try:
+            with connection.begin_nested():
+                for statement in FTS_SETUP:
+                    op.execute(statement)
+        except sa.exc.OperationalError as e:
+            print(f"Warning: SQLite FTS5 unavailable, search will use LIKE: {e}")
+
+    # Index the existing students and parents
+    entries = [
+        {'kind': 'student', 'ref_id': student_id, 'content': normalize(full_name)}
+        for student_id, full_name in connection.execute(sa.text('SELECT id, full_name FROM students'))
+    ] + [
+        {'kind': 'parent', 'ref_id': user_id, 'content': normalize(' '.join(filter(None, contact)))}
+        for user_id, *contact in connection.execute(sa.text(
+            "SELECT id, full_name, email, phone FROM users WHERE role = 'parent'"
+        ))
+    ]
+    if entries:
+        connection.execute(sa.text(
+            'INSERT INTO search_entries (kind, ref_id, content) VALUES (:kind, :ref_id, :content)'
+        ), entries)
+
+
+def downgrade():
+    op.execute('DROP TABLE IF EXISTS search_fts')
+    op.drop_table('search_entries')
@@ -0,0 +1,26 @@
+"""Add moved_at to students for delta sync after a change of class or parent
+
+Revision ID: 20261018_student_moved_at
+Revises: 20261018_attendance_autoincrement
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_student_moved_at'
+down_revision = '20261018_attendance_autoincrement'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('moved_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_column('moved_at')
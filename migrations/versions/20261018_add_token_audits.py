@@ -0,0 +1,58 @@
+"""Add token audit jobs and their per-device results
+
+Revision ID: 20261018_token_audits
+Revises: 20261018_user_devices
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_token_audits'
+down_revision = '20261018_user_devices'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('token_audits',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('total_devices', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('sent', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('pruned', sa.Integer(), nullable=False),
+    sa.Column('users_without_devices', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_token_audits_created_at', 'token_audits', ['created_at'], unique=False)
+    op.create_table('token_audit_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('audit_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('message_id', sa.String(length=200), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['audit_id'], ['token_audits.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_token_audit_results_audit_id_user_id', 'token_audit_results', ['audit_id', 'user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_token_audit_results_audit_id_user_id', table_name='token_audit_results')
+    op.drop_table('token_audit_results')
+    op.drop_index('ix_token_audits_created_at', table_name='token_audits')
+    op.drop_table('token_audits')
@@ -0,0 +1,34 @@
+"""Add updated_at to classes, students, subjects, materials and payments
+
+Revision ID: 20261018_updated_at
+Revises: 20260201_attendance
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_updated_at'
+down_revision = '20260201_attendance'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['classes', 'students', 'subjects', 'materials', 'payments']
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+        # Backfill existing rows so they have a timestamp to compare against
+        op.execute(f'UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL')
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,58 @@
+"""Move FCM tokens to a user_devices table, one row per device
+
+Revision ID: 20261018_user_devices
+Revises: 20261018_attendance_sheets
+Create Date: 2026-10-18 19:00:00.000000
+
+Each user's existing users.fcm_token becomes their first device. The
+downgrade keeps the most recently seen device of each user.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_user_devices'
+down_revision = '20261018_attendance_sheets'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_devices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(length=255), nullable=False),
+    sa.Column('platform', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token')
+    )
+    op.create_index('ix_user_devices_user_id_last_seen_at', 'user_devices', ['user_id', 'last_seen_at'], unique=False)
+
+    # A token shared by several accounts (same phone) goes to the newest account
+    op.execute(
+        "INSERT INTO user_devices (user_id, token, created_at, last_seen_at) "
+        "SELECT MAX(id), fcm_token, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP FROM users "
+        "WHERE fcm_token IS NOT NULL AND fcm_token != '' GROUP BY fcm_token"
+    )
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('fcm_token')
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fcm_token', sa.String(length=255), nullable=True))
+
+    op.execute(
+        "UPDATE users SET fcm_token = ("
+        "SELECT token FROM user_devices WHERE user_devices.user_id = users.id "
+        "ORDER BY last_seen_at DESC, id DESC LIMIT 1)"
+    )
+
+    op.drop_index('ix_user_devices_user_id_last_seen_at', table_name='user_devices')
+    op.drop_table('user_devices')
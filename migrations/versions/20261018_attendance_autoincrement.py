@@ -0,0 +1,63 @@
+"""Stop SQLite from reusing attendance ids freed by compaction
+
+Revision ID: 20261018_attendance_autoincrement
+Revises: 20261018_payment_reminders
+Create Date: 2026-10-18 23:00:00.000000
+
+Compacted class-days keep their record ids and put them back on expand,
+but without AUTOINCREMENT SQLite hands the largest freed ids out again.
+The table is rebuilt with AUTOINCREMENT and its sequence starts above
+every id, live or archived. Other databases never reuse sequence values.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_attendance_autoincrement'
+down_revision = '20261018_payment_reminders'
+branch_labels = None
+depends_on = None
+
+
+def _unpack_ints(data):
+    # Zigzag-delta LEB128 varints, as written by CompactClassDay.pack
+    values = []
+    previous = n = shift = 0
+    for byte in data:
+        n |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += n >> 1 if not n & 1 else -((n + 1) >> 1)
+        values.append(previous)
+        n = shift = 0
+    return values
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+
+    with op.batch_alter_table('attendance', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+    last_id = bind.execute(sa.text('SELECT MAX(id) FROM attendance')).scalar() or 0
+    for (record_ids,) in bind.execute(sa.text('SELECT record_ids FROM attendance_compact_days')):
+        last_id = max([last_id, *_unpack_ints(record_ids)])
+    if not bind.execute(sa.text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'attendance'"),
+                        {'seq': last_id}).rowcount:
+        bind.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('attendance', :seq)"),
+                     {'seq': last_id})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    with op.batch_alter_table('attendance', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -0,0 +1,32 @@
+"""Store payment amounts as exact Numeric(10, 2)
+
+Revision ID: 20261018_amount_numeric
+Revises: 20261018_tombstones
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_amount_numeric'
+down_revision = '20261018_tombstones'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.alter_column('amount',
+               existing_type=sa.Float(),
+               type_=sa.Numeric(precision=10, scale=2),
+               existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.alter_column('amount',
+               existing_type=sa.Numeric(precision=10, scale=2),
+               type_=sa.Float(),
+               existing_nullable=False)